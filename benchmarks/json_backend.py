@@ -0,0 +1,81 @@
+# benchmarks/json_backend.py
+"""
+比较 JSON 后端的解析和格式化速度
+
+    python benchmarks/json_backend.py [--records 20000] [--repeat 5]
+
+输出每个后端解析、格式化以及检测+格式化（爬虫保存一个响应的主要工作）的最短耗时。
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from simplejsonspider import json_backend  # noqa: E402
+from simplejsonspider.file_detector import FileTypeDetector  # noqa: E402
+
+
+def make_payload(records: int) -> str:
+    rng = random.Random(0)
+    items = [
+        {
+            'id': i,
+            'title': f'视频标题 {i} – sample title',
+            'score': rng.random() * 100,
+            'tags': [f'tag{rng.randrange(100)}' for _ in range(5)],
+            'owner': {'mid': rng.randrange(10 ** 9), 'name': f'user_{i}', 'verified': i % 3 == 0},
+            'stats': {'view': rng.randrange(10 ** 7), 'like': rng.randrange(10 ** 5), 'ratio': rng.random()},
+        }
+        for i in range(records)
+    ]
+    return json.dumps({'code': 0, 'data': {'items': items}}, ensure_ascii=False)
+
+
+def best_of(repeat: int, func) -> float:
+    # 与 timeit 相同，计时期间关闭垃圾回收
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_payload(args.records)
+    value = json.loads(text)
+    print(f"payload: {len(text.encode('utf-8')) / 1024 / 1024:.1f} MiB, {args.records} records")
+    print(f"{'backend':<10}{'loads':>10}{'dumps':>10}{'detect+prettify':>18}")
+
+    for name in ('stdlib', 'orjson'):
+        try:
+            backend = json_backend.get_backend(name)
+        except ImportError:
+            print(f"{name:<10}{'not installed':>38}")
+            continue
+        assert backend.dumps_pretty(value) == json.dumps(value, ensure_ascii=False, indent=2)
+        json_backend.set_backend(backend)
+        loads = best_of(args.repeat, lambda: backend.loads(text))
+        dumps = best_of(args.repeat, lambda: backend.dumps_pretty(value))
+        pipeline = best_of(args.repeat, lambda: FileTypeDetector.prettify_content(
+            FileTypeDetector.detect_document(text, FileTypeDetector.DEFAULT_SAMPLE_SIZE)))
+        print(f"{name:<10}{loads * 1000:>8.1f}ms{dumps * 1000:>8.1f}ms{pipeline * 1000:>16.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,20 @@
 
 from .spider import SimpleJSONSpider
 from .file_detector import FileTypeDetector
+from .document import ParsedDocument
+from .session import create_session
+from .batch import CrawlResult
+from .async_spider import AsyncJSONSpider
+from .jobs import IdFile, expand_urls
+from .cache import TypeCache, ValidatorStore
+from .crawl_queue import CrawlQueue
+from .dedup import HashIndex
+from .template import FilenameTemplate
+from .layout import DateLayout, HashShardLayout, TemplateLayout
+from .sinks import JSONLinesSink, TarSink, ZipSink
+from .writer import WriteBehind
+from .ratelimit import RateLimiter
+from .retry import CircuitBreakers, RetryPolicy
 
 try:
     from ._version import __version__
@@ -9,4 +23,4 @@ except ImportError:
     # fallback for development
     __version__ = "0.0.0.dev0"
 
-__all__ = ['SimpleJSONSpider', 'FileTypeDetector']
+__all__ = ['SimpleJSONSpider', 'FileTypeDetector', 'ParsedDocument', 'create_session', 'CrawlResult', 'AsyncJSONSpider', 'IdFile', 'expand_urls', 'ValidatorStore', 'TypeCache', 'CrawlQueue', 'HashIndex', 'FilenameTemplate', 'HashShardLayout', 'DateLayout', 'TemplateLayout', 'JSONLinesSink', 'TarSink', 'ZipSink', 'WriteBehind', 'RateLimiter', 'RetryPolicy', 'CircuitBreakers']
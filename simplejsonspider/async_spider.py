@@ -0,0 +1,201 @@
+# simplejsonspider/async_spider.py
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Tuple
+
+from .batch import FAILED, CrawlResult
+from .ratelimit import parse_retry_after
+from .spider import SimpleJSONSpider
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖：pip install aiohttp
+    aiohttp = None
+
+
+class AsyncJSONSpider(SimpleJSONSpider):
+    """
+    基于 asyncio 的爬虫，单个进程即可保持成千上万个请求同时进行
+
+    构造参数与 SimpleJSONSpider 相同，类型检测、文件名模板和格式化逻辑
+    也完全复用。安装了 aiohttp 时请求由 aiohttp 发出；否则退回到在线程池中
+    使用 requests 会话。类型检测、格式化和写盘在 executor 中执行，
+    不会阻塞事件循环。
+    """
+
+    def __init__(self, *args, executor: Optional[Executor] = None, **kwargs):
+        """
+        Args:
+            executor: 执行检测、格式化和写盘的 executor，默认使用事件循环的默认线程池；
+                设置了 process_pool 时这些工作改由进程池执行
+            其余参数同 SimpleJSONSpider
+        """
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+        self._client = None
+
+    def _client_timeout(self):
+        """把 requests 风格的 timeout 转换为 aiohttp.ClientTimeout"""
+        if self.timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    def _get_client(self):
+        """延迟创建 aiohttp 会话（必须在事件循环中创建）"""
+        if self._client is None or self._client.closed:
+            # 并发数由 run_many 的信号量控制，连接器本身不再限制
+            connector = aiohttp.TCPConnector(limit=0)
+            self._client = aiohttp.ClientSession(connector=connector, timeout=self._client_timeout())
+        return self._client
+
+    async def _fetch_body(self, url: str) -> Tuple[bytes, Optional[str], Optional[str]]:
+        """用 aiohttp 读取完整响应体，返回 (字节, 声明的编码, Content-Type)"""
+        if self.rate_limiter is None:
+            return await self._request_body(url)
+        limiter = self.rate_limiter.for_url(url)
+        await limiter.acquire_async()
+        started = time.monotonic()
+        status, retry_after = None, None
+        try:
+            async with self._get_client().get(url, headers=self.headers, cookies=self.cookies) as resp:
+                status = resp.status
+                retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                resp.raise_for_status()
+                return await resp.read(), resp.charset, resp.headers.get('Content-Type')
+        finally:
+            limiter.release(status=status, latency=time.monotonic() - started, retry_after=retry_after)
+
+    async def _request_body(self, url: str) -> Tuple[bytes, Optional[str], Optional[str]]:
+        async with self._get_client().get(url, headers=self.headers, cookies=self.cookies) as resp:
+            resp.raise_for_status()
+            body = await resp.read()
+            return body, resp.charset, resp.headers.get('Content-Type')
+
+    async def _fetch_with_retries(self, url: str) -> Tuple[bytes, Optional[str], Optional[str]]:
+        """按 retry 策略和熔断器读取响应体，退避时不阻塞事件循环"""
+        breaker = self.circuit_breakers.for_url(url) if self.circuit_breakers is not None else None
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_request()
+            try:
+                result = await self._fetch_body(url)
+            except aiohttp.ClientResponseError as e:
+                error = e
+                status = e.status
+                retry_after = parse_retry_after(e.headers.get('Retry-After') if e.headers else None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+                status, retry_after = None, None
+            except BaseException:
+                # 被取消或其他没有结果的错误：释放半开状态的试探名额，否则之后的请求都会被拒绝
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+            if breaker is not None:
+                if status is None or status == 429 or status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            delay = self.retry.delay_for(attempt, status, retry_after) if self.retry is not None else None
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _run_url_async(self, url: str) -> CrawlResult:
+        """抓取并保存单个 URL"""
+        loop = asyncio.get_event_loop()
+        if aiohttp is None or self.validator_store is not None:
+            # 没有 aiohttp 或需要条件请求时，在线程池中使用 requests 会话（包括流式下载）
+            return await loop.run_in_executor(self.executor, self._run_url, url)
+        body, charset, mime_type = await self._fetch_with_retries(url)
+        encoding = self._resolve_encoding(charset, body)
+        known_type = self._known_type(mime_type, url)
+        if self.process_pool is not None:
+            future = self._submit_body(body, encoding, known_type)
+            filepath, status, digest = await asyncio.wrap_future(future)
+        else:
+            filepath, status, digest = await loop.run_in_executor(
+                self.executor, self._save_body, body, encoding, url, known_type
+            )
+        return CrawlResult(url, filepath, status=status, content_hash=digest)
+
+    async def _crawl_async(self, url: str) -> CrawlResult:
+        """抓取单个 URL，把异常记录在结果中而不是抛出"""
+        try:
+            return await self._run_url_async(url)
+        except Exception as e:
+            return CrawlResult(url, status=FAILED, error=e)
+
+    async def run(self) -> CrawlResult:
+        """
+        抓取 api_url 并保存（设置了 writer 时文件在后台写完，用 flush() 或 aclose() 等待）
+
+        Returns:
+            CrawlResult: 保存路径和状态
+        """
+        return await self._run_url_async(self.api_url)
+
+    async def run_many(self, urls: Optional[Iterable[str]] = None, max_concurrency: int = 100) -> List[CrawlResult]:
+        """
+        并发抓取多个 URL，同时进行的请求数不超过 max_concurrency
+
+        urls 按需读取：只有在有空闲名额时才取下一个 URL，
+        因此可以传入很长的生成器。
+
+        Args:
+            urls: 要抓取的 URL，默认使用 iter_urls() 展开的 URL
+            max_concurrency: 最多同时进行的请求数
+
+        Returns:
+            所有 URL 的 CrawlResult 列表（按完成顺序）
+        """
+        if urls is None:
+            urls = self.iter_urls()
+        self._ensure_pool_size(max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results = []
+        tasks = set()
+
+        def on_done(task):
+            tasks.discard(task)
+            semaphore.release()
+            results.append(task.result())
+
+        for url in urls:
+            await semaphore.acquire()
+            task = asyncio.ensure_future(self._crawl_async(url))
+            tasks.add(task)
+            task.add_done_callback(on_done)
+        if tasks:
+            await asyncio.wait(list(tasks))
+        await self._flush_async()
+        return results
+
+    async def _flush_async(self):
+        """在 executor 中等待后台写盘完成"""
+        if self.writer is not None:
+            await asyncio.get_event_loop().run_in_executor(self.executor, self.flush)
+
+    async def aclose(self):
+        """关闭 aiohttp 会话和自己持有的 requests 会话"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
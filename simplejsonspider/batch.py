@@ -0,0 +1,64 @@
+# simplejsonspider/batch.py
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+# 抓取结果的状态
+SAVED = 'saved'          # 内容已写入文件
+UNCHANGED = 'unchanged'  # 内容未变化（304 或哈希相同），没有写盘
+FAILED = 'failed'        # 抓取或保存失败
+
+
+class CrawlResult(NamedTuple):
+    """单个 URL 的抓取结果"""
+    url: str
+    filepath: Optional[str] = None
+    status: str = SAVED
+    error: Optional[BaseException] = None
+    content_hash: Optional[str] = None  # 写入内容的 sha256，未写盘时为 None
+
+    @property
+    def ok(self) -> bool:
+        """是否抓取并保存成功"""
+        return self.error is None
+
+
+def run_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int,
+    max_pending: Optional[int] = None,
+) -> Iterator[R]:
+    """
+    用线程池并发执行 func，按完成顺序逐个产出结果
+    
+    items 按需消费，同时提交的任务不超过 max_pending 个，
+    因此 items 可以是很长的生成器，不会一次性全部放进内存。
+    
+    Args:
+        func: 对每个元素执行的函数，异常需要由 func 自己处理
+        items: 待处理的元素
+        max_workers: 线程数
+        max_pending: 最多同时提交的任务数，默认为线程数的两倍
+        
+    Yields:
+        func 的返回值
+    """
+    if max_pending is None:
+        max_pending = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(func, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,165 @@
+# simplejsonspider/cache.py
+
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+
+class Validators(NamedTuple):
+    """一个 URL 上次抓取时记录的缓存校验信息"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    filepath: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """生成条件请求头 If-None-Match / If-Modified-Since"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ValidatorStore:
+    """
+    以 URL 为键的持久化校验信息存储（SQLite）
+
+    记录每个 URL 的 ETag、Last-Modified、响应体哈希和保存路径，
+    下次抓取时发送条件请求，服务器返回 304 或内容哈希不变时不再写盘。
+    可以在多个线程之间共享。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 数据库文件路径，':memory:' 表示只保存在内存中
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS validators ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' content_hash TEXT,'
+            ' filepath TEXT,'
+            ' updated_at REAL)'
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Validators]:
+        """读取 URL 的校验信息，没有记录时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, content_hash, filepath FROM validators WHERE url = ?',
+                (url,),
+            ).fetchone()
+        return Validators(*row) if row else None
+
+    def put(self, url: str, validators: Validators):
+        """保存（覆盖）URL 的校验信息"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO validators'
+                ' (url, etag, last_modified, content_hash, filepath, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (url,) + tuple(validators) + (time.time(),),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_VERSION_SEGMENT = re.compile(r'v\d+(\.\d+)*', re.IGNORECASE)
+
+
+def url_pattern(url: str) -> str:
+    """
+    URL 的模式：主机 + 路径（含数字的路径段替换为 ``*``，``v1`` 这样的版本号除外）+ 排序后的查询参数名
+
+    例如 ``https://api.example.com/v1/items/123?id=5&lang=zh`` 的模式为
+    ``api.example.com/v1/items/*?id&lang``，同一个接口的不同 ID 得到相同的模式。
+    """
+    parts = urlsplit(url)
+    segments = [
+        '*' if any(c.isdigit() for c in segment) and not _VERSION_SEGMENT.fullmatch(segment) else segment
+        for segment in parts.path.split('/')
+    ]
+    query = '&'.join(sorted({key for key, _ in parse_qsl(parts.query, keep_blank_values=True)}))
+    return f"{parts.netloc}{'/'.join(segments)}?{query}"
+
+
+class TypeCache:
+    """
+    按 URL 模式记住检测出的内容类型
+
+    同一个接口返回的内容类型通常不变：第一次检测后记录下来，之后同模式的 URL
+    不再检查内容。传入 path 时保存在 SQLite 中，下次抓取时仍然有效。
+    可以在多个线程之间共享。
+    """
+
+    def __init__(self, path: Optional[str] = None, key: Callable[[str], str] = url_pattern):
+        """
+        Args:
+            path: SQLite 数据库文件路径，None 表示只保存在内存中
+            key: 把 URL 转换为模式的函数
+        """
+        self.path = path
+        self.key = key
+        self._types: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS content_types (pattern TEXT PRIMARY KEY, content_type TEXT)'
+            )
+            self._conn.commit()
+            self._types.update(self._conn.execute('SELECT pattern, content_type FROM content_types'))
+
+    def get(self, url: str) -> Optional[str]:
+        """URL 所属模式的内容类型，没有记录时返回 None"""
+        return self._types.get(self.key(url))
+
+    def put(self, url: str, content_type: str):
+        """记录 URL 所属模式的内容类型"""
+        pattern = self.key(url)
+        with self._lock:
+            if self._types.get(pattern) == content_type:
+                return
+            self._types[pattern] = content_type
+            if self._conn is not None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO content_types (pattern, content_type) VALUES (?, ?)',
+                    (pattern, content_type),
+                )
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,111 @@
+# simplejsonspider/charset.py
+
+import codecs
+from typing import Optional
+
+import requests
+
+# 最后一步猜测编码时最多检查的字节数
+DEFAULT_GUESS_SAMPLE_SIZE = 64 * 1024
+
+# 按长度从长到短检查，UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头
+_BOMS = (
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+)
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """从 Content-Type 响应头中取出 charset 参数"""
+    if not content_type:
+        return None
+    for param in content_type.split(';')[1:]:
+        key, sep, value = param.partition('=')
+        if sep and key.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def sniff_bom(head: bytes) -> Optional[str]:
+    """根据字节顺序标记判断编码"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def sniff_json_encoding(head: bytes) -> Optional[str]:
+    """
+    按 JSON 规范（RFC 4627）根据前 4 个字节中 0 字节的位置判断 UTF-16/32
+
+    JSON 文本的前两个字符都是 ASCII，UTF-16/32 编码时会出现固定位置的 0 字节。
+    不是 UTF-16/32 时返回 None。
+    """
+    sample = head[:4]
+    if len(sample) < 4 or b'\x00' not in sample:
+        return None
+    nulls = tuple(byte == 0 for byte in sample)
+    if nulls == (True, True, True, False):
+        return 'utf-32-be'
+    if nulls == (False, True, True, True):
+        return 'utf-32-le'
+    if nulls[0] and nulls[2] and not nulls[1]:
+        return 'utf-16-be'
+    if nulls[1] and nulls[3] and not nulls[0]:
+        return 'utf-16-le'
+    return None
+
+
+def _decodes_as(head: bytes, encoding: str) -> bool:
+    """样本能否按 encoding 解码（末尾被截断的多字节字符不算错误）"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _normalize(encoding: Optional[str]) -> Optional[str]:
+    if not encoding:
+        return None
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def resolve_charset(
+    declared: Optional[str],
+    head: bytes,
+    default: str = 'utf-8',
+    guess: bool = True,
+    sample_size: int = DEFAULT_GUESS_SAMPLE_SIZE,
+) -> str:
+    """
+    确定响应体的字符编码，不对整个响应体做编码猜测
+
+    依次使用：BOM、服务器声明的 charset、JSON 规范的 UTF-16/32 判断、默认编码；
+    BOM 总是优先于声明的编码（与 WHATWG Encoding 标准的解码规则一致）。
+    只有样本不能按默认编码解码且 guess 为 True 时，才对前 sample_size 字节猜测编码。
+
+    Args:
+        declared: 响应头中声明的编码
+        head: 响应体开头的字节
+        default: 默认编码
+        guess: 默认编码不适用时是否猜测
+        sample_size: 猜测时最多检查的字节数
+
+    Returns:
+        codecs 规范化后的编码名
+    """
+    encoding = sniff_bom(head) or _normalize(declared) or sniff_json_encoding(head)
+    if encoding:
+        return encoding
+    sample = head[:sample_size]
+    default = _normalize(default) or 'utf-8'
+    if not guess or _decodes_as(sample, default):
+        return default
+    return _normalize(requests.compat.chardet.detect(sample)['encoding']) or default
@@ -0,0 +1,102 @@
+# simplejsonspider/compression.py
+
+import bz2
+import gzip
+import io
+import lzma
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+
+class Codec:
+    """
+    输出文件的压缩格式
+
+    opener(fileobj, level) 返回一个可写的文件对象，写入的数据压缩后写到 fileobj；
+    关闭它时不关闭 fileobj。
+    """
+
+    def __init__(self, name: str, suffix: str, opener: Callable[[BinaryIO, int], Any], default_level: int):
+        """
+        Args:
+            name: 格式名，如 ``gzip``
+            suffix: 追加在文件扩展名之后的后缀，如 ``.gz``
+            opener: 创建压缩写入对象的函数
+            default_level: 默认压缩级别
+        """
+        self.name = name
+        self.suffix = suffix
+        self.opener = opener
+        self.default_level = default_level
+
+    def open(self, fileobj: BinaryIO, level: Optional[int] = None):
+        """在 fileobj 上打开压缩写入流"""
+        return self.opener(fileobj, self.default_level if level is None else level)
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        """压缩内存中的数据，结果与流式写入相同"""
+        buffer = io.BytesIO()
+        with self.open(buffer, level) as f:
+            f.write(data)
+        return buffer.getvalue()
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+_CODECS: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """注册压缩格式（如第三方压缩库的插件），之后可以用名字引用"""
+    _CODECS[codec.name] = codec
+
+
+def _open_zstd(fileobj: BinaryIO, level: int):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).stream_writer(fileobj, closefd=False)
+
+
+# gzip 固定 mtime=0，相同内容压缩后的字节也相同，去重和哈希比较才有意义；
+# 默认级别偏向速度，需要更高压缩率时可以调高
+register_codec(Codec('gzip', '.gz', lambda f, level: gzip.GzipFile(fileobj=f, mode='wb', compresslevel=level, mtime=0), 6))
+register_codec(Codec('xz', '.xz', lambda f, level: lzma.LZMAFile(f, 'wb', preset=level), 6))
+register_codec(Codec('bz2', '.bz2', lambda f, level: bz2.BZ2File(f, 'wb', compresslevel=level), 9))
+
+
+def get_codec(compression: Union[Codec, str, None]) -> Optional[Codec]:
+    """
+    按名字查找压缩格式
+
+    Args:
+        compression: Codec 对象、格式名（gzip / xz / bz2 / zstd 或已注册的名字）或 None
+
+    Raises:
+        ValueError: 未知的格式
+        ImportError: 使用 zstd 但没有安装 zstandard
+    """
+    if compression is None or isinstance(compression, Codec):
+        return compression
+    codec = _CODECS.get(compression)
+    if codec is None and compression == 'zstd':
+        # 可选依赖：pip install zstandard
+        import zstandard  # noqa: F401
+        codec = Codec('zstd', '.zst', _open_zstd, 3)
+        register_codec(codec)
+    if codec is None:
+        raise ValueError(f"Unknown compression: {compression}")
+    return codec
+
+
+class HashingWriter:
+    """把写入的字节同时交给哈希对象的文件包装（哈希的是实际落盘的字节）"""
+
+    def __init__(self, fileobj: BinaryIO, hasher: Any):
+        self.fileobj = fileobj
+        self.hasher = hasher
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
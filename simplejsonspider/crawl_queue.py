@@ -0,0 +1,179 @@
+# simplejsonspider/crawl_queue.py
+
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .batch import FAILED, CrawlResult
+
+# 尚未抓取（或抓取中断）的任务状态
+PENDING = 'pending'
+
+
+class CrawlQueue:
+    """
+    持久化的抓取任务队列（SQLite，WAL 模式）
+
+    记录每个 URL 的状态、尝试次数、输出路径和内容哈希。进程崩溃或重启后，
+    再次运行只会抓取尚未完成（以及失败）的任务。状态更新在内存中攒批，
+    每 batch_size 条或每 flush_interval 秒提交一次事务；未提交的任务
+    在恢复时仍是 pending，会被重新抓取。
+
+    添加和读取任务都是分批进行的，任务数量再多也不会全部读入内存。
+    可以在多个线程之间共享。
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, flush_interval: float = 5.0):
+        """
+        Args:
+            path: SQLite 数据库文件路径，':memory:' 表示只保存在内存中
+            batch_size: 每个事务最多写入的任务数，也是读取待抓取任务的分页大小
+            flush_interval: 状态更新最多在内存中停留的秒数
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending_updates: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY, '
+            'url TEXT NOT NULL UNIQUE, '
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'filepath TEXT, '
+            'content_hash TEXT, '
+            'error TEXT, '
+            'updated_at REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+        self._conn.commit()
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        添加任务，已存在的 URL 会被忽略（不会重置其状态）
+
+        Args:
+            urls: 要抓取的 URL，可以是很长的生成器
+
+        Returns:
+            新添加的任务数
+        """
+        added = 0
+        urls = iter(urls)
+        while True:
+            chunk = [(url,) for url in itertools.islice(urls, self.batch_size)]
+            if not chunk:
+                return added
+            with self._lock:
+                before = self._conn.total_changes
+                self._conn.executemany('INSERT OR IGNORE INTO jobs (url) VALUES (?)', chunk)
+                self._conn.commit()
+                added += self._conn.total_changes - before
+
+    def iter_pending(self, retry_failed: bool = True, max_attempts: Optional[int] = None) -> Iterator[str]:
+        """
+        按添加顺序逐个生成需要抓取的 URL
+
+        Args:
+            retry_failed: 是否包含之前失败的任务
+            max_attempts: 失败任务的最多尝试次数，达到后不再重试；None 表示不限
+
+        Yields:
+            待抓取的 URL
+        """
+        if not retry_failed:
+            condition, params = 'status = ?', (PENDING,)
+        elif max_attempts is None:
+            condition, params = 'status IN (?, ?)', (PENDING, FAILED)
+        else:
+            condition = '(status = ? OR (status = ? AND attempts < ?))'
+            params = (PENDING, FAILED, max_attempts)
+        last_id = 0
+        while True:
+            # 按主键分页读取，不保持打开的游标，期间可以正常提交状态更新
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT id, url FROM jobs WHERE id > ? AND {condition} ORDER BY id LIMIT ?',
+                    (last_id,) + params + (self.batch_size,),
+                ).fetchall()
+            if not rows:
+                return
+            for _, url in rows:
+                yield url
+            last_id = rows[-1][0]
+
+    def record(self, result: CrawlResult):
+        """
+        记录一个任务的抓取结果（攒批提交）
+
+        Args:
+            result: spider 返回的抓取结果
+        """
+        error = f"{type(result.error).__name__}: {result.error}" if result.error is not None else None
+        with self._lock:
+            self._pending_updates.append(
+                (result.status, result.filepath, result.content_hash, error, time.time(), result.url)
+            )
+            if (len(self._pending_updates) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        """立即提交所有攒批中的状态更新"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending_updates:
+            # 304 等没有写盘的结果保留之前记录的路径和哈希
+            self._conn.executemany(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, '
+                'filepath = COALESCE(?, filepath), content_hash = COALESCE(?, content_hash), '
+                'error = ?, updated_at = ? WHERE url = ?',
+                self._pending_updates,
+            )
+            self._conn.commit()
+            self._pending_updates = []
+        self._last_flush = time.monotonic()
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数（包括尚未提交的更新）"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def reset(self, status: str = FAILED) -> int:
+        """
+        把某个状态的任务重新标记为 pending，尝试次数清零
+
+        Returns:
+            被重置的任务数
+        """
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET status = ?, attempts = 0 WHERE status = ?', (PENDING, status)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        """提交剩余的更新并关闭数据库"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,143 @@
+# simplejsonspider/dedup.py
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from typing import Optional
+
+# 计算已有文件哈希时每次读取的字节数
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> Optional[str]:
+    """计算文件内容的 sha256，文件不存在时返回 None"""
+    hasher = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+    except FileNotFoundError:
+        return None
+    return hasher.hexdigest()
+
+
+class HashIndex:
+    """
+    输出文件路径到内容哈希的持久化索引（SQLite）
+
+    有了索引，判断内容是否变化时无需重新读取已有文件。
+    可以在多个线程之间共享。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 数据库文件路径，':memory:' 表示只保存在内存中
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS hashes (filepath TEXT PRIMARY KEY, content_hash TEXT)'
+        )
+        self._conn.commit()
+
+    def get(self, filepath: str) -> Optional[str]:
+        """读取文件上次写入时的哈希"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content_hash FROM hashes WHERE filepath = ?', (filepath,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, filepath: str, content_hash: str):
+        """记录文件的哈希"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO hashes (filepath, content_hash) VALUES (?, ?)',
+                (filepath, content_hash),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Deduplicator:
+    """
+    按最终写入的内容哈希去重
+
+    内容与已有文件相同时跳过写入；开启内容寻址存储时，内容只在
+    objects 目录中保存一份，各个输出文件是指向它的硬链接。
+    """
+
+    def __init__(self, index: Optional[HashIndex] = None, objects_dir: Optional[str] = None):
+        """
+        Args:
+            index: 哈希索引；为 None 时读取已有文件计算哈希
+            objects_dir: 内容寻址存储目录，None 表示不使用
+        """
+        self.index = index
+        self.objects_dir = objects_dir
+
+    def is_unchanged(self, filepath: str, digest: str) -> bool:
+        """目标文件的内容是否已经是 digest"""
+        if not os.path.exists(filepath):
+            return False
+        known = self.index.get(filepath) if self.index is not None else None
+        if known is None:
+            known = file_digest(filepath)
+        return known == digest
+
+    def object_path(self, digest: str, ext: str = '') -> str:
+        """内容在对象目录中的路径，按哈希前两位分目录"""
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def commit(self, temp_path: str, filepath: str, digest: str):
+        """
+        把已写好的临时文件放到目标位置并更新索引
+
+        Args:
+            temp_path: 已写入完整内容的临时文件，与目标在同一文件系统
+            filepath: 目标路径
+            digest: 内容哈希
+        """
+        if self.objects_dir is None:
+            os.replace(temp_path, filepath)
+        else:
+            obj = self.object_path(digest, os.path.splitext(filepath)[1])
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            if os.path.exists(obj):
+                # 相同内容已经存储过
+                os.unlink(temp_path)
+            else:
+                os.replace(temp_path, obj)
+            self._link(obj, filepath)
+        if self.index is not None:
+            self.index.put(filepath, digest)
+
+    @staticmethod
+    def _link(obj: str, filepath: str):
+        """用硬链接（不支持时复制）原子地替换目标文件"""
+        directory = os.path.dirname(filepath) or '.'
+        fd, link_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        os.close(fd)
+        os.unlink(link_path)
+        try:
+            os.link(obj, link_path)
+        except OSError:
+            shutil.copyfile(obj, link_path)
+        os.replace(link_path, filepath)
@@ -0,0 +1,252 @@
+# simplejsonspider/document.py
+
+import io
+import json
+import re
+import yaml
+from typing import Any, Dict, List, Optional, Union
+
+from . import json_backend
+
+
+# 解析失败的标记（None 是合法的 JSON/YAML 值，不能用来表示失败）
+_INVALID = object()
+
+
+def _parse_json(text: str) -> Any:
+    try:
+        return json_backend.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return _INVALID
+
+
+# 安装了 libyaml 时使用 C 实现的解析器，结果与 yaml.safe_load 相同
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _parse_yaml(text: str) -> Any:
+    try:
+        return yaml.load(text, Loader=_YAML_LOADER)
+    except Exception:
+        return _INVALID
+
+
+# 行首的文档分隔符 ``---``（其后是空白或行尾）
+_YAML_DOCUMENT_START = re.compile(r'^---(?:[ \t]|$)', re.MULTILINE)
+
+
+def _scan_yaml(text: str, limit: int) -> bool:
+    """
+    只检查YAML文本的开头是否合法，不构造对象
+
+    逐个读取解析事件（输入按需读取），越过前 limit 个字符后停止；
+    与 safe_load 一样，出现第二个文档时视为不合法，没有解析的剩余部分中
+    出现行首的 ``---`` 也视为不合法。剩余部分的语法错误检查不到。
+
+    Args:
+        text: YAML 文本
+        limit: 检查的字符数
+
+    Returns:
+        开头部分没有语法错误时返回 True
+    """
+    documents = 0
+    try:
+        for event in yaml.parse(io.StringIO(text), Loader=_YAML_LOADER):
+            if isinstance(event, yaml.DocumentStartEvent):
+                documents += 1
+                if documents > 1:
+                    return False
+            if event.end_mark.index > limit:
+                return not _YAML_DOCUMENT_START.search(text, event.end_mark.index)
+    except Exception:
+        return False
+    return True
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def scan_json_fields(head: str) -> Dict[str, Any]:
+    """
+    从JSON对象的开头片段中提取已经完整出现的字段
+
+    用于流式下载：无需读取整个响应体即可填充文件名模板。
+    遇到超出片段范围的值时停止扫描；被截断的对象值只包含其中已经完整出现的字段，
+    因此 ``data.bvid`` 这样的嵌套路径也能从片段中取值。
+
+    Args:
+        head: JSON 文本的开头片段
+
+    Returns:
+        字段字典；片段不是以对象开头时返回空字典
+    """
+    fields = {}
+    _scan_object(head, _JSON_WHITESPACE.match(head, 0).end(), fields)
+    return fields
+
+
+def _scan_object(head: str, pos: int, fields: Dict[str, Any]):
+    """从 pos 处的对象中收集完整出现的字段，写入 fields"""
+    skip = _JSON_WHITESPACE.match
+    if not head.startswith('{', pos):
+        return
+    pos += 1
+    try:
+        while True:
+            pos = skip(head, pos).end()
+            key, pos = _JSON_DECODER.raw_decode(head, pos)
+            if not isinstance(key, str):
+                return
+            pos = skip(head, pos).end()
+            if not head.startswith(':', pos):
+                return
+            pos = skip(head, pos + 1).end()
+            try:
+                value, pos = _JSON_DECODER.raw_decode(head, pos)
+            except ValueError:
+                # 值超出了片段范围；是对象时收集其中已经完整出现的字段
+                if head.startswith('{', pos):
+                    fields[key] = {}
+                    _scan_object(head, pos, fields[key])
+                return
+            # 值恰好结束在片段末尾时可能被截断（例如数字），不予采用
+            pos = skip(head, pos).end()
+            if pos >= len(head):
+                return
+            fields[key] = value
+            if not head.startswith(',', pos):
+                return
+            pos += 1
+    except ValueError:
+        pass
+
+
+# 路径中的一段：[0] 形式的下标，或以点号分隔的键
+_PATH_TOKEN = re.compile(r'\[(-?\d+)\]|([^.\[\]]+)')
+
+
+def split_path(path: str) -> List[Union[str, int]]:
+    """
+    把 ``data.items[0].id`` 形式的路径拆分为键和下标
+
+    以点号分隔的纯数字段（如 ``items.0``）在访问列表时也会被当作下标。
+    """
+    return [int(index) if index else key
+            for index, key in _PATH_TOKEN.findall(path)]
+
+
+def get_path(data: Any, path: Union[str, List[Union[str, int]]]) -> Any:
+    """
+    按路径读取嵌套的 JSON 值
+
+    Args:
+        data: 解析后的 JSON 对象
+        path: 路径字符串，或 split_path 的结果
+
+    Returns:
+        路径对应的值
+
+    Raises:
+        KeyError: 路径不存在
+    """
+    parts = split_path(path) if isinstance(path, str) else path
+    value = data
+    for part in parts:
+        try:
+            if isinstance(value, list):
+                value = value[int(part)]
+            elif isinstance(value, dict):
+                value = value[str(part)]
+            else:
+                raise KeyError(part)
+        except (IndexError, ValueError, KeyError):
+            raise KeyError(path) from None
+    return value
+
+
+_PARSERS = {
+    'json': _parse_json,
+    'yaml': _parse_yaml,
+    'yml': _parse_yaml,
+}
+
+
+class ParsedDocument:
+    """
+    一次获取、一次解析的响应文档
+
+    由 fetch_content 生成，保存原始文本、检测到的类型以及解析后的值，
+    get_filename / save_content / prettify_content 共享同一份解析结果，
+    大响应体只需解析一次。
+    """
+
+    __slots__ = ('text', 'content_type', '_values')
+
+    def __init__(
+        self,
+        text: str,
+        content_type: str,
+        values: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            text: 原始文本内容
+            content_type: 内容类型，如 'json'、'yaml'、'txt'
+            values: 已有的解析结果，键为格式名（'json'、'yaml'），
+                值为解析后的对象或解析失败标记
+        """
+        self.text = text
+        self.content_type = content_type
+        self._values = dict(values) if values else {}
+
+    @classmethod
+    def coerce(
+        cls,
+        content: Union[str, 'ParsedDocument'],
+        content_type: Optional[str] = None,
+    ) -> 'ParsedDocument':
+        """把字符串内容包装成文档；已经是文档时原样返回"""
+        if isinstance(content, cls):
+            if content_type is None or content_type == content.content_type:
+                return content
+            # 类型被覆盖时沿用已有的解析结果
+            return cls(content.text, content_type, content._values)
+        return cls(content, content_type or 'txt')
+
+    def parse(self, fmt: Optional[str] = None) -> Any:
+        """
+        按指定格式解析文本，结果（包括失败）会被缓存
+
+        Args:
+            fmt: 格式名，默认使用 content_type
+
+        Returns:
+            解析后的对象
+
+        Raises:
+            ValueError: 无法按该格式解析
+        """
+        fmt = fmt or self.content_type
+        if fmt in self._values:
+            value = self._values[fmt]
+        else:
+            parser = _PARSERS.get(fmt)
+            if parser is None:
+                raise ValueError(f"Unsupported format for parsing: {fmt}")
+            value = parser(self.text)
+            self._values[fmt] = value
+        if value is _INVALID:
+            raise ValueError(f"Content is not valid {fmt}")
+        return value
+
+    def try_parse(self, fmt: Optional[str] = None, default: Any = None) -> Any:
+        """与 parse 相同，但解析失败时返回 default"""
+        try:
+            return self.parse(fmt)
+        except ValueError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"ParsedDocument(content_type={self.content_type!r}, size={len(self.text)})"
@@ -1,81 +1,178 @@
 # simplejsonspider/file_detector.py
 
-import json
 import yaml
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Union
+
+from . import json_backend
+from .document import ParsedDocument, _INVALID, _JSON_DECODER, _parse_json, _parse_yaml, _scan_yaml
+from .formats import Format, FormatRegistry, Probe
+
+
+# YAML 文档分隔符所在的行
+_YAML_MARKER_PATTERN = re.compile(r'^[^\S\n]*(?:---|\.\.\.)', re.MULTILINE)
+
+# VTT 时间戳 (00:00:00.000 --> 00:00:00.000)
+_VTT_TIMESTAMP_PATTERN = re.compile(r'\d{2}:\d{2}:\d{2}\.\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}\.\d{3}')
+
+# SRT 的第一条字幕：序号行 + 时间戳 (00:00:00,000 --> 00:00:00,000)
+_SRT_CUE_PATTERN = re.compile(r'\d+[ \t]*\r?\n\d{2}:\d{2}:\d{2},\d{3}[ \t]*-->[ \t]*\d{2}:\d{2}:\d{2},\d{3}')
+
+# HTML 文档的开头
+_HTML_PATTERN = re.compile(r'<(?:!doctype\s+html|html[\s>])', re.IGNORECASE)
+
+# 判断二进制数据时检查的字符数
+_BINARY_SAMPLE_SIZE = 1024
+
+# 安装了 libyaml 时使用 C 实现的序列化
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
 
 
 class FileTypeDetector:
     """文件类型检测器，用于识别不同格式的文件"""
     
+    # 采样检测默认读取的字符数
+    DEFAULT_SAMPLE_SIZE = 64 * 1024
+    
+    # 采样检测最多检查的行数
+    SAMPLE_MAX_LINES = 50
+
+    # 超过这个字符数的内容只检查开头是否为合法YAML（之后的语法错误检查不到），
+    # None（默认）表示总是完整解析
+    YAML_VALIDATE_SIZE: Optional[int] = None
+
+    # Content-Type 到内容类型的映射；值为 None 的通用类型需要检查内容
+    MIME_TYPES: Dict[str, Optional[str]] = {
+        'application/json': 'json',
+        'text/json': 'json',
+        '+json': 'json',
+        'application/yaml': 'yaml',
+        'application/x-yaml': 'yaml',
+        'text/yaml': 'yaml',
+        'text/x-yaml': 'yaml',
+        '+yaml': 'yaml',
+        'text/vtt': 'vtt',
+        'application/xml': 'xml',
+        'text/xml': 'xml',
+        '+xml': 'xml',
+        'text/csv': 'csv',
+        'application/csv': 'csv',
+        'text/tab-separated-values': 'tsv',
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson',
+        'application/x-subrip': 'srt',
+        # 不少接口用 text/html 返回 JSON，HTML 需要检查内容确认
+        'text/html': None,
+        'text/plain': None,
+        'application/octet-stream': None,
+        'binary/octet-stream': None,
+    }
+    
+    # 格式注册表，新格式用 register_format 注册，由所有爬虫共享
+    formats = FormatRegistry()
+    
     @staticmethod
-    def detect_content_type(content: str) -> str:
+    def register_format(fmt: Format):
+        """
+        注册内容格式（检测方法、扩展名和格式化方法），同名格式会被替换
+        
+        Args:
+            fmt: 格式定义
+        """
+        FileTypeDetector.formats.register(fmt)
+    
+    @staticmethod
+    def detect_content_type(content: str, sample_size: Optional[int] = None) -> str:
         """
         检测文件内容的类型
         
         Args:
             content: 文件内容字符串
+            sample_size: 采样检测的字符预算，None 表示检测全文
+                （设置了 YAML_VALIDATE_SIZE 时，较长的内容只检查开头是否为YAML）
             
         Returns:
-            文件类型：'json', 'yaml', 'yml', 'vtt', 'txt'
+            文件类型：'json', 'ndjson', 'yaml', 'vtt', 'srt', 'xml', 'html', 'csv', 'tsv', 'binary', 'txt'
+            或已注册的格式名
         """
-        # 去除首尾空白字符
-        content = content.strip()
+        return FileTypeDetector.detect_document(content, sample_size).content_type
+    
+    @staticmethod
+    def detect_document(content: str, sample_size: Optional[int] = None) -> ParsedDocument:
+        """
+        检测内容类型，并保留检测过程中得到的解析结果
         
-        # 检测 VTT 格式 (需要在YAML之前检测，因为VTT可能被误识别为YAML)
-        if FileTypeDetector._is_vtt(content):
-            return 'vtt'
+        Args:
+            content: 文件内容字符串
+            sample_size: 采样检测的字符预算。设置后只根据开头（和结尾）的
+                片段判断类型，仅在片段看起来是JSON时才完整解析；
+                None 表示检测全文（设置了 YAML_VALIDATE_SIZE 时，
+                较长的内容只检查开头是否为YAML）
+            
+        Returns:
+            ParsedDocument，后续生成文件名和格式化时无需再次解析
+        """
+        if sample_size is not None and len(content) > sample_size:
+            document = FileTypeDetector._sniff_document(content, sample_size)
+            if document is not None:
+                return document
         
-        # 检测 JSON 格式
-        if FileTypeDetector._is_json(content):
-            return 'json'
+        # 去除首尾空白字符
+        stripped = content.strip()
+        if not stripped:
+            return ParsedDocument(content, 'txt')
+        return FileTypeDetector._detect(Probe(content, stripped))
+    
+    @staticmethod
+    def detect_prefix(head: str) -> str:
+        """
+        只根据内容的开头片段检测类型（其余部分尚未读取，例如流式下载）
         
-        # 检测 YAML 格式
-        if FileTypeDetector._is_yaml(content):
-            return 'yaml'
+        开头像JSON时直接判定为JSON，不做完整校验。
         
-        # 检测 XML 格式
-        if FileTypeDetector._is_xml(content):
-            return 'xml'
+        Args:
+            head: 内容开头的片段
+            
+        Returns:
+            文件类型，与 detect_content_type 的取值相同
+        """
+        document = FileTypeDetector._sniff_document(head, len(head), partial=True)
+        return document.content_type if document is not None else 'txt'
+    
+    @staticmethod
+    def _sniff_document(content: str, sample_size: int, partial: bool = False) -> Optional[ParsedDocument]:
+        """
+        根据有限的采样判断类型，检测顺序与全文检测一致
         
-        # 检测 CSV 格式
-        if FileTypeDetector._is_csv(content):
-            return 'csv'
+        Args:
+            content: 完整内容；partial 为 True 时只是内容的开头
+            sample_size: 采样的字符预算
+            partial: content 是否只是开头片段
         
-        # 默认为纯文本
-        return 'txt'
+        Returns:
+            ParsedDocument；采样为空白无法判断时返回 None
+        """
+        # 只复制开头的片段，并截断到最后一个完整行
+        head = content[:sample_size].lstrip()
+        if not head:
+            return None
+        cut = head.rfind('\n')
+        if cut > 0:
+            head = head[:cut]
+        lines = head.split('\n', FileTypeDetector.SAMPLE_MAX_LINES)[:FileTypeDetector.SAMPLE_MAX_LINES]
+        sample = '\n'.join(lines).rstrip()
+        return FileTypeDetector._detect(Probe(content, sample, sample_size, partial))
     
     @staticmethod
-    def _is_json(content: str) -> bool:
-        """检查是否为JSON格式"""
-        try:
-            json.loads(content)
-            return True
-        except (json.JSONDecodeError, ValueError):
-            return False
-    
-    @staticmethod
-    def _is_yaml(content: str) -> bool:
-        """检查是否为YAML格式"""
-        try:
-            yaml.safe_load(content)
-            # 额外检查YAML特征
-            if any(line.strip().startswith(('---', '...')) for line in content.split('\n')):
-                return True
-            # 检查是否有YAML键值对格式
-            if ':' in content and not content.strip().startswith(('{', '[')):
-                return True
-            return False
-        except yaml.YAMLError:
-            return False
-        except Exception:
-            return False
+    def _detect(probe: Probe) -> ParsedDocument:
+        """按注册表的顺序检测，没有格式接受时为纯文本"""
+        content_type = FileTypeDetector.formats.detect(probe) or 'txt'
+        return ParsedDocument(probe.content, content_type, probe.values)
     
     @staticmethod
     def _is_vtt(content: str) -> bool:
         """检查是否为VTT字幕格式"""
-        lines = content.strip().split('\n')
+        lines = content.strip().split('\n', 1)
         if len(lines) < 2:
             return False
         
@@ -84,44 +181,85 @@ class FileTypeDetector:
             return True
         
         # 检查是否包含时间戳格式 (00:00:00.000 --> 00:00:00.000)
-        timestamp_pattern = r'\d{2}:\d{2}:\d{2}\.\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}\.\d{3}'
-        if re.search(timestamp_pattern, content):
+        if _VTT_TIMESTAMP_PATTERN.search(content):
             return True
         
         return False
     
     @staticmethod
-    def _is_xml(content: str) -> bool:
-        """检查是否为XML格式"""
-        content = content.strip()
-        return (content.startswith('<?xml') or 
-                (content.startswith('<') and content.endswith('>')))
+    def _is_csv(content: str) -> bool:
+        """检查是否为CSV格式（逗号或分号分隔）"""
+        return any(FileTypeDetector._has_columns(content, sep) for sep in (',', ';'))
     
     @staticmethod
-    def _is_csv(content: str) -> bool:
-        """检查是否为CSV格式"""
-        lines = content.strip().split('\n')
+    def _is_tsv(content: str) -> bool:
+        """检查是否为TSV格式（制表符分隔）"""
+        return FileTypeDetector._has_columns(content, '\t')
+    
+    @staticmethod
+    def _has_columns(content: str, sep: str) -> bool:
+        """前三行是否都有相同数量的分隔符"""
+        # 只需要前三行
+        lines = content.strip().split('\n', 3)
         if len(lines) < 2:
             return False
         
-        # 检查前几行是否有一致的分隔符
-        first_line = lines[0]
-        separators = [',', ';', '\t']
-        
-        for sep in separators:
-            if sep in first_line:
-                first_count = first_line.count(sep)
-                if first_count > 0:
-                    # 检查后续行是否有相同数量的分隔符
-                    consistent = True
-                    for line in lines[1:3]:  # 检查前几行
-                        if line.count(sep) != first_count:
-                            consistent = False
-                            break
-                    if consistent:
-                        return True
+        first_count = lines[0].count(sep)
+        if first_count == 0:
+            return False
+        # 检查后续行是否有相同数量的分隔符
+        return all(line.count(sep) == first_count for line in lines[1:3])
+    
+    @staticmethod
+    def _is_srt(content: str) -> bool:
+        """检查是否为SRT字幕格式（序号行后紧跟 00:00:00,000 --> 00:00:00,000）"""
+        return _SRT_CUE_PATTERN.match(content) is not None
+    
+    @staticmethod
+    def _is_html(content: str) -> bool:
+        """检查是否为HTML（以 <!DOCTYPE html> 或 <html> 开头）"""
+        return _HTML_PATTERN.match(content) is not None
+    
+    @staticmethod
+    def _is_ndjson(content: str) -> bool:
+        """检查是否为NDJSON：至少两行，每个非空行都是一个JSON值"""
+        lines = [line for line in content.split('\n') if line.strip()]
+        return len(lines) >= 2 and all(_parse_json(line) is not _INVALID for line in lines)
+    
+    @staticmethod
+    def _is_binary(content: str) -> bool:
+        """检查是否为二进制数据：包含 NUL，或控制字符和解码替换字符超过一成"""
+        head = content[:_BINARY_SAMPLE_SIZE]
+        if '\x00' in head:
+            return True
+        suspicious = sum(1 for c in head if c == '\ufffd' or (c < ' ' and c not in '\t\n\r\f\b'))
+        return suspicious * 10 > len(head)
+    
+    @staticmethod
+    def type_from_mime(mime_type: Optional[str], mapping: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        根据 Content-Type 响应头确定内容类型
         
-        return False
+        Args:
+            mime_type: Content-Type 响应头（可以带 charset 等参数）
+            mapping: MIME 类型到内容类型的映射，默认 MIME_TYPES
+            
+        Returns:
+            内容类型；通用类型（如 text/plain、application/octet-stream）或未知类型返回 None，
+            需要检查内容
+        """
+        if not mime_type:
+            return None
+        mime_type = mime_type.split(';', 1)[0].strip().lower()
+        if mapping is None:
+            mapping = FileTypeDetector.MIME_TYPES
+        content_type = mapping.get(mime_type)
+        if content_type is None and mime_type not in mapping:
+            # 结构化语法后缀，如 application/vnd.api+json、application/atom+xml
+            suffix = mime_type.rpartition('+')[2]
+            if suffix != mime_type:
+                content_type = mapping.get('+' + suffix)
+        return content_type
     
     @staticmethod
     def get_file_extension(content_type: str) -> str:
@@ -134,17 +272,8 @@ class FileTypeDetector:
         Returns:
             文件扩展名（包含点号）
         """
-        extension_map = {
-            'json': '.json',
-            'yaml': '.yaml',
-            'yml': '.yml',
-            'vtt': '.vtt',
-            'xml': '.xml',
-            'csv': '.csv',
-            'txt': '.txt'
-        }
-        
-        return extension_map.get(content_type, '.txt')
+        fmt = FileTypeDetector.formats.get(content_type)
+        return fmt.extension if fmt is not None else '.txt'
     
     @staticmethod
     def should_prettify(content_type: str) -> bool:
@@ -157,32 +286,125 @@ class FileTypeDetector:
         Returns:
             是否需要格式化
         """
-        return content_type in ['json', 'yaml', 'yml', 'xml']
+        fmt = FileTypeDetector.formats.get(content_type)
+        return fmt is not None and fmt.prettify is not None
     
     @staticmethod
-    def prettify_content(content: str, content_type: str) -> str:
+    def prettify_content(content: Union[str, ParsedDocument], content_type: Optional[str] = None) -> str:
         """
         格式化内容
         
         Args:
-            content: 原始内容
-            content_type: 内容类型
+            content: 原始内容，或已解析的 ParsedDocument
+            content_type: 内容类型，传入 ParsedDocument 时可省略
             
         Returns:
             格式化后的内容
         """
+        document = ParsedDocument.coerce(content, content_type)
+        fmt = FileTypeDetector.formats.get(document.content_type)
+        if fmt is None or fmt.prettify is None:
+            return document.text
         try:
-            if content_type == 'json':
-                data = json.loads(content)
-                return json.dumps(data, ensure_ascii=False, indent=2)
-            elif content_type in ['yaml', 'yml']:
-                data = yaml.safe_load(content)
-                return yaml.dump(data, default_flow_style=False, allow_unicode=True)
-            elif content_type == 'xml':
-                # 简单的XML格式化（可以考虑使用xml.etree.ElementTree）
-                return content
-            else:
-                return content
+            return fmt.prettify(document)
         except Exception:
             # 格式化失败时返回原内容
-            return content
+            return document.text
+
+
+# 内置格式的检测、扩展名和格式化
+
+# JSON 文本可能的首字符
+_JSON_START = '{["-0123456789tfn'
+
+
+def _json_signature(probe: Probe) -> bool:
+    # 采样检测只在开头像对象或数组时才完整解析
+    return probe.sample[0] in ('{[' if probe.sampled else _JSON_START)
+
+
+def _json_validate(probe: Probe) -> bool:
+    if probe.partial:
+        # 片段通常不完整无法解析；开头的值在片段内就结束、后面还有内容时不是单个JSON文档（如NDJSON）
+        try:
+            _, end = _JSON_DECODER.raw_decode(probe.sample)
+        except ValueError:
+            return True
+        return not probe.sample[end:].strip()
+    value = _parse_json(probe.content if probe.sampled else probe.sample)
+    probe.values['json'] = value
+    return value is not _INVALID
+
+
+def _yaml_signature(probe: Probe) -> bool:
+    sample = probe.sample
+    return (':' in sample and not sample.startswith(('{', '['))) or bool(_YAML_MARKER_PATTERN.search(sample))
+
+
+def _yaml_validate(probe: Probe) -> bool:
+    limit = FileTypeDetector.YAML_VALIDATE_SIZE
+    if limit is not None and len(probe.sample) > limit:
+        # 大段内容只检查开头，拒绝非YAML文本时不必扫描全文；格式化时再完整解析
+        return _scan_yaml(probe.sample, limit)
+    # 采样检测只解析采样行，结果不代表全文，不保留
+    value = _parse_yaml(probe.sample)
+    if not probe.sampled:
+        probe.values['yaml'] = value
+    return value is not _INVALID
+
+
+def _xml_validate(probe: Probe) -> bool:
+    if probe.sample.startswith('<?xml') or probe.partial:
+        return True
+    return probe.tail().endswith('>')
+
+
+def _first_line(probe: Probe) -> str:
+    return probe.sample.partition('\n')[0]
+
+
+def _dump_json(document: ParsedDocument) -> str:
+    return json_backend.dumps_pretty(document.parse('json'))
+
+
+def _dump_yaml(document: ParsedDocument) -> str:
+    value = document.parse('yaml')
+    text = yaml.dump(value, Dumper=_YAML_DUMPER, default_flow_style=False, allow_unicode=True)
+    if '\\U' in text and _YAML_DUMPER is not yaml.SafeDumper:
+        # libyaml 会转义 BMP 之外的字符（如 emoji），改用纯 Python 实现保持可读
+        text = yaml.dump(value, Dumper=yaml.SafeDumper, default_flow_style=False, allow_unicode=True)
+    return text
+
+
+def _keep_xml(document: ParsedDocument) -> str:
+    # 简单的XML格式化（可以考虑使用xml.etree.ElementTree）
+    return document.text
+
+
+# 宽松的格式（二进制、YAML、CSV 等）排在能同时接受同一内容的严格格式之后；
+# 用 before 写明优先级，之后注册的格式也能据此排到正确的位置
+_SUBTITLES_BEFORE = ('ndjson', 'html', 'xml', 'binary', 'yaml', 'csv', 'tsv')
+
+for _fmt in (
+    Format('json', '.json', _json_signature, _json_validate, _dump_json,
+           before=('vtt', 'srt', 'ndjson', 'yaml', 'csv', 'tsv')),
+    Format('vtt', '.vtt', lambda p: p.sample.startswith('WEBVTT') or '-->' in p.sample,
+           lambda p: FileTypeDetector._is_vtt(p.sample), before=('srt',) + _SUBTITLES_BEFORE),
+    Format('srt', '.srt', lambda p: '-->' in p.sample,
+           lambda p: FileTypeDetector._is_srt(p.sample), before=_SUBTITLES_BEFORE),
+    Format('ndjson', '.ndjson', lambda p: p.sample[0] in '{[' and '\n' in p.sample,
+           lambda p: FileTypeDetector._is_ndjson(p.sample), before=('yaml',)),
+    Format('html', '.html', lambda p: p.sample[0] == '<',
+           lambda p: FileTypeDetector._is_html(p.sample), before=('xml', 'binary', 'yaml')),
+    Format('xml', '.xml', lambda p: p.sample[0] == '<', _xml_validate, _keep_xml, before=('binary', 'yaml')),
+    Format('binary', '.bin', lambda p: '\x00' in p.sample[:_BINARY_SAMPLE_SIZE] or '\ufffd' in p.sample[:_BINARY_SAMPLE_SIZE],
+           lambda p: FileTypeDetector._is_binary(p.sample), before=('yaml', 'csv', 'tsv')),
+    Format('yaml', '.yaml', _yaml_signature, _yaml_validate, _dump_yaml, before=('csv', 'tsv')),
+    Format('csv', '.csv', lambda p: ',' in _first_line(p) or ';' in _first_line(p),
+           lambda p: FileTypeDetector._is_csv(p.sample), before=('tsv',)),
+    Format('tsv', '.tsv', lambda p: '\t' in _first_line(p), lambda p: FileTypeDetector._is_tsv(p.sample)),
+    # 不参与检测的类型
+    Format('yml', '.yml', prettify=_dump_yaml),
+    Format('txt', '.txt'),
+):
+    FileTypeDetector.register_format(_fmt)
@@ -0,0 +1,172 @@
+# simplejsonspider/formats.py
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .document import ParsedDocument
+
+
+class Probe:
+    """
+    一次类型检测的输入，在各格式的检查之间共享
+
+    sample 是去掉首尾空白后的检测样本：全文检测时就是全文，采样检测时是开头的若干完整行。
+    检查过程中得到的解析结果放在 values 中（键为格式名），由生成的 ParsedDocument 保留。
+    """
+
+    __slots__ = ('content', 'sample', 'sample_size', 'partial', 'values')
+
+    def __init__(self, content: str, sample: str, sample_size: Optional[int] = None, partial: bool = False):
+        """
+        Args:
+            content: 完整内容；partial 为 True 时只是内容的开头
+            sample: 检测样本（非空）
+            sample_size: 采样检测的字符预算，None 表示全文检测
+            partial: content 是否只是开头片段（例如流式下载）
+        """
+        self.content = content
+        self.sample = sample
+        self.sample_size = sample_size
+        self.partial = partial
+        self.values: Dict[str, Any] = {}
+
+    @property
+    def sampled(self) -> bool:
+        """是否只检查了样本"""
+        return self.sample_size is not None
+
+    def tail(self) -> str:
+        """内容的结尾（采样检测时只取最后 sample_size 个字符）"""
+        if not self.sampled:
+            return self.sample
+        return self.content[-self.sample_size:].rstrip()
+
+
+class Format:
+    """
+    一种内容格式：检测方法、文件扩展名和格式化方法
+
+    检测分两步：signature 是廉价的必要条件（例如首字符），不满足时不会调用 validate；
+    validate 做完整的判断。两者都为 None 的格式不参与检测（如 ``txt``、``yml``），
+    只提供扩展名和格式化方法。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        extension: str,
+        signature: Optional[Callable[[Probe], bool]] = None,
+        validate: Optional[Callable[[Probe], bool]] = None,
+        prettify: Optional[Callable[[ParsedDocument], str]] = None,
+        before: Iterable[str] = (),
+    ):
+        """
+        Args:
+            name: 格式名，即 content_type，如 ``json``
+            extension: 文件扩展名（包含点号）
+            signature: 廉价的特征检查
+            validate: 完整检查，可以把解析结果写入 probe.values
+            prettify: 格式化函数，None 表示原样保存
+            before: 必须排在本格式之后检测的格式名。两种格式可能同时接受一段内容时
+                （例如合法的 JSON 也是合法的 YAML），用它固定优先级
+        """
+        self.name = name
+        self.extension = extension
+        self.signature = signature
+        self.validate = validate
+        self.prettify = prettify
+        self.before = tuple(before)
+
+    @property
+    def detectable(self) -> bool:
+        return self.signature is not None or self.validate is not None
+
+    def matches(self, probe: Probe) -> bool:
+        if self.signature is not None and not self.signature(probe):
+            return False
+        return self.validate is None or self.validate(probe)
+
+    def __repr__(self) -> str:
+        return f"Format({self.name!r})"
+
+
+class FormatRegistry:
+    """
+    格式注册表，按注册顺序和 before 约束决定检测顺序
+
+    检测的开销主要由 signature 控制：特征不满足的格式不会执行完整检查，
+    因此排在前面的格式对大多数内容只花一次首字符或子串判断。
+    可能同时接受同一内容的两种格式用 before 固定先后。可以在多个线程之间共享。
+    """
+
+    def __init__(self):
+        self._formats: Dict[str, Format] = {}
+        self._order: List[Format] = []
+        self._lock = threading.Lock()
+
+    def register(self, fmt: Format):
+        """
+        注册格式；同名格式会被替换，新格式在满足 before 约束的前提下排在已有格式之后
+
+        Raises:
+            ValueError: before 约束形成了环
+        """
+        with self._lock:
+            previous = self._formats.get(fmt.name)
+            self._formats[fmt.name] = fmt
+            try:
+                self._order = self._sorted()
+            except ValueError:
+                if previous is None:
+                    del self._formats[fmt.name]
+                else:
+                    self._formats[fmt.name] = previous
+                raise
+
+    def get(self, name: str) -> Optional[Format]:
+        """按名字查找格式"""
+        return self._formats.get(name)
+
+    def order(self) -> List[str]:
+        """当前的检测顺序"""
+        return [fmt.name for fmt in self._order]
+
+    def detect(self, probe: Probe) -> Optional[str]:
+        """
+        按检测顺序返回第一个接受 probe 的格式名，都不接受时返回 None
+        """
+        for fmt in self._order:
+            if fmt.matches(probe):
+                return fmt.name
+        return None
+
+    def _sorted(self) -> List[Format]:
+        """
+        在 before 约束下排序：按注册顺序排列，必须排在某个格式之前的格式紧接着插到它前面
+        """
+        formats = [fmt for fmt in self._formats.values() if fmt.detectable]
+        # 每个格式之前必须先检测的格式（按注册顺序）
+        earlier: Dict[str, List[Format]] = {fmt.name: [] for fmt in formats}
+        for fmt in formats:
+            for later in fmt.before:
+                if later in earlier:
+                    earlier[later].append(fmt)
+        order: List[Format] = []
+        placed = set()
+        visiting = set()
+
+        def place(fmt: Format):
+            if fmt.name in placed:
+                return
+            if fmt.name in visiting:
+                raise ValueError("Format 'before' constraints contain a cycle")
+            visiting.add(fmt.name)
+            for other in earlier[fmt.name]:
+                place(other)
+            visiting.discard(fmt.name)
+            placed.add(fmt.name)
+            order.append(fmt)
+
+        for fmt in formats:
+            place(fmt)
+        return order
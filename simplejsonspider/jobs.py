@@ -0,0 +1,74 @@
+# simplejsonspider/jobs.py
+
+import string
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+class IdFile:
+    """
+    按行读取的参数文件，每行一个值（忽略空行）
+    
+    每次迭代都重新打开文件逐行读取，不会把整个文件读入内存，
+    因此可以作为 URL 模板中任意位置的参数来源。
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+
+    def __iter__(self) -> Iterator[str]:
+        with open(self.path, 'r', encoding=self.encoding) as f:
+            for line in f:
+                value = line.strip()
+                if value:
+                    yield value
+
+
+def url_fields(template: str) -> List[str]:
+    """按出现顺序返回 URL 模板中的占位符名称（去重）"""
+    fields = []
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name is not None and field_name not in fields:
+            fields.append(field_name)
+    return fields
+
+
+def _lazy_product(sources: List[Iterable[Any]]) -> Iterator[tuple]:
+    """与 itertools.product 相同，但第一个来源按需迭代，不会被一次性读入内存"""
+    if not sources:
+        yield ()
+        return
+    first, rest = sources[0], sources[1:]
+    # 内层来源需要重复迭代，一次性的迭代器只能先物化
+    rest = [list(source) if iter(source) is source else source for source in rest]
+    for value in first:
+        for tail in _lazy_product(rest):
+            yield (value,) + tail
+
+
+def expand_urls(template: str, params: Dict[str, Iterable[Any]]) -> Iterator[str]:
+    """
+    把带占位符的 URL 模板展开成 URL 生成器
+    
+    多个占位符时按笛卡尔积展开，第一个占位符在最外层。
+    第一个占位符的参数来源按需读取，可以是 range、生成器或 IdFile，
+    例如 ``range(1, 10000001)`` 不会生成完整的 URL 列表；
+    其余占位符的来源需要能重复迭代（range、list、IdFile 等），
+    一次性的迭代器会被先读入内存。
+    
+    Args:
+        template: URL 模板，如 ``https://api.example.com/x/{id}``
+        params: 占位符名称到参数来源的映射
+        
+    Yields:
+        展开后的 URL
+        
+    Raises:
+        ValueError: 模板中的占位符没有对应的参数来源
+    """
+    fields = url_fields(template)
+    missing = [field for field in fields if field not in params]
+    if missing:
+        raise ValueError(f"No parameter source for URL placeholder(s): {', '.join(missing)}")
+    for values in _lazy_product([params[field] for field in fields]):
+        yield template.format(**dict(zip(fields, values)))
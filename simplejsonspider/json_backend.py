@@ -0,0 +1,231 @@
+# simplejsonspider/json_backend.py
+
+import json
+import math
+import os
+import re
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+# 选择 JSON 后端的环境变量：auto（默认，安装了 orjson 时使用 orjson）、stdlib、orjson 或已注册的名字
+BACKEND_ENV = 'SIMPLEJSONSPIDER_JSON_BACKEND'
+
+
+class JSONBackend:
+    """
+    JSON 解析和格式化后端
+
+    loads 的结果与 json.loads 相同；dumps_pretty 的输出与
+    ``json.dumps(obj, ensure_ascii=False, indent=2)`` 逐字节相同。
+    """
+
+    def __init__(self, name: str, loads: Callable[[str], Any], dumps_pretty: Callable[[Any], str]):
+        """
+        Args:
+            name: 后端名，如 ``orjson``
+            loads: 解析函数，失败时抛出 ValueError（json.JSONDecodeError）
+            dumps_pretty: 缩进 2 个空格、不转义非 ASCII 字符的序列化函数
+        """
+        self.name = name
+        self.loads = loads
+        self.dumps_pretty = dumps_pretty
+
+    def __repr__(self) -> str:
+        return f"JSONBackend({self.name!r})"
+
+
+def _stdlib_dumps_pretty(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+STDLIB = JSONBackend('stdlib', json.loads, _stdlib_dumps_pretty)
+
+_BACKENDS: Dict[str, JSONBackend] = {'stdlib': STDLIB}
+
+
+def register_backend(backend: JSONBackend):
+    """注册 JSON 后端（如其他加速库的适配），之后可以用名字选择"""
+    _BACKENDS[backend.name] = backend
+
+
+class _NonFinite(float):
+    """
+    标准库解析出的 NaN / Infinity
+
+    orjson 会把非有限浮点数写成 null；它不能序列化 float 的子类，
+    遇到这类值时回退到标准库，输出与原来相同的 NaN / Infinity。
+    """
+
+
+def _parse_float(text: str) -> float:
+    value = float(text)
+    return value if math.isfinite(value) else _NonFinite(value)
+
+
+# 把数字都映射为 0、保留 . - " e、其余字节映射为空格的转换表：
+# 用 bytes.translate 和子串查找代替正则扫描，几 MB 的文本只需几毫秒
+_DIGIT_CLASSES = bytes(
+    ord('0') if ord('0') <= i <= ord('9') else i if i in b'.-"e' else ord(' ')
+    for i in range(256)
+)
+
+# orjson 把超出 64 位的整数解析为浮点数（丢失精度）：20 位以上的整数或 19 位以上的负整数交给标准库。
+# 小数部分（前面是 .）和字符串开头（前面是 "）的长数字串不算
+_LONG_INTEGERS = (b' ' + b'0' * 20, b'-' + b'0' * 19)
+
+# 可能溢出为 Infinity 的浮点数字面量
+_HUGE_FLOAT = re.compile(r'[eE]\+?[0-9]{3}')
+
+# orjson 与标准库写法不同的浮点数：指数形式（1e16 / 1e+16、2.5e-7 / 2.5e-07）
+# 和 [1e-5, 1e-4) 之间的小数（0.00001 / 1e-05）
+_EXPONENT_HINTS = (b'0e0', b'0e-0')
+_SMALL_FLOAT_HINTS = (b' 0.0000', b'-0.0000')
+# 平均每多少字节超过一个需要改写的浮点数时直接使用标准库
+_DENSE_FLOATS = 1024
+_ORJSON_FLOAT = re.compile(rb'-?(?:[0-9]+(?:\.[0-9]+)?e-?[0-9]+|0\.0000[0-9]+)')
+
+
+def _has_long_integer(data: bytes) -> bool:
+    classes = data.translate(_DIGIT_CLASSES)
+    return classes.startswith(b'0' * 20) or any(needle in classes for needle in _LONG_INTEGERS)
+
+
+def _compat_loads(text: str) -> Any:
+    """与 json.loads 结果相同，非有限浮点数标记为 _NonFinite"""
+    if _HUGE_FLOAT.search(text):
+        return json.loads(text, parse_constant=_NonFinite, parse_float=_parse_float)
+    return json.loads(text, parse_constant=_NonFinite)
+
+
+def _find_all(data: bytes, needles: Tuple[bytes, ...]) -> List[int]:
+    positions = []
+    for needle in needles:
+        pos = data.find(needle)
+        while pos >= 0:
+            positions.append(pos)
+            pos = data.find(needle, pos + 1)
+    return positions
+
+
+def _float_candidates(data: bytes) -> List[int]:
+    """orjson 格式化输出中可能需要改写的浮点数的位置"""
+    positions = _find_all(data.translate(_DIGIT_CLASSES), _EXPONENT_HINTS)
+    positions += _find_all(data, _SMALL_FLOAT_HINTS)
+    if data.startswith(_SMALL_FLOAT_HINTS[0][1:]):
+        # 顶层的小数前面没有空格
+        positions.append(0)
+    return positions
+
+
+def _python_floats(data: bytes, positions: List[int]) -> str:
+    """
+    把 orjson 格式化输出中的浮点数改写为标准库的写法
+
+    缩进输出中每个数字都单独占据一行的末尾（之后最多有一个逗号），
+    只检查含有候选位置的行；字符串以引号结尾，不会被误改。
+    """
+    pieces = []
+    done = 0
+    line_end = -1
+    for pos in sorted(positions):
+        if pos < line_end:
+            continue
+        line_start = data.rfind(b'\n', 0, pos) + 1
+        line_end = data.find(b'\n', pos)
+        if line_end < 0:
+            line_end = len(data)
+        value_start = max(line_start, data.rfind(b' ', line_start, line_end) + 1)
+        value_end = line_end - 1 if data[line_end - 1:line_end] == b',' else line_end
+        if _ORJSON_FLOAT.fullmatch(data, value_start, value_end):
+            pieces.append(data[done:value_start])
+            pieces.append(repr(float(data[value_start:value_end])).encode('ascii'))
+            done = value_end
+    pieces.append(data[done:])
+    return b''.join(pieces).decode('utf-8')
+
+
+def _make_orjson() -> JSONBackend:
+    import orjson
+
+    # 标准库不支持的类型（datetime、dataclass、内置类型的子类）交给标准库处理
+    options = (orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME
+               | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+    def loads(text: str) -> Any:
+        try:
+            long_integer = _has_long_integer(text.encode('utf-8'))
+        except UnicodeEncodeError:
+            # 孤立的代理字符
+            long_integer = True
+        if not long_integer:
+            try:
+                return orjson.loads(text)
+            except orjson.JSONDecodeError:
+                # NaN、转义的孤立代理字符、嵌套过深等标准库能解析的内容
+                pass
+        return _compat_loads(text)
+
+    def dumps_pretty(obj: Any) -> str:
+        try:
+            data = orjson.dumps(obj, option=options)
+        except TypeError:
+            # 非字符串键、超出 64 位的整数、NaN 标记、嵌套过深等
+            return _stdlib_dumps_pretty(obj)
+        positions = _float_candidates(data)
+        if not positions:
+            return data.decode('utf-8')
+        if len(positions) * _DENSE_FLOATS > len(data):
+            # 以指数形式的浮点数为主的数据，逐个改写比标准库还慢
+            return _stdlib_dumps_pretty(obj)
+        return _python_floats(data, positions)
+
+    return JSONBackend('orjson', loads, dumps_pretty)
+
+
+def get_backend(name: str = 'auto') -> JSONBackend:
+    """
+    按名字查找 JSON 后端
+
+    Args:
+        name: ``auto``（安装了 orjson 时使用 orjson，否则使用标准库）、``stdlib``、``orjson`` 或已注册的名字
+
+    Raises:
+        ValueError: 未知的后端
+        ImportError: 指定了 orjson 但没有安装
+    """
+    if name == 'auto':
+        try:
+            return get_backend('orjson')
+        except ImportError:
+            return STDLIB
+    backend = _BACKENDS.get(name)
+    if backend is None and name == 'orjson':
+        # 可选依赖：pip install orjson
+        backend = _make_orjson()
+        register_backend(backend)
+    if backend is None:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    return backend
+
+
+_current = get_backend(os.environ.get(BACKEND_ENV, 'auto'))
+
+
+def set_backend(backend: Union[JSONBackend, str]):
+    """切换全局使用的 JSON 后端（JSONBackend 对象或名字）"""
+    global _current
+    _current = backend if isinstance(backend, JSONBackend) else get_backend(backend)
+
+
+def current_backend() -> JSONBackend:
+    """当前使用的 JSON 后端"""
+    return _current
+
+
+def loads(text: str) -> Any:
+    """用当前后端解析 JSON"""
+    return _current.loads(text)
+
+
+def dumps_pretty(obj: Any) -> str:
+    """用当前后端格式化 JSON，输出与 json.dumps(obj, ensure_ascii=False, indent=2) 相同"""
+    return _current.dumps_pretty(obj)
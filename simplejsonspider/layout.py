@@ -0,0 +1,144 @@
+# simplejsonspider/layout.py
+
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Union
+
+from .template import FilenameTemplate
+
+
+def _normalize(subdir: str) -> str:
+    """把 ``a/b`` 形式的子目录转换为本地路径，去掉空段并禁止 ``..`` 跳出输出目录"""
+    parts = []
+    for part in subdir.replace('\\', '/').split('/'):
+        if part in ('', '.'):
+            continue
+        parts.append('__' if part == '..' else part)
+    return os.path.join(*parts) if parts else ''
+
+
+class Layout(ABC):
+    """
+    输出目录布局：决定文件保存在 storage_dir 下的哪个子目录
+
+    子类实现 subdir()，返回用 ``/`` 分隔的相对路径，空字符串表示直接放在 storage_dir 中。
+    """
+
+    @abstractmethod
+    def subdir(self, filename: str, data: Dict[str, Any]) -> str:
+        """文件所在的子目录，用 ``/`` 分隔"""
+
+    def path_for(self, storage_dir: str, filename: str, data: Dict[str, Any]) -> str:
+        """文件的完整路径"""
+        return os.path.join(storage_dir, _normalize(self.subdir(filename, data)), filename)
+
+
+class HashShardLayout(Layout):
+    """
+    按文件名哈希分片：``ab/cd/<文件名>``
+
+    同一个文件名总是落在同一个目录中；depth=2、width=2 时共 65536 个目录，
+    每个目录的文件数随总数均匀增长。
+    """
+
+    def __init__(self, depth: int = 2, width: int = 2):
+        """
+        Args:
+            depth: 目录层数
+            width: 每层目录名取哈希的字符数（十六进制）
+        """
+        self.depth = depth
+        self.width = width
+
+    def subdir(self, filename: str, data: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+        return '/'.join(digest[i * self.width:(i + 1) * self.width] for i in range(self.depth))
+
+
+class DateLayout(Layout):
+    """按保存日期分区，如 ``2024/05/17/<文件名>``"""
+
+    def __init__(self, fmt: str = '%Y/%m/%d', utc: bool = True):
+        """
+        Args:
+            fmt: strftime 格式，``/`` 分隔目录层级
+            utc: 使用 UTC 时间还是本地时间
+        """
+        self.fmt = fmt
+        self.utc = utc
+
+    def subdir(self, filename: str, data: Dict[str, Any]) -> str:
+        return time.strftime(self.fmt, time.gmtime() if self.utc else time.localtime())
+
+
+class TemplateLayout(Layout):
+    """
+    用模板从 JSON 内容生成子目录，如 ``{data.owner.mid}/{data.pubdate}``
+
+    模板语法与文件名模板相同（支持嵌套路径和默认值），字段值中的路径分隔符会被替换；
+    内容不是 JSON 对象或字段缺失且没有默认值时，文件放在 storage_dir 中。
+    """
+
+    def __init__(self, template: str):
+        """
+        Args:
+            template: 子目录模板，``/`` 分隔目录层级
+        """
+        self.template = FilenameTemplate(template)
+
+    def subdir(self, filename: str, data: Dict[str, Any]) -> str:
+        try:
+            return self.template.render(data)
+        except (KeyError, TypeError):
+            return ''
+
+
+def resolve_layout(layout: Union[Layout, str, None]) -> Optional[Layout]:
+    """
+    把 layout 参数转换为 Layout 对象
+
+    Args:
+        layout: Layout 对象；``'hash'`` 表示按哈希分片，``'date'`` 表示按日期分区，
+            其他字符串作为子目录模板；None 表示所有文件直接放在 storage_dir 中
+    """
+    if layout is None or isinstance(layout, Layout):
+        return layout
+    if layout == 'hash':
+        return HashShardLayout()
+    if layout == 'date':
+        return DateLayout()
+    return TemplateLayout(layout)
+
+
+class DirectoryCache:
+    """
+    记录已经创建过的目录，避免每写一个文件都调用 os.makedirs
+
+    目录在进程外被删除时需要调用 clear()。可以在多个线程之间共享。
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        """
+        Args:
+            max_entries: 最多记录的目录数，超过后清空重新记录
+        """
+        self.max_entries = max_entries
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, directory: str):
+        """确保目录存在"""
+        if directory in self._created:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            if len(self._created) >= self.max_entries:
+                self._created.clear()
+            self._created.add(directory)
+
+    def clear(self):
+        with self._lock:
+            self._created.clear()
@@ -0,0 +1,76 @@
+# simplejsonspider/pagination.py
+
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from .document import ParsedDocument, get_path
+
+# 翻页函数：(当前页文档, 当前页URL, 解析后的 Link 响应头) -> 下一页URL 或 None
+NextPage = Callable[[ParsedDocument, str, Dict[str, Dict[str, str]]], Optional[str]]
+
+
+def set_query_param(url: str, name: str, value: Any) -> str:
+    """设置（或替换）URL 中的查询参数"""
+    parts = urlsplit(url)
+    query = [(key, val) for key, val in parse_qsl(parts.query, keep_blank_values=True) if key != name]
+    query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def next_from_link_header(document: ParsedDocument, url: str, links: Dict[str, Dict[str, str]]) -> Optional[str]:
+    """从 ``Link: <...>; rel="next"`` 响应头获取下一页"""
+    link = links.get('next')
+    if not link or not link.get('url'):
+        return None
+    return urljoin(url, link['url'])
+
+
+def next_from_path(path: str, cursor_param: Optional[str] = None) -> NextPage:
+    """
+    从 JSON 中指定路径读取下一页
+    
+    Args:
+        path: 下一页链接或游标在 JSON 中的路径，如 ``paging.next``
+        cursor_param: 设置时路径上的值被当作游标，写入当前 URL 的该查询参数；
+            否则当作（可以是相对的）下一页 URL
+            
+    Returns:
+        翻页函数；路径不存在或值为空时返回 None 表示没有下一页
+    """
+    def next_page(document: ParsedDocument, url: str, links: Dict[str, Dict[str, str]]) -> Optional[str]:
+        try:
+            value = get_path(document.parse('json'), path)
+        except (KeyError, ValueError):
+            return None
+        if value is None or value == '' or value is False:
+            return None
+        if cursor_param:
+            return set_query_param(url, cursor_param, value)
+        return urljoin(url, str(value))
+    return next_page
+
+
+def page_number(param: str, items_path: str, start: int = 1, step: int = 1) -> NextPage:
+    """
+    按 ``page``/``offset`` 查询参数翻页，直到某一页的数据列表为空
+    
+    Args:
+        param: 页码或偏移量参数名
+        items_path: 每页数据列表在 JSON 中的路径
+        start: 当前 URL 没有该参数时使用的起始值
+        step: 每页递增的值（按偏移量翻页时为每页条数）
+        
+    Returns:
+        翻页函数
+    """
+    def next_page(document: ParsedDocument, url: str, links: Dict[str, Dict[str, str]]) -> Optional[str]:
+        try:
+            items = get_path(document.parse('json'), items_path)
+        except (KeyError, ValueError):
+            return None
+        if not items:
+            return None
+        current = dict(parse_qsl(urlsplit(url).query)).get(param)
+        current = int(current) if current is not None else start
+        return set_query_param(url, param, current + step)
+    return next_page
@@ -0,0 +1,114 @@
+# simplejsonspider/postprocess.py
+
+from concurrent.futures import Executor, Future
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8：大响应体也通过 pickle 传递
+    shared_memory = None
+
+# 响应体达到该字节数时通过共享内存传给子进程，而不是 pickle 后经管道复制
+SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+# 子进程中按配置缓存的爬虫实例（每个进程只创建一次）
+_WORKER_SPIDERS: Dict[str, Any] = {}
+
+
+class SharedBody:
+    """放在共享内存中的响应体，可以 pickle 后传给子进程"""
+
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    def __getstate__(self):
+        return self.name, self.size
+
+    def __setstate__(self, state):
+        self.name, self.size = state
+
+    @classmethod
+    def create(cls, data: bytes) -> Tuple['SharedBody', Any]:
+        """
+        把数据复制到新的共享内存块
+
+        Returns:
+            tuple: (句柄, SharedMemory 对象)；用完后由创建方 close 并 unlink
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        return cls(shm.name, len(data)), shm
+
+    def read(self) -> bytes:
+        """在子进程中读取数据"""
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(shm.buf[:self.size])
+        finally:
+            shm.close()
+
+
+def save_body(
+    key: str,
+    options: Dict[str, Any],
+    body: Union[bytes, SharedBody],
+    encoding: str,
+    known_type: Optional[str] = None,
+) -> Tuple[str, str, str]:
+    """
+    在子进程中检测类型、格式化并保存响应体
+
+    Args:
+        key: 爬虫配置的标识，同一进程中相同 key 的配置只构造一次爬虫
+        options: 构造 SimpleJSONSpider 的参数（只包含与保存有关的配置）
+        body: 响应体字节，或共享内存中的响应体
+        encoding: 响应体的编码
+        known_type: 根据响应头确定的内容类型，有值时不再检测
+
+    Returns:
+        tuple: (文件路径, 状态, 写入内容的 sha256)
+    """
+    spider = _WORKER_SPIDERS.get(key)
+    if spider is None:
+        from .spider import SimpleJSONSpider
+        spider = _WORKER_SPIDERS[key] = SimpleJSONSpider(api_url='', **options)
+    if isinstance(body, SharedBody):
+        body = body.read()
+    return spider._save_body(body, encoding, known_type=known_type)
+
+
+def submit_body(
+    executor: Executor,
+    key: str,
+    options: Dict[str, Any],
+    body: bytes,
+    encoding: str,
+    known_type: Optional[str] = None,
+) -> Future:
+    """
+    把响应体交给进程池处理
+
+    大响应体放在共享内存中传递，任务结束后释放。
+
+    Returns:
+        save_body 结果的 Future
+    """
+    if shared_memory is None or len(body) < SHARED_MEMORY_THRESHOLD:
+        return executor.submit(save_body, key, options, body, encoding, known_type)
+    handle, shm = SharedBody.create(body)
+    try:
+        future = executor.submit(save_body, key, options, handle, encoding, known_type)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+
+    def release(_):
+        shm.close()
+        shm.unlink()
+
+    future.add_done_callback(release)
+    return future
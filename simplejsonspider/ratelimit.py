@@ -0,0 +1,249 @@
+# simplejsonspider/ratelimit.py
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# 表示主机过载、需要退避的状态码
+THROTTLE_STATUS_CODES = frozenset([429, 503])
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数；无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+
+    以 rate 个/秒的速度补充令牌，最多积累 burst 个；acquire 在没有令牌时阻塞。
+    rate 可以在运行时调整。
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量，默认等于 rate（至少为 1）
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, tokens: float) -> float:
+        """尝试取出令牌，成功返回 0，否则返回需要等待的秒数"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """取出令牌，不足时等待"""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """acquire 的 asyncio 版本，等待时不阻塞事件循环"""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    单个主机的自适应限流器
+
+    并发数按 AIMD（加性增、乘性减）调整：请求成功且延迟正常时缓慢增加并发上限，
+    遇到 429/503、连接错误或延迟过高时减半；收到 Retry-After 时暂停该主机。
+    设置了 rate 时同时用令牌桶限制每秒请求数，退避时速率同样减半，之后逐步恢复到 rate。
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        initial_concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 64,
+        latency_threshold: Optional[float] = None,
+        decrease_factor: float = 0.5,
+    ):
+        """
+        Args:
+            rate: 每秒最多请求数，None 表示不限速
+            burst: 令牌桶容量
+            initial_concurrency: 初始并发上限
+            min_concurrency: 并发上限的最小值
+            max_concurrency: 并发上限的最大值
+            latency_threshold: 响应时间（秒）超过该值视为主机吃力，None 表示不看延迟
+            decrease_factor: 退避时并发上限和速率乘以的系数
+        """
+        self.max_rate = rate
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = float(min_concurrency)
+        self.max_concurrency = float(max_concurrency)
+        self.latency_threshold = latency_threshold
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        # 等待名额的 asyncio 任务：(事件循环, future)，名额释放时唤醒
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_enter(self) -> Optional[float]:
+        """在持有锁时调用：有名额时占用并返回 None，否则返回暂停剩余的秒数（不大于 0 表示等待释放）"""
+        wait = self.paused_until - time.monotonic()
+        if wait <= 0 and self.in_flight < max(1, int(self.limit)):
+            self.in_flight += 1
+            return None
+        return wait
+
+    def acquire(self):
+        """等待并发名额和令牌"""
+        with self._cond:
+            while True:
+                wait = self._try_enter()
+                if wait is None:
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+        if self.bucket is not None:
+            self.bucket.acquire()
+
+    async def acquire_async(self):
+        """
+        acquire 的 asyncio 版本：等待时不占用线程；
+        等待中被取消时不占用名额
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            with self._cond:
+                wait = self._try_enter()
+                if wait is None:
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, wait if wait > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+        if self.bucket is not None:
+            try:
+                await self.bucket.acquire_async()
+            except BaseException:
+                # 请求还没有发出，只归还名额，不调整并发上限
+                with self._cond:
+                    self.in_flight -= 1
+                    self._notify()
+                raise
+
+    def _notify(self):
+        """在持有锁时调用：唤醒等待名额的线程和 asyncio 任务"""
+        self._cond.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        self._async_waiters.clear()
+
+    def release(
+        self,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        归还名额，并根据结果调整并发上限和速率
+
+        Args:
+            status: 响应状态码，None 表示连接失败或超时
+            latency: 响应耗时（秒）
+            retry_after: Retry-After 要求等待的秒数
+        """
+        with self._cond:
+            self.in_flight -= 1
+            overloaded = (
+                status is None
+                or status in THROTTLE_STATUS_CODES
+                or retry_after is not None
+                or (self.latency_threshold is not None and latency is not None
+                    and latency > self.latency_threshold)
+            )
+            if overloaded:
+                self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                if self.bucket is not None:
+                    self.bucket.rate = max(self.max_rate / 64, self.bucket.rate * self.decrease_factor)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            elif status < 500:
+                # 每个“窗口”（约 limit 个成功请求）并发上限加 1
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                if self.bucket is not None and self.bucket.rate < self.max_rate:
+                    self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 16)
+            self._notify()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    """
+    按主机（host:port）区分的自适应限流器集合
+
+    每个主机使用独立的 AIMDLimiter，参数相同；可以在多个爬虫实例和线程之间共享。
+    """
+
+    def __init__(self, **limiter_options):
+        """
+        Args:
+            limiter_options: 传给每个主机的 AIMDLimiter 的参数
+        """
+        self.limiter_options = limiter_options
+        self._hosts: Dict[str, AIMDLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> AIMDLimiter:
+        """获取 URL 所在主机的限流器"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = AIMDLimiter(**self.limiter_options)
+            return limiter
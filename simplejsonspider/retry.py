@@ -0,0 +1,173 @@
+# simplejsonspider/retry.py
+
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+# 默认重试的状态码
+DEFAULT_RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(requests.RequestException):
+    """主机的熔断器处于打开状态，请求被直接拒绝"""
+
+
+class RetryPolicy:
+    """
+    重试策略：指数退避 + 随机抖动，并遵守 Retry-After
+
+    第 n 次重试前等待 ``random.uniform(0, min(max_backoff, backoff_factor * 2 ** n))`` 秒
+    （jitter=False 时不取随机数），服务器给出 Retry-After 时至少等待该时长。
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 60.0,
+        jitter: bool = True,
+        status_codes: Iterable[int] = DEFAULT_RETRY_STATUS_CODES,
+        retry_connection_errors: bool = True,
+    ):
+        """
+        Args:
+            max_retries: 最多重试次数（不含第一次请求）
+            backoff_factor: 退避基数（秒）
+            max_backoff: 单次退避的上限（秒），不限制 Retry-After
+            jitter: 是否在退避时间内随机取值，避免大量请求同时重试
+            status_codes: 需要重试的 HTTP 状态码
+            retry_connection_errors: 是否重试连接错误和超时
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes)
+        self.retry_connection_errors = retry_connection_errors
+
+    def delay_for(
+        self,
+        attempt: int,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+        计算下一次重试前的等待时间
+
+        Args:
+            attempt: 已经重试的次数
+            status: 失败请求的状态码，None 表示连接错误或超时
+            retry_after: Retry-After 要求等待的秒数
+
+        Returns:
+            等待秒数；不应重试时返回 None
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status is None:
+            if not self.retry_connection_errors:
+                return None
+        elif status not in self.status_codes:
+            return None
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内的请求直接失败；
+    之后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 打开后多少秒进入半开状态
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        请求前检查
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下已有试探请求
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Circuit breaker is open")
+                self.state = self.HALF_OPEN
+            if self._trial_in_flight:
+                raise CircuitOpenError("Circuit breaker is half-open, trial request in flight")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        """记录一次成功（主机正常响应）"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """请求没有结果就结束了（如被取消）：不改变状态，只允许下一个请求重新试探"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """记录一次失败（连接错误、超时、5xx 或 429）"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """
+    按主机（host:port）区分的熔断器集合
+
+    可以在多个爬虫实例和线程之间共享。
+    """
+
+    def __init__(self, **breaker_options):
+        """
+        Args:
+            breaker_options: 传给每个主机的 CircuitBreaker 的参数
+        """
+        self.breaker_options = breaker_options
+        self._hosts: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        """获取 URL 所在主机的熔断器"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._hosts.get(host)
+            if breaker is None:
+                breaker = self._hosts[host] = CircuitBreaker(**self.breaker_options)
+            return breaker
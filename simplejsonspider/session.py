@@ -0,0 +1,72 @@
+# simplejsonspider/session.py
+
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Tuple, Union
+
+# 默认超时（连接超时, 读取超时），单位秒
+DEFAULT_TIMEOUT = (10, 60)
+
+# 每个主机保持的连接数
+DEFAULT_POOL_SIZE = 10
+
+Timeout = Union[float, Tuple[float, float], None]
+
+
+def create_session(
+    pool_connections: int = DEFAULT_POOL_SIZE,
+    pool_maxsize: int = DEFAULT_POOL_SIZE,
+    headers: Optional[Dict[str, str]] = None,
+    cookies: Optional[Dict[str, str]] = None,
+    pool_block: bool = False,
+) -> requests.Session:
+    """
+    创建带连接池的 requests.Session
+    
+    同一个 Session 可以在多个 SimpleJSONSpider 实例和线程之间共享，
+    对同一主机的请求会复用 keep-alive 连接，省去重复的 TCP/TLS 握手。
+    
+    Args:
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机连接池的最大连接数，并发抓取时应不小于线程数
+        headers: 会话级别的请求头
+        cookies: 会话级别的 cookies
+        pool_block: 连接池用尽时是否阻塞等待，而不是新建临时连接
+        
+    Returns:
+        配置好的 requests.Session
+    """
+    session = requests.Session()
+    mount_pool(session, pool_connections, pool_maxsize, pool_block)
+    if headers:
+        session.headers.update(headers)
+    if cookies:
+        session.cookies.update(cookies)
+    return session
+
+
+def mount_pool(
+    session: requests.Session,
+    pool_connections: int = DEFAULT_POOL_SIZE,
+    pool_maxsize: int = DEFAULT_POOL_SIZE,
+    pool_block: bool = False,
+):
+    """
+    为会话的 http/https 挂载连接池，并关闭被替换的旧连接池
+    
+    Args:
+        session: requests.Session
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机连接池的最大连接数
+        pool_block: 连接池用尽时是否阻塞等待
+    """
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    replaced = {id(old): old for prefix, old in session.adapters.items() if prefix in ('http://', 'https://')}
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    for old in replaced.values():
+        old.close()
@@ -0,0 +1,297 @@
+# simplejsonspider/sinks.py
+
+import glob
+import io
+import json
+import os
+import re
+import sqlite3
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+# 默认单个分段文件的大小上限
+DEFAULT_SEGMENT_SIZE = 1024 * 1024 * 1024
+
+
+class Sink(ABC):
+    """
+    把多个响应打包写入少量大文件的输出目标
+
+    每条记录写入当前分段文件的末尾，分段达到 max_bytes 后切换到新文件。
+    index.db（SQLite）记录每条记录按 filename_template 得到的名字及其所在的
+    分段和位置，可以用 read() 按名字取回单条记录。可以在多个线程之间共享。
+
+    子类实现分段文件的格式：_open_segment、_append、_flush_segment、_close_segment，
+    需要还原记录内容时覆盖 _read。缺少任何一个抽象方法的子类不能实例化。
+    """
+
+    # 分段文件的扩展名
+    extension = ''
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = DEFAULT_SEGMENT_SIZE,
+        prefix: str = 'segment',
+        index_batch_size: int = 1000,
+    ):
+        """
+        Args:
+            directory: 分段文件和索引所在的目录
+            max_bytes: 单个分段文件的大小上限，None 表示不切分
+            prefix: 分段文件名前缀，文件名形如 ``segment-00000.jsonl``
+            index_batch_size: 索引每写入多少条记录提交一次事务
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.index_batch_size = index_batch_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self._index.execute('PRAGMA journal_mode=WAL')
+        self._index.execute('PRAGMA synchronous=NORMAL')
+        self._index.execute(
+            'CREATE TABLE IF NOT EXISTS records ('
+            'name TEXT PRIMARY KEY, segment TEXT, offset INTEGER, length INTEGER, '
+            'url TEXT, content_type TEXT, saved_at REAL)'
+        )
+        self._index.commit()
+        self._uncommitted = 0
+        # 已有的分段保持不变，从下一个编号开始写新分段
+        self._number = self._last_segment_number() + 1
+        self._segment_path = None
+        self._segment_size = 0
+
+    def _last_segment_number(self) -> int:
+        pattern = re.compile(re.escape(self.prefix) + r'-(\d+)' + re.escape(self.extension) + '$')
+        numbers = [-1]
+        for path in glob.glob(os.path.join(glob.escape(self.directory), self.prefix + '-*')):
+            match = pattern.search(os.path.basename(path))
+            if match:
+                numbers.append(int(match.group(1)))
+        return max(numbers)
+
+    def _rotate(self):
+        if self._segment_path is not None:
+            self._close_segment()
+            self._commit_index()
+        self._segment_path = os.path.join(self.directory, f"{self.prefix}-{self._number:05d}{self.extension}")
+        self._number += 1
+        self._segment_size = 0
+        self._open_segment(self._segment_path)
+
+    def write(
+        self,
+        name: str,
+        data: bytes,
+        url: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        追加一条记录
+
+        Args:
+            name: 记录名（filename_template 生成的文件名），同名记录以最后一次为准
+            data: 记录内容
+            url: 响应的 URL
+            content_type: 内容类型
+
+        Returns:
+            记录所在的分段文件路径
+        """
+        with self._lock:
+            if self._segment_path is None or (
+                self.max_bytes is not None and self._segment_size >= self.max_bytes
+            ):
+                self._rotate()
+            offset, length, end = self._append(name, data, url, content_type)
+            self._segment_size = end
+            self._index.execute(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, os.path.basename(self._segment_path), offset, length, url, content_type, time.time()),
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= self.index_batch_size:
+                self._commit_index()
+            return self._segment_path
+
+    def locate(self, name: str) -> Optional[Tuple[str, int, int]]:
+        """
+        查找记录的位置
+
+        Returns:
+            tuple: (分段文件路径, 偏移, 长度)；不存在时返回 None
+        """
+        with self._lock:
+            row = self._index.execute(
+                'SELECT segment, offset, length FROM records WHERE name = ?', (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return os.path.join(self.directory, row[0]), row[1], row[2]
+
+    def read(self, name: str) -> bytes:
+        """
+        按名字读取一条记录的内容
+
+        Raises:
+            KeyError: 记录不存在
+        """
+        location = self.locate(name)
+        if location is None:
+            raise KeyError(name)
+        segment, offset, length = location
+        with self._lock:
+            if segment == self._segment_path:
+                # 当前分段还在写入，先把缓冲区写到文件
+                self._flush_segment()
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            return self._read(f.read(length))
+
+    def _commit_index(self):
+        self._index.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        """关闭当前分段并提交索引"""
+        with self._lock:
+            if self._segment_path is not None:
+                self._close_segment()
+                self._segment_path = None
+            self._commit_index()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @abstractmethod
+    def _open_segment(self, path: str):
+        """创建并打开新的分段文件"""
+
+    @abstractmethod
+    def _append(self, name: str, data: bytes, url: Optional[str], content_type: Optional[str]) -> Tuple[int, int, int]:
+        """写入一条记录，返回 (记录偏移, 记录长度, 写入后的分段大小)"""
+
+    @abstractmethod
+    def _flush_segment(self):
+        """把当前分段的缓冲区写到文件"""
+
+    @abstractmethod
+    def _close_segment(self):
+        """关闭当前分段文件"""
+
+    def _read(self, raw: bytes) -> bytes:
+        """把分段中的原始字节还原为记录内容"""
+        return raw
+
+
+class JSONLinesSink(Sink):
+    """
+    JSON Lines 输出：每个响应一行 ``{"url", "filename", "type", "body"}``
+
+    body 是内容文本；索引记录的是整行的位置，read() 返回 body。
+    """
+
+    extension = '.jsonl'
+
+    def _open_segment(self, path: str):
+        self._file = open(path, 'ab')
+
+    def _append(self, name, data, url, content_type):
+        record = {
+            'url': url,
+            'filename': name,
+            'type': content_type,
+            'body': data.decode('utf-8', errors='replace'),
+        }
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        offset = self._file.tell()
+        self._file.write(line)
+        return offset, len(line), offset + len(line)
+
+    def _flush_segment(self):
+        self._file.flush()
+
+    def _close_segment(self):
+        self._file.close()
+
+    def _read(self, raw: bytes) -> bytes:
+        return json.loads(raw)['body'].encode('utf-8')
+
+
+class TarSink(Sink):
+    """tar 分段输出，每个响应是归档中的一个文件；索引记录文件数据的位置"""
+
+    extension = '.tar'
+
+    def _open_segment(self, path: str):
+        self._tar = tarfile.open(path, 'w', format=tarfile.PAX_FORMAT)
+
+    def _append(self, name, data, url, content_type):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+        # 数据按 512 字节块补齐，紧接在头部之后
+        end = self._tar.offset
+        padded = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        return end - padded, len(data), end
+
+    def _flush_segment(self):
+        self._tar.fileobj.flush()
+
+    def _close_segment(self):
+        self._tar.close()
+
+
+class ZipSink(Sink):
+    """
+    zip 分段输出，每个响应是归档中的一个文件
+
+    compression 为 zipfile.ZIP_STORED（默认）或 zipfile.ZIP_DEFLATED；
+    索引记录压缩数据的位置，未关闭的分段也能按名字读取。
+    """
+
+    extension = '.zip'
+
+    def __init__(self, directory: str, compression: int = zipfile.ZIP_STORED, **kwargs):
+        """
+        Args:
+            compression: zipfile.ZIP_STORED 或 zipfile.ZIP_DEFLATED
+            其余参数同 Sink
+        """
+        if compression not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise ValueError("ZipSink supports ZIP_STORED and ZIP_DEFLATED only")
+        self.compression = compression
+        super().__init__(directory, **kwargs)
+
+    def _open_segment(self, path: str):
+        self._zip = zipfile.ZipFile(path, 'w', compression=self.compression)
+
+    def _append(self, name, data, url, content_type):
+        self._zip.writestr(name, data)
+        info = self._zip.infolist()[-1]
+        end = self._zip.fp.tell()
+        # 可定位的文件不写数据描述符，压缩数据紧接在写入位置之前
+        return end - info.compress_size, info.compress_size, end
+
+    def _flush_segment(self):
+        self._zip.fp.flush()
+
+    def _close_segment(self):
+        self._zip.close()
+
+    def _read(self, raw: bytes) -> bytes:
+        if self.compression == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(raw, -15)
+        return raw
@@ -1,29 +1,95 @@
 # simplejsonspider/spider.py
 
+import codecs
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+import hashlib
+import itertools
 import os
+import tempfile
+import time
+import uuid
+import zlib
 import requests
-import json
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+from . import json_backend
+from .batch import FAILED, SAVED, UNCHANGED, CrawlResult, run_concurrently
+from .cache import TypeCache, Validators, ValidatorStore
+from .charset import DEFAULT_GUESS_SAMPLE_SIZE, header_charset, resolve_charset
+from .compression import Codec, HashingWriter, get_codec
+from .crawl_queue import CrawlQueue
+from .dedup import Deduplicator, HashIndex
+from .jobs import expand_urls
+from .layout import DirectoryCache, Layout, resolve_layout
+from .postprocess import submit_body
+from .pagination import NextPage, next_from_link_header, next_from_path
+from .document import ParsedDocument, scan_json_fields
 from .file_detector import FileTypeDetector
+from .sinks import Sink
+from .ratelimit import RateLimiter, parse_retry_after
+from .retry import CircuitBreakers, CircuitOpenError, RetryPolicy
+from .template import FilenameTemplate, compile_template
+from .writer import WriteBehind, write_atomic
+from .session import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, Timeout, create_session, mount_pool
+
+_NOT_JSON = object()
+
+# 流式下载时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# gzip 原样保存时，为检测类型而解压的开头字节数
+PASSTHROUGH_SAMPLE_SIZE = 64 * 1024
+
 
 class SimpleJSONSpider:
     def __init__(
         self,
         api_url: str,
-        filename_template: str,
+        filename_template: Union[str, FilenameTemplate],
         storage_dir: str,
         headers: Optional[Dict[str, str]] = None,
         cookies: Optional[Dict[str, str]] = None,
         file_extension: Optional[str] = None,
         auto_detect_type: bool = True,
         prettify_content: bool = True,
+        detect_sample_size: Optional[int] = None,
+        stream_threshold: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        pool_maxsize: int = DEFAULT_POOL_SIZE,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        url_params: Optional[Dict[str, Iterable[Any]]] = None,
+        validator_store: Union[ValidatorStore, str, None] = None,
+        dedup: bool = False,
+        dedup_index: Union[HashIndex, str, None] = None,
+        content_addressed: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
+        process_pool: Optional[Executor] = None,
+        layout: Union[Layout, str, None] = None,
+        sink: Optional[Sink] = None,
+        compression: Union[Codec, str, None] = None,
+        compression_level: Optional[int] = None,
+        gzip_passthrough: bool = False,
+        writer: Optional[WriteBehind] = None,
+        default_encoding: str = 'utf-8',
+        guess_encoding: bool = True,
+        keep_bytes: bool = False,
+        trust_content_type: bool = True,
+        mime_types: Optional[Dict[str, Optional[str]]] = None,
+        type_cache: Union[TypeCache, str, None] = None,
     ):
         self.api_url = api_url
+        # api_url 中占位符的参数来源，用于 iter_urls / run_many 批量展开
+        self.url_params = url_params
         self.filename_template = filename_template
         self.storage_dir = storage_dir
         self.file_extension = file_extension
         self.auto_detect_type = auto_detect_type
         self.prettify_content = prettify_content
+        # 自动检测时的采样预算（字符数），None 表示检测全文
+        self.detect_sample_size = detect_sample_size
+        # 响应体超过该字节数时流式写入磁盘（不格式化），None（默认）表示始终在内存中处理
+        self.stream_threshold = stream_threshold
         self.headers = headers or {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -33,71 +99,453 @@ class SimpleJSONSpider:
             "Referer": "https://www.bilibili.com/",
         }
         self.cookies = cookies or {}
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        # headers/cookies 随每个请求发送（之后对它们的修改同样生效），不修改会话本身
+        if session is None:
+            # 自己持有的会话，多次 run() 复用连接
+            self.session = create_session(pool_maxsize=pool_maxsize)
+            self._owns_session = True
+        else:
+            self.session = session
+            self._owns_session = False
+        # 条件请求的校验信息存储，可以传入 ValidatorStore 或数据库路径
+        if isinstance(validator_store, str):
+            validator_store = ValidatorStore(validator_store)
+        self.validator_store = validator_store
+        # 按最终内容哈希去重：相同内容不重写；content_addressed 时相同内容只存一份
+        if isinstance(dedup_index, str):
+            dedup_index = HashIndex(dedup_index)
+        if dedup or dedup_index is not None or content_addressed:
+            objects_dir = os.path.join(self.storage_dir, '.objects') if content_addressed else None
+            self.deduplicator = Deduplicator(dedup_index, objects_dir)
+        else:
+            self.deduplicator = None
+        # 按主机自适应限速，可以在多个实例之间共享
+        self.rate_limiter = rate_limiter
+        # 失败重试策略和按主机的熔断器（熔断器可以在多个实例之间共享）
+        self.retry = retry
+        self.circuit_breakers = circuit_breakers
+        # 在子进程中执行类型检测、格式化和写盘的进程池（如 ProcessPoolExecutor）
+        self.process_pool = process_pool
+        self._worker_key = None
+        # 输出目录布局（哈希分片、日期分区或子目录模板），None 表示平铺在 storage_dir 中
+        self.layout = resolve_layout(layout)
+        self._directories = DirectoryCache()
+        # 打包输出（JSONLinesSink / TarSink / ZipSink），None 表示每个响应一个文件
+        if sink is not None and process_pool is not None:
+            raise ValueError("sink cannot be combined with process_pool")
+        self.sink = sink
+        # 输出文件的压缩格式（gzip / xz / bz2 / zstd），文件名加上对应后缀
+        self.codec = get_codec(compression)
+        self.compression_level = compression_level
+        # compression='gzip' 且不格式化时，服务器发送的 gzip 响应体原样写盘
+        self.gzip_passthrough = gzip_passthrough
+        # 后台写盘（WriteBehind），抓取与磁盘 I/O 重叠；None 表示在当前线程写盘
+        self.writer = writer
+        # 没有声明 charset、BOM 时使用的编码；guess_encoding 时样本不能按它解码才猜测编码
+        self.default_encoding = default_encoding
+        self.guess_encoding = guess_encoding
+        # 不需要处理文本时原样保存响应体字节（不转码、不格式化）
+        self.keep_bytes = keep_bytes
+        # 根据 Content-Type 响应头确定类型，只有通用类型才检查内容；mime_types 补充或覆盖默认映射
+        self.trust_content_type = trust_content_type
+        self.mime_types = dict(FileTypeDetector.MIME_TYPES, **(mime_types or {}))
+        # 按 URL 模式记住检测出的类型，之后同模式的 URL 不再检测；字符串表示 SQLite 文件路径
+        self.type_cache = TypeCache(type_cache) if isinstance(type_cache, str) else type_cache
         os.makedirs(self.storage_dir, exist_ok=True)
 
-    def fetch_content(self) -> Tuple[str, str]:
+    @property
+    def filename_template(self) -> str:
+        """文件名模板；赋值时重新编译"""
+        return self._template.template
+
+    @filename_template.setter
+    def filename_template(self, template: Union[str, FilenameTemplate]):
+        self._template = compile_template(template)
+
+    def close(self):
+        """等待后台写盘完成，关闭自己创建的会话；共享的会话由调用方负责关闭"""
+        try:
+            self.flush()
+        finally:
+            if self._owns_session:
+                self.session.close()
+
+    def flush(self):
+        """等待设置的 writer 把已提交的文件写完，后台写盘失败时抛出异常"""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _send(self, url: str, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """发出 GET 请求，响应体留待按需读取"""
+        return self.session.get(
+            url,
+            headers=dict(self.headers, **extra_headers) if extra_headers else self.headers,
+            cookies=self.cookies,
+            stream=True,
+            timeout=self.timeout,
+        )
+
+    def _open_response(self, url: str, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """发起请求（设置了 rate_limiter 时先等待该主机的名额），响应体留待按需读取"""
+        if self.rate_limiter is None:
+            resp = self._send(url, extra_headers)
+        else:
+            limiter = self.rate_limiter.for_url(url)
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                resp = self._send(url, extra_headers)
+            except requests.RequestException:
+                limiter.release(status=None)
+                raise
+            limiter.release(
+                status=resp.status_code,
+                latency=time.monotonic() - started,
+                retry_after=parse_retry_after(resp.headers.get('Retry-After')),
+            )
+        resp.raise_for_status()
+        return resp
+
+    def _known_type(self, mime_type: Optional[str], url: Optional[str]) -> Optional[str]:
         """
-        获取API响应内容并检测文件类型
+        不检查内容就能确定的类型：先看 Content-Type 响应头，再看按 URL 模式记住的类型
         
         Returns:
-            tuple: (content, content_type)
+            内容类型；需要检查内容时返回 None
         """
-        resp = requests.get(self.api_url, headers=self.headers, cookies=self.cookies)
-        resp.raise_for_status()
-        
-        # 获取响应内容
-        content = resp.text
+        if self.file_extension or not self.auto_detect_type:
+            return None
+        if self.trust_content_type:
+            content_type = FileTypeDetector.type_from_mime(mime_type, self.mime_types)
+            if content_type is not None:
+                return content_type
+        if self.type_cache is not None and url:
+            return self.type_cache.get(url)
+        return None
+
+    def _response_type(self, resp: requests.Response, url: Optional[str] = None) -> Optional[str]:
+        return self._known_type(resp.headers.get('Content-Type'), url or resp.url)
+
+    def _build_document(
+        self,
+        content: str,
+        known_type: Optional[str] = None,
+        url: Optional[str] = None,
+    ) -> ParsedDocument:
+        """
+        根据配置确定内容类型，生成文档
         
+        Args:
+            content: 内容文本
+            known_type: 响应头或类型缓存给出的类型，有值时不再检查内容
+            url: 响应的 URL，检测出的类型按它的模式记入 type_cache
+        """
         # 如果指定了文件扩展名，则使用指定的扩展名
         if self.file_extension:
             # 移除开头的点号（如果有）
             ext = self.file_extension.lstrip('.')
-            content_type = ext
+            return ParsedDocument(content, ext)
+        elif known_type is not None:
+            return ParsedDocument(content, known_type)
         elif self.auto_detect_type:
             # 自动检测文件类型
-            content_type = FileTypeDetector.detect_content_type(content)
+            document = FileTypeDetector.detect_document(content, self.detect_sample_size)
+            if self.type_cache is not None and url:
+                self.type_cache.put(url, document.content_type)
+            return document
         else:
             # 默认尝试解析为JSON
-            try:
-                json.loads(content)
-                content_type = 'json'
-            except (json.JSONDecodeError, ValueError):
-                content_type = 'txt'
+            document = ParsedDocument(content, 'json')
+            if document.try_parse('json', _NOT_JSON) is _NOT_JSON:
+                document = ParsedDocument.coerce(document, 'txt')
+            return document
+
+    def fetch_document(self) -> ParsedDocument:
+        """
+        获取API响应内容，检测文件类型并只解析一次
         
-        return content, content_type
+        Returns:
+            ParsedDocument: 包含原始文本、内容类型和解析结果
+        """
+        return self._with_retries(self.api_url, self._fetch_text_document, self.api_url)
+
+    def _fetch_text_document(self, url: str) -> ParsedDocument:
+        resp = self._open_response(url)
+        try:
+            return self._build_document(self._response_text(resp), self._response_type(resp, url), url)
+        finally:
+            resp.close()
+
+    def _read_head(self, resp: requests.Response) -> Tuple[bytes, Optional[Iterator[bytes]]]:
+        """
+        读取响应体，直到读完或超过流式阈值
+        
+        Returns:
+            tuple: (已读取的字节, 剩余数据块的迭代器)；响应体已读完时迭代器为 None
+        """
+        chunks = resp.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        # 打包输出的记录需要完整内容，不流式写盘
+        threshold = self.stream_threshold if self.sink is None else None
+        length = resp.headers.get('Content-Length')
+        if threshold is not None and length and length.isdigit() and int(length) > threshold:
+            # 已知响应体很大，只读取第一个数据块用于类型检测
+            return next(chunks, b''), chunks
+        
+        buffered = []
+        size = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if threshold is not None and size > threshold:
+                return b''.join(buffered), chunks
+        return b''.join(buffered), None
+
+    def _response_encoding(self, resp: requests.Response, head: bytes) -> str:
+        """
+        确定响应的字符编码，只检查开头的样本，不对整个响应体猜测编码
+
+        只有 Content-Type 中的 charset 参数算作声明的编码；不读取 resp.encoding，
+        因为 requests 会给没有 charset 的 application/json 和 text/* 填上默认值。
+        """
+        return self._resolve_encoding(header_charset(resp.headers.get('Content-Type')), head)
+
+    def _resolve_encoding(self, encoding: Optional[str], head: bytes) -> str:
+        """依次使用声明的编码、BOM/JSON 判断、默认编码，最后才对有限的样本猜测"""
+        return resolve_charset(encoding, head, self.default_encoding, self.guess_encoding)
+
+    def _response_text(self, resp: requests.Response) -> str:
+        """读取并解码完整的响应体（代替会对全文猜测编码的 resp.text）"""
+        body = resp.content
+        return str(body, self._response_encoding(resp, body), errors='replace')
+
+    def _stream_to_file(
+        self,
+        resp: requests.Response,
+        head: bytes,
+        rest: Iterator[bytes],
+        hasher: Optional[Any] = None,
+    ) -> Tuple[str, str, str]:
+        """
+        把大响应体流式写入磁盘，内存占用与响应大小无关
+        
+        类型根据开头片段检测；文件名模板只能使用开头片段中完整出现的
+        JSON 字段（包括嵌套对象中的字段）；流式写入的内容不做格式化。
+        
+        Args:
+            hasher: 可选的 hashlib 对象，用原始响应字节更新
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        encoding = self._response_encoding(resp, head)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        head_text = decoder.decode(head)
+        document = self._prefix_document(head_text, self._response_type(resp), resp.url)
+        filepath = self._output_path(self.get_filename(document), document)
+        
+        if hasher is not None:
+            rest = self._hashing(rest, hasher)
+        if encoding == 'utf-8' or self.keep_bytes or document.content_type == 'binary':
+            # UTF-8 内容、二进制内容（或要求保留原始字节时）直接写入原始字节，不经过解码
+            chunks = itertools.chain([head], rest)
+        else:
+            chunks = itertools.chain(
+                [head_text.encode('utf-8')],
+                (decoder.decode(chunk).encode('utf-8') for chunk in rest),
+                [decoder.decode(b'', final=True).encode('utf-8')],
+            )
+        return self._write_file(filepath, chunks, document.content_type)
+
+    def _can_pass_through(self, resp: requests.Response) -> bool:
+        """响应是否可以原样保存为 .gz 文件（gzip_passthrough 模式，不格式化，且服务器发送 gzip 编码）"""
+        return (
+            self.gzip_passthrough
+            and self.codec is not None and self.codec.name == 'gzip'
+            and not self.prettify_content
+            and self.sink is None
+            and resp.headers.get('Content-Encoding', '').strip().lower() == 'gzip'
+        )
+
+    def _pass_through(self, resp: requests.Response, hasher: Optional[Any] = None) -> Tuple[str, str, str]:
+        """
+        把 gzip 编码的响应体原样写入 .gz 文件，不解压、解码和重新压缩
+        
+        只解压开头的 PASSTHROUGH_SAMPLE_SIZE 字节用于类型检测和文件名模板；
+        内容不是 UTF-8 时退回到解压、转码后流式写入。
+        
+        Args:
+            hasher: 可选的 hashlib 对象，用压缩的原始字节更新
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        raw_chunks = resp.raw.stream(STREAM_CHUNK_SIZE, decode_content=False)
+        if hasher is not None:
+            raw_chunks = self._hashing(raw_chunks, hasher)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        buffered = []
+        head = b''
+        for chunk in raw_chunks:
+            buffered.append(chunk)
+            head += decompressor.decompress(chunk, PASSTHROUGH_SAMPLE_SIZE - len(head))
+            if len(head) >= PASSTHROUGH_SAMPLE_SIZE or decompressor.eof:
+                break
+        chunks = itertools.chain(buffered, raw_chunks)
+        
+        encoding = self._response_encoding(resp, head)
+        if encoding not in ('utf-8', 'ascii'):
+            decompressed = self._gunzip(chunks)
+            return self._stream_to_file(resp, next(decompressed, b''), decompressed)
+        
+        head_text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(head)
+        document = self._prefix_document(head_text, self._response_type(resp), resp.url)
+        filepath = self._output_path(self.get_filename(document), document)
+        return self._write_file(filepath, chunks, document.content_type, compress=False)
+
+    @staticmethod
+    def _gunzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """逐块解压 gzip 数据"""
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    def _prefix_document(
+        self,
+        head_text: str,
+        known_type: Optional[str] = None,
+        url: Optional[str] = None,
+    ) -> ParsedDocument:
+        """根据响应开头的片段检测类型，JSON 字段只包含片段中完整出现的字段"""
+        if self.file_extension:
+            content_type = self.file_extension.lstrip('.')
+        elif known_type is not None:
+            content_type = known_type
+        elif self.auto_detect_type:
+            content_type = FileTypeDetector.detect_prefix(head_text)
+            if self.type_cache is not None and url:
+                self.type_cache.put(url, content_type)
+        else:
+            content_type = 'json' if head_text.lstrip().startswith(('{', '[')) else 'txt'
+        return ParsedDocument(head_text, content_type, {'json': scan_json_fields(head_text)})
+
+    def _write_file(
+        self,
+        filepath: str,
+        chunks: Iterable[bytes],
+        content_type: str,
+        compress: bool = True,
+    ) -> Tuple[str, str, str]:
+        """
+        把数据块写入临时文件，再原子地放到目标位置（开启去重时内容不变则不替换）
+        
+        Args:
+            compress: 是否按 compression 压缩；数据已经是压缩格式时为 False
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        # 对实际写入的字节计算哈希，用于去重和记录到抓取队列
+        written = hashlib.sha256()
+        codec = self.codec if compress else None
+        fd, temp_path = tempfile.mkstemp(dir=self.storage_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                out = HashingWriter(raw, written)
+                f = codec.open(out, self.compression_level) if codec is not None else out
+                for chunk in chunks:
+                    f.write(chunk)
+                if codec is not None:
+                    f.close()
+            digest = written.hexdigest()
+            if self.deduplicator is None:
+                os.replace(temp_path, filepath)
+            elif self.deduplicator.is_unchanged(filepath, digest):
+                os.unlink(temp_path)
+                print(f"文件未变化: {filepath}")
+                return filepath, UNCHANGED, digest
+            else:
+                self.deduplicator.commit(temp_path, filepath, digest)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        
+        print(f"文件已保存: {filepath} (类型: {content_type})")
+        return filepath, SAVED, digest
+
+    @staticmethod
+    def _hashing(chunks: Iterator[bytes], hasher: Any) -> Iterator[bytes]:
+        """在读取数据块的同时更新哈希"""
+        for chunk in chunks:
+            hasher.update(chunk)
+            yield chunk
+
+    def fetch_content(self) -> Tuple[str, str]:
+        """
+        获取API响应内容并检测文件类型
+        
+        Returns:
+            tuple: (content, content_type)
+        """
+        document = self.fetch_document()
+        return document.text, document.content_type
 
     def fetch_json(self) -> Dict[str, Any]:
         """保持向后兼容性的方法"""
-        content, content_type = self.fetch_content()
-        if content_type == 'json':
-            return json.loads(content)
+        document = self.fetch_document()
+        if document.content_type == 'json':
+            return document.parse('json')
         else:
-            raise ValueError(f"Expected JSON content but got {content_type}")
+            raise ValueError(f"Expected JSON content but got {document.content_type}")
+
+    def _output_path(self, filename: str, document: ParsedDocument) -> str:
+        """按 layout 计算文件的完整路径（压缩时加上压缩后缀），并确保所在目录存在"""
+        if self.codec is not None:
+            filename += self.codec.suffix
+        if self.layout is None:
+            return os.path.join(self.storage_dir, filename)
+        filepath = self.layout.path_for(self.storage_dir, filename, document.try_parse('json', {}))
+        self._directories.ensure(os.path.dirname(filepath))
+        return filepath
 
-    def get_filename(self, content: str, content_type: str) -> str:
+    def get_filename(
+        self,
+        content: Union[str, ParsedDocument],
+        content_type: Optional[str] = None,
+        fields: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         根据内容获取文件名
         
         Args:
-            content: 文件内容
-            content_type: 内容类型
+            content: 文件内容，或已解析的 ParsedDocument
+            content_type: 内容类型，传入 ParsedDocument 时可省略
+            fields: 额外的模板参数（如页码），与内容中的同名字段冲突时以内容为准
             
         Returns:
             完整的文件名（包含扩展名）
         """
-        # 尝试解析为JSON以获取模板参数
+        document = ParsedDocument.coerce(content, content_type)
+        content_type = document.content_type
+        
+        # 尝试解析为JSON以获取模板参数（已解析的文档直接复用结果）
         try:
-            if content_type == 'json':
-                json_obj = json.loads(content)
-            else:
-                # 对于非JSON内容，尝试解析为JSON获取模板参数
-                try:
-                    json_obj = json.loads(content)
-                except (json.JSONDecodeError, ValueError):
-                    # 如果无法解析为JSON，则使用空字典
-                    json_obj = {}
-            
-            filename = self.filename_template.format(**json_obj)
+            # 如果无法解析为JSON，则使用空字典
+            json_obj = document.try_parse('json', {})
+            filename = self._template.render(json_obj, fields)
         except KeyError as e:
             raise ValueError(f"Key '{e.args[0]}' not found in content for filename template.")
         except Exception:
@@ -120,32 +568,476 @@ class SimpleJSONSpider:
         
         return filename
 
-    def save_content(self, content: str, content_type: str):
+    def save_content(
+        self,
+        content: Union[str, ParsedDocument],
+        content_type: Optional[str] = None,
+        fields: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         保存内容到文件
         
         Args:
-            content: 要保存的内容
-            content_type: 内容类型
+            content: 要保存的内容，或已解析的 ParsedDocument
+            content_type: 内容类型，传入 ParsedDocument 时可省略
+            fields: 额外的文件名模板参数
+            
+        Returns:
+            保存的文件路径
+        """
+        return self._store(ParsedDocument.coerce(content, content_type), fields)[0]
+
+    def _store(
+        self,
+        document: ParsedDocument,
+        fields: Optional[Dict[str, Any]] = None,
+        url: Optional[str] = None,
+    ) -> Tuple[str, str, str]:
         """
-        filename = self.get_filename(content, content_type)
-        filepath = os.path.join(self.storage_dir, filename)
+        格式化并写入文件
+        
+        设置了 sink 时作为一条记录追加到分段文件中，返回分段文件的路径。
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)；开启去重且内容未变化时状态为 unchanged
+        """
+        content_type = document.content_type
+        filename = self.get_filename(document, fields=fields)
         
         # 如果需要格式化内容
+        content = document.text
         if self.prettify_content and FileTypeDetector.should_prettify(content_type):
-            content = FileTypeDetector.prettify_content(content, content_type)
+            content = FileTypeDetector.prettify_content(document)
+        data = content.encode('utf-8')
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if self.sink is not None:
+            segment = self.sink.write(filename, data, url=url, content_type=content_type)
+            print(f"记录已写入: {segment} ({filename}, 类型: {content_type})")
+            return segment, SAVED, hashlib.sha256(data).hexdigest()
         
-        print(f"文件已保存: {filepath} (类型: {content_type})")
+        if self.codec is not None:
+            data = self.codec.compress(data, self.compression_level)
+        digest = hashlib.sha256(data).hexdigest()
+        filepath = self._output_path(filename, document)
+        if self.deduplicator is not None and self.deduplicator.is_unchanged(filepath, digest):
+            print(f"文件未变化: {filepath}")
+            return filepath, UNCHANGED, digest
+        
+        def commit(temp_path: str):
+            if self.deduplicator is None:
+                os.replace(temp_path, filepath)
+            else:
+                self.deduplicator.commit(temp_path, filepath, digest)
+            print(f"文件已保存: {filepath} (类型: {content_type})")
+        
+        # 先写临时文件再改名；设置了 writer 时由后台线程完成
+        if self.writer is None:
+            write_atomic(filepath, data, commit)
+        else:
+            self.writer.submit(filepath, data, commit)
+        return filepath, SAVED, digest
 
     def save_json(self, json_obj: Dict[str, Any]):
         """保持向后兼容性的方法"""
-        content = json.dumps(json_obj, ensure_ascii=False, indent=2)
-        self.save_content(content, 'json')
+        content = json_backend.dumps_pretty(json_obj)
+        self.save_content(ParsedDocument(content, 'json', {'json': json_obj}))
+
+    def run(self) -> CrawlResult:
+        """
+        运行爬虫
+        
+        响应体较小时在内存中检测、格式化并保存；超过 stream_threshold
+        时流式写入磁盘。设置了 validator_store 时发送条件请求，
+        内容未变化时不写盘。设置了 writer 时文件在后台写完，
+        用 flush() 或 close() 等待。
+        
+        Returns:
+            CrawlResult: 保存路径和状态（saved / unchanged）
+        """
+        return self._run_url(self.api_url)
+
+    def _run_url(self, url: str) -> CrawlResult:
+        """抓取并保存单个 URL（按 retry 策略重试）"""
+        return self._with_retries(url, self._run_url_once, url)
+
+    @staticmethod
+    def _transient_failure(error: requests.RequestException) -> Optional[Tuple[Optional[int], Optional[float]]]:
+        """
+        判断请求异常是否是暂时性的（可以重试）
+        
+        Returns:
+            (状态码, Retry-After 秒数)，连接错误和超时的状态码为 None；
+            不是暂时性错误时返回 None
+        """
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code, parse_retry_after(error.response.headers.get('Retry-After'))
+        if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+            return None, None
+        return None
+
+    def _with_retries(self, url: str, func: Callable[..., Any], *args) -> Any:
+        """
+        执行一次完整的请求（含读取响应体），失败时按 retry 策略退避重试
+        
+        设置了 circuit_breakers 时，主机熔断期间直接抛出 CircuitOpenError。
+        """
+        breaker = self.circuit_breakers.for_url(url) if self.circuit_breakers is not None else None
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_request()
+            try:
+                result = func(*args)
+            except CircuitOpenError:
+                raise
+            except requests.RequestException as e:
+                failure = self._transient_failure(e)
+                status, retry_after = failure if failure is not None else (0, None)
+                if breaker is not None:
+                    if failure is not None and (status is None or status == 429 or status >= 500):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                delay = None
+                if failure is not None and self.retry is not None:
+                    delay = self.retry.delay_for(attempt, status, retry_after)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except Exception:
+                # 请求本身没有出错，失败发生在主机响应之后（模板字段缺失、写盘、解压等）
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            except BaseException:
+                # 被中断，没有结果：释放半开状态的试探名额，否则之后的请求都会被拒绝
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
 
-    def run(self):
-        """运行爬虫"""
-        content, content_type = self.fetch_content()
-        self.save_content(content, content_type)
+    def _run_url_once(self, url: str) -> CrawlResult:
+        """抓取并保存单个 URL"""
+        cached = None
+        if self.validator_store is not None:
+            cached = self.validator_store.get(url)
+            if cached is not None and not (cached.filepath and os.path.exists(cached.filepath)):
+                # 之前保存的文件已不存在，必须重新下载
+                cached = None
+        
+        resp = self._open_response(url, cached.conditional_headers() if cached else None)
+        try:
+            if resp.status_code == 304 and cached is not None:
+                return CrawlResult(url, cached.filepath, status=UNCHANGED)
+            hasher = hashlib.sha256() if self.validator_store is not None else None
+            saved = None
+            if self._can_pass_through(resp):
+                saved = self._pass_through(resp, hasher)
+            else:
+                head, rest = self._read_head(resp)
+                if hasher is not None:
+                    hasher.update(head)
+                if rest is not None:
+                    saved = self._stream_to_file(resp, head, rest, hasher)
+                else:
+                    if cached is not None and cached.content_hash == hasher.hexdigest():
+                        # 服务器不支持条件请求，但内容与上次相同
+                        self._remember(url, resp, cached.content_hash, cached.filepath)
+                        return CrawlResult(url, cached.filepath, status=UNCHANGED)
+                    encoding = self._response_encoding(resp, head)
+        finally:
+            resp.close()
+        if saved is None:
+            saved = self._process_body(head, encoding, url, self._response_type(resp, url))
+        filepath, status, digest = saved
+        if hasher is not None:
+            self._remember(url, resp, hasher.hexdigest(), filepath)
+        return CrawlResult(url, filepath, status=status, content_hash=digest)
+
+    def _remember(self, url: str, resp: requests.Response, content_hash: str, filepath: str):
+        """记录响应的校验信息，供下次条件请求使用"""
+        self.validator_store.put(url, Validators(
+            etag=resp.headers.get('ETag'),
+            last_modified=resp.headers.get('Last-Modified'),
+            content_hash=content_hash,
+            filepath=filepath,
+        ))
+
+    def _save_body(
+        self,
+        body: bytes,
+        encoding: str,
+        url: Optional[str] = None,
+        known_type: Optional[str] = None,
+    ) -> Tuple[str, str, str]:
+        """
+        解码完整的响应体，检测类型并保存
+        
+        Args:
+            known_type: 响应头或类型缓存给出的类型，有值时不再检测
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        if self.keep_bytes:
+            return self._store_bytes(body, encoding, url, known_type)
+        document = self._build_document(str(body, encoding, errors='replace'), known_type, url)
+        if document.content_type == 'binary':
+            # 二进制内容解码后再编码会改变字节，原样保存响应体
+            return self._store_raw(document, body, url)
+        return self._store(document, url=url)
+
+    def _store_bytes(
+        self,
+        body: bytes,
+        encoding: str,
+        url: Optional[str] = None,
+        known_type: Optional[str] = None,
+    ) -> Tuple[str, str, str]:
+        """
+        原样保存响应体字节，不解码整个响应体、不转码也不格式化
+        
+        类型和文件名模板字段来自开头的样本，与流式写入相同。
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        document = self._prefix_document(decoder.decode(body[:DEFAULT_GUESS_SAMPLE_SIZE]), known_type, url)
+        return self._store_raw(document, body, url)
+
+    def _store_raw(self, document: ParsedDocument, body: bytes, url: Optional[str] = None) -> Tuple[str, str, str]:
+        """
+        按已检测的类型和文件名原样写入响应体字节
+        
+        Returns:
+            tuple: (文件路径, 状态, 写入内容的 sha256)
+        """
+        filename = self.get_filename(document)
+        if self.sink is not None:
+            segment = self.sink.write(filename, body, url=url, content_type=document.content_type)
+            return segment, SAVED, hashlib.sha256(body).hexdigest()
+        return self._write_file(self._output_path(filename, document), [body], document.content_type)
+
+    def _worker_options(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        子进程中构造爬虫所需的配置（只包含与保存有关的参数）
+        
+        Returns:
+            tuple: (配置标识, SimpleJSONSpider 的参数)
+        """
+        if self._worker_key is None:
+            self._worker_key = uuid.uuid4().hex
+        dedup = self.deduplicator
+        index = dedup.index if dedup is not None else None
+        return self._worker_key, {
+            'filename_template': self._template,
+            'storage_dir': self.storage_dir,
+            'file_extension': self.file_extension,
+            'auto_detect_type': self.auto_detect_type,
+            'prettify_content': self.prettify_content,
+            'detect_sample_size': self.detect_sample_size,
+            'dedup': dedup is not None,
+            # 内存中的索引无法跨进程共享，子进程退回到读取已有文件比较哈希
+            'dedup_index': index.path if index is not None and index.path != ':memory:' else None,
+            'content_addressed': dedup is not None and dedup.objects_dir is not None,
+            'layout': self.layout,
+            'compression': self.codec.name if self.codec is not None else None,
+            'compression_level': self.compression_level,
+            'default_encoding': self.default_encoding,
+            'guess_encoding': self.guess_encoding,
+            'keep_bytes': self.keep_bytes,
+            'trust_content_type': self.trust_content_type,
+            'mime_types': self.mime_types,
+        }
+
+    def _submit_body(self, body: bytes, encoding: str, known_type: Optional[str] = None) -> Future:
+        """把响应体交给进程池检测、格式化并保存"""
+        key, options = self._worker_options()
+        return submit_body(self.process_pool, key, options, body, encoding, known_type)
+
+    def _process_body(
+        self,
+        body: bytes,
+        encoding: str,
+        url: Optional[str] = None,
+        known_type: Optional[str] = None,
+    ) -> Tuple[str, str, str]:
+        """保存完整的响应体；设置了 process_pool 时在子进程中处理，当前线程只等待结果"""
+        if self.process_pool is None:
+            return self._save_body(body, encoding, url, known_type)
+        return self._submit_body(body, encoding, known_type).result()
+
+    def _crawl(self, url: str) -> CrawlResult:
+        """抓取单个 URL，把异常记录在结果中而不是抛出"""
+        try:
+            return self._run_url(url)
+        except Exception as e:
+            return CrawlResult(url, status=FAILED, error=e)
+
+    def _ensure_pool_size(self, size: int):
+        """并发数超过连接池大小时扩大自己持有的连接池"""
+        if self._owns_session and size > self.pool_maxsize:
+            mount_pool(self.session, pool_maxsize=size)
+            self.pool_maxsize = size
+
+    def iter_urls(self) -> Iterator[str]:
+        """
+        按 url_params 展开 api_url 中的占位符，逐个生成 URL
+        
+        没有设置 url_params 时只生成 api_url 本身。
+        
+        Yields:
+            展开后的 URL
+        """
+        if self.url_params is None:
+            return iter([self.api_url])
+        return expand_urls(self.api_url, self.url_params)
+
+    def iter_many(self, urls: Optional[Iterable[str]] = None, max_workers: int = 8) -> Iterator[CrawlResult]:
+        """
+        并发抓取多个 URL，按完成顺序逐个产出结果
+        
+        使用当前实例的 filename_template、storage_dir 等配置和连接池；
+        urls 按需读取，可以是很长的生成器。
+        
+        Args:
+            urls: 要抓取的 URL，默认使用 iter_urls() 展开的 URL
+            max_workers: 线程数
+            
+        Yields:
+            CrawlResult: 每个 URL 的保存路径或异常
+        """
+        if urls is None:
+            urls = self.iter_urls()
+        self._ensure_pool_size(max_workers)
+        results = run_concurrently(self._crawl, urls, max_workers)
+        if self.writer is None:
+            return results
+        return self._flushing(results)
+
+    def _flushing(self, results: Iterator[CrawlResult]) -> Iterator[CrawlResult]:
+        """产出全部结果后等待后台写盘完成"""
+        yield from results
+        self.flush()
+
+    def run_many(self, urls: Optional[Iterable[str]] = None, max_workers: int = 8) -> List[CrawlResult]:
+        """
+        并发抓取多个 URL，单个 URL 失败不会中断其他 URL
+        
+        Args:
+            urls: 要抓取的 URL，默认使用 iter_urls() 展开的 URL
+            max_workers: 线程数
+            
+        Returns:
+            所有 URL 的 CrawlResult 列表（按完成顺序）
+        """
+        return list(self.iter_many(urls, max_workers))
+
+    def run_queue(
+        self,
+        queue: Union[CrawlQueue, str],
+        max_workers: int = 8,
+        retry_failed: bool = True,
+        max_attempts: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        抓取持久化队列中尚未完成的任务，可以随时中断后再次运行
+        
+        队列为空时先用 iter_urls() 展开的 URL 填充。每个结果都记录到队列中
+        （攒批提交），再次运行时只抓取 pending 和失败的任务。
+        
+        Args:
+            queue: CrawlQueue 或其数据库路径
+            max_workers: 线程数
+            retry_failed: 是否重新抓取之前失败的任务
+            max_attempts: 失败任务的最多尝试次数
+            
+        Returns:
+            运行结束后各状态的任务数
+        """
+        owns_queue = isinstance(queue, str)
+        if owns_queue:
+            queue = CrawlQueue(queue)
+        try:
+            if not queue.counts():
+                queue.add(self.iter_urls())
+            urls = queue.iter_pending(retry_failed=retry_failed, max_attempts=max_attempts)
+            try:
+                for result in self.iter_many(urls, max_workers):
+                    queue.record(result)
+            finally:
+                queue.flush()
+            return queue.counts()
+        finally:
+            if owns_queue:
+                queue.close()
+
+    def _fetch_page(self, url: str) -> Tuple[ParsedDocument, Dict[str, Dict[str, str]]]:
+        """获取一页内容，返回 (文档, 解析后的 Link 响应头)"""
+        return self._with_retries(url, self._fetch_page_once, url)
+
+    def _fetch_page_once(self, url: str) -> Tuple[ParsedDocument, Dict[str, Dict[str, str]]]:
+        resp = self._open_response(url)
+        try:
+            document = self._build_document(self._response_text(resp), self._response_type(resp, url), url)
+            return document, resp.links
+        finally:
+            resp.close()
+
+    def paginate(
+        self,
+        next_page: Union[str, NextPage, None] = None,
+        cursor_param: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        prefetch: bool = True,
+    ) -> List[str]:
+        """
+        从 api_url 开始逐页抓取并保存，直到没有下一页
+        
+        每页都用 filename_template 保存，模板中可以使用 ``{page}``（从 1 开始的页码）。
+        prefetch 为 True 时，保存当前页的同时已经在后台请求下一页。
+        
+        Args:
+            next_page: 下一页的来源。字符串表示 JSON 中下一页链接或游标的路径
+                （如 ``paging.next``）；也可以是 pagination 模块中的翻页函数
+                （如 page_number(...)）或自定义的同签名函数；
+                None 表示使用 ``Link: rel="next"`` 响应头
+            cursor_param: next_page 为路径时，把取到的值作为游标写入该查询参数
+            max_pages: 最多抓取的页数
+            prefetch: 是否在保存当前页时预取下一页
+            
+        Returns:
+            每页保存的文件路径
+        """
+        if next_page is None:
+            next_page = next_from_link_header
+        elif isinstance(next_page, str):
+            next_page = next_from_path(next_page, cursor_param)
+        
+        paths = []
+        seen = set()
+        url = self.api_url
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self._fetch_page, url)
+            while pending is not None:
+                document, links = pending.result()
+                seen.add(url)
+                next_url = next_page(document, url, links)
+                if next_url in seen or (max_pages is not None and len(paths) + 1 >= max_pages):
+                    next_url = None
+                
+                pending = None
+                if next_url is not None and prefetch:
+                    # 网络请求与写盘并行
+                    pending = executor.submit(self._fetch_page, next_url)
+                paths.append(self.save_content(document, fields={'page': len(paths) + 1}))
+                if next_url is not None and not prefetch:
+                    pending = executor.submit(self._fetch_page, next_url)
+                url = next_url
+        self.flush()
+        return paths
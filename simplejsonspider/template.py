@@ -0,0 +1,130 @@
+# simplejsonspider/template.py
+
+import re
+import string
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .document import get_path, split_path
+
+# 文件名中不能出现的字符：路径分隔符和控制字符
+_UNSAFE_CHARS = re.compile(r'[/\\\x00-\x1f\x7f]')
+
+# 字段名中第一个 . 或 [ 之前的部分
+_FIELD_ROOT = re.compile(r'[^.\[]*')
+
+
+class _Field:
+    """模板中的一个占位符"""
+
+    __slots__ = ('name', 'root', 'path', 'default', 'has_default', 'conversion', 'format_spec')
+
+    def __init__(self, expression: str, conversion: Optional[str], format_spec: str):
+        name, sep, default = expression.partition('|')
+        self.name = name
+        root = _FIELD_ROOT.match(name).group()
+        if not root or root.isdigit():
+            # str.format 中的位置参数；文件名模板只能按字段名取值
+            raise ValueError(
+                f"Positional field '{{{name}}}' is not supported in filename template, use a JSON key name"
+            )
+        path = split_path(name)
+        self.root = str(path[0])
+        self.path = path[1:]
+        # 用布尔值而不是哨兵对象：模板会被 pickle 发送到进程池，哨兵对象的 identity 不会保留
+        self.default = default
+        self.has_default = bool(sep)
+        self.conversion = conversion
+        self.format_spec = format_spec
+
+    def render(self, data: Dict[str, Any], extra: Optional[Dict[str, Any]]) -> str:
+        try:
+            if self.root in data:
+                value = data[self.root]
+            elif extra and self.root in extra:
+                value = extra[self.root]
+            else:
+                raise KeyError(self.name)
+            if self.path:
+                value = get_path(value, self.path)
+        except KeyError:
+            if not self.has_default:
+                raise KeyError(self.name) from None
+            return self.default
+        if self.conversion == 'r':
+            value = repr(value)
+        elif self.conversion == 'a':
+            value = ascii(value)
+        elif self.conversion == 's':
+            value = str(value)
+        return format(value, self.format_spec)
+
+
+class FilenameTemplate:
+    """
+    预编译的文件名模板
+
+    模板在创建时解析一次，渲染时只读取被引用的字段，不需要把整个 JSON
+    对象展开为关键字参数。除了 str.format 的写法外还支持：
+
+    - 嵌套路径：``{data.bvid}``、``{data.pages[0].cid}``
+    - 默认值：``{title|untitled}``，字段不存在时使用 ``untitled``
+    - 字段值中的路径分隔符和控制字符会被替换为下划线
+    """
+
+    def __init__(self, template: str, sanitize: bool = True):
+        """
+        Args:
+            template: 文件名模板，如 ``{id}_{data.title}``
+            sanitize: 是否替换字段值中不能用于文件名的字符
+
+        Raises:
+            ValueError: 模板中有位置参数（如 ``{}``、``{0}``）
+        """
+        self.template = template
+        self.sanitize = sanitize
+        self._parts: List[Tuple[str, Optional[_Field]]] = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            field = _Field(field_name, conversion, format_spec or '') if field_name is not None else None
+            self._parts.append((literal, field))
+
+    @property
+    def fields(self) -> List[str]:
+        """模板引用的字段（含路径）"""
+        return [field.name for _, field in self._parts if field is not None]
+
+    def render(self, data: Any, extra: Optional[Dict[str, Any]] = None) -> str:
+        """
+        用 JSON 对象填充模板
+
+        Args:
+            data: 解析后的 JSON 对象，必须是字典
+            extra: 额外的模板参数，与 data 中的同名字段冲突时以 data 为准
+
+        Returns:
+            渲染后的文件名
+
+        Raises:
+            KeyError: 引用的字段不存在且没有默认值
+            TypeError: data 不是字典
+        """
+        if not isinstance(data, dict):
+            raise TypeError(f"Filename template needs a JSON object, got {type(data).__name__}")
+        pieces = []
+        for literal, field in self._parts:
+            pieces.append(literal)
+            if field is not None:
+                value = field.render(data, extra)
+                if self.sanitize:
+                    value = _UNSAFE_CHARS.sub('_', value)
+                pieces.append(value)
+        return ''.join(pieces)
+
+    def __repr__(self) -> str:
+        return f"FilenameTemplate({self.template!r})"
+
+
+def compile_template(template: Union[str, FilenameTemplate]) -> FilenameTemplate:
+    """把字符串编译为 FilenameTemplate；已经编译过的原样返回"""
+    if isinstance(template, FilenameTemplate):
+        return template
+    return FilenameTemplate(template)
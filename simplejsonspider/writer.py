@@ -0,0 +1,224 @@
+# simplejsonspider/writer.py
+
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# fsync 策略
+NO_FSYNC = 'none'      # 不调用 fsync，由操作系统决定何时写盘
+FSYNC_FILE = 'file'    # 每个文件写完后 fsync，再改名
+FSYNC_GROUP = 'group'  # 攒够一组文件（或超过时间间隔）后一起 fsync，再一起改名
+
+Commit = Callable[[str], None]
+
+
+def _replace(filepath: str) -> Commit:
+    return lambda temp_path: os.replace(temp_path, filepath)
+
+
+def _fsync_path(path: str):
+    """对文件或目录调用 fsync（不支持目录 fsync 的平台上忽略）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_temp(filepath: str, data: bytes, fsync: bool = False) -> str:
+    """
+    把数据写入目标所在目录的临时文件
+
+    Returns:
+        临时文件路径（与目标在同一文件系统，可以原子地改名）
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or '.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def write_atomic(filepath: str, data: bytes, commit: Optional[Commit] = None, fsync: bool = False):
+    """
+    先写临时文件再改名，读者不会看到写了一半的文件
+
+    Args:
+        filepath: 目标路径
+        data: 文件内容
+        commit: 把临时文件放到目标位置的函数，默认 os.replace
+        fsync: 改名前是否 fsync 文件，改名后 fsync 所在目录
+    """
+    temp_path = write_temp(filepath, data, fsync)
+    try:
+        (commit or _replace(filepath))(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    if fsync:
+        _fsync_path(os.path.dirname(filepath) or '.')
+
+
+class _Job(NamedTuple):
+    filepath: str
+    data: bytes
+    commit: Optional[Commit]
+
+
+class WriteBehind:
+    """
+    后台写盘：抓取线程把内容放进有界队列后立即返回，由少量写线程完成写盘
+
+    每个文件都先写临时文件再改名。队列满时 submit 阻塞，内存占用有上限。
+    写盘错误在 flush()/close() 时抛出。可以在多个爬虫实例之间共享。
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 256,
+        fsync: str = NO_FSYNC,
+        group_size: int = 64,
+        group_interval: float = 0.05,
+    ):
+        """
+        Args:
+            workers: 写线程数
+            max_queue: 队列中最多等待写盘的文件数
+            fsync: fsync 策略：'none'、'file' 或 'group'
+            group_size: group 策略下每组的文件数
+            group_interval: group 策略下一组最多等待的秒数
+        """
+        if fsync not in (NO_FSYNC, FSYNC_FILE, FSYNC_GROUP):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.fsync = fsync
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._errors: List[Tuple[str, BaseException]] = []
+        # 上一次 flush 时收集到的全部写盘错误：(目标路径, 异常)
+        self.errors: List[Tuple[str, BaseException]] = []
+        self._group: List[Tuple[str, str, Optional[Commit]]] = []
+        self._group_started = 0.0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f'simplejsonspider-writer-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, filepath: str, data: bytes, commit: Optional[Commit] = None):
+        """
+        提交一个文件写入任务
+
+        Args:
+            filepath: 目标路径
+            data: 文件内容
+            commit: 把临时文件放到目标位置的函数，默认 os.replace
+        """
+        if self._closed:
+            raise RuntimeError("WriteBehind is closed")
+        self._queue.put(_Job(filepath, data, commit))
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._write(job)
+                if self.fsync == FSYNC_GROUP and self._queue.empty():
+                    # 没有更多任务时不再等待凑满一组
+                    self._sync_group()
+            except BaseException as e:
+                with self._lock:
+                    self._errors.append((job.filepath, e))
+            finally:
+                self._queue.task_done()
+
+    def _write(self, job: _Job):
+        if self.fsync != FSYNC_GROUP:
+            write_atomic(job.filepath, job.data, job.commit, fsync=self.fsync == FSYNC_FILE)
+            return
+        temp_path = write_temp(job.filepath, job.data)
+        with self._lock:
+            if not self._group:
+                self._group_started = time.monotonic()
+            self._group.append((temp_path, job.filepath, job.commit))
+            full = (len(self._group) >= self.group_size
+                    or time.monotonic() - self._group_started >= self.group_interval)
+        if full:
+            self._sync_group()
+
+    def _sync_group(self):
+        """fsync 当前一组临时文件，再把它们改名到目标位置"""
+        with self._lock:
+            group, self._group = self._group, []
+        if not group:
+            return
+        for temp_path, _, _ in group:
+            _fsync_path(temp_path)
+        directories = set()
+        for temp_path, filepath, commit in group:
+            try:
+                (commit or _replace(filepath))(temp_path)
+                directories.add(os.path.dirname(filepath) or '.')
+            except BaseException as e:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                with self._lock:
+                    self._errors.append((filepath, e))
+        for directory in directories:
+            _fsync_path(directory)
+
+    def flush(self):
+        """
+        等待已提交的文件全部写完
+
+        Raises:
+            OSError 等: 后台写盘失败时抛出第一个错误（所有错误见 errors）
+        """
+        self._queue.join()
+        if self.fsync == FSYNC_GROUP:
+            self._sync_group()
+        with self._lock:
+            errors, self._errors = self._errors, []
+        self.errors = errors
+        if errors:
+            raise errors[0][1]
+
+    def close(self):
+        """写完剩余文件并停止写线程"""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
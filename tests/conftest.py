@@ -0,0 +1,19 @@
+# tests/conftest.py
+
+import io
+
+import pytest
+import requests
+
+
+@pytest.fixture
+def fake_response():
+    """构造内容来自内存的 requests.Response 的工厂函数"""
+    def make(body, status=200, headers=None, encoding='utf-8'):
+        resp = requests.models.Response()
+        resp.status_code = status
+        resp.raw = io.BytesIO(body.encode(encoding) if isinstance(body, str) else body)
+        resp.headers.update(headers or {})
+        resp.encoding = encoding
+        return resp
+    return make
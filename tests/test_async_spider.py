@@ -0,0 +1,100 @@
+# tests/test_async_spider.py
+
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import simplejsonspider.async_spider as async_spider_module
+from simplejsonspider import AsyncJSONSpider
+
+
+def test_run_many_without_aiohttp(monkeypatch, tmp_path, fake_response):
+    """测试没有 aiohttp 时退回到线程池中的 requests 会话"""
+    monkeypatch.setattr(async_spider_module, "aiohttp", None)
+
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        try:
+            item_id = url.rsplit('/', 1)[-1]
+            if item_id == '0':
+                raise requests.ConnectionError('boom')
+            return fake_response('{"id": %s}' % item_id)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = AsyncJSONSpider(
+        api_url="http://example.com/items/1",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+    )
+
+    async def main():
+        path = (await spider.run()).filepath
+        results = await spider.run_many(
+            ("http://example.com/items/%d" % i for i in range(20)),
+            max_concurrency=4,
+        )
+        await spider.aclose()
+        return path, results
+
+    path, results = asyncio.run(main())
+
+    assert path == os.path.join(str(tmp_path), "item_1.json")
+    assert len(results) == 20
+    assert [r.url for r in results if not r.ok] == ["http://example.com/items/0"]
+    assert in_flight[1] <= 4
+    assert os.path.exists(os.path.join(str(tmp_path), "item_19.json"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        item_id = self.path.rsplit('/', 1)[-1]
+        body = json.dumps({"id": int(item_id), "title": "标题"}, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_run_many_with_aiohttp(tmp_path):
+    """测试使用 aiohttp 抓取本地 HTTP 服务"""
+    pytest.importorskip("aiohttp")
+
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = "http://127.0.0.1:%d/items/" % server.server_address[1]
+
+    async def main():
+        async with AsyncJSONSpider(
+            api_url=base + "1",
+            filename_template="{id}_{title}",
+            storage_dir=str(tmp_path),
+        ) as spider:
+            return await spider.run_many((base + str(i) for i in range(10)), max_concurrency=3)
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        server.shutdown()
+
+    assert all(r.ok for r in results)
+    with open(os.path.join(str(tmp_path), "3_标题.json"), encoding="utf-8") as f:
+        assert json.load(f) == {"id": 3, "title": "标题"}
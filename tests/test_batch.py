@@ -0,0 +1,86 @@
+# tests/test_batch.py
+
+import os
+import threading
+import time
+
+import requests
+
+from simplejsonspider import SimpleJSONSpider, CrawlResult
+from simplejsonspider.batch import run_concurrently
+
+
+def test_run_concurrently_bounds_pending():
+    """测试提交的任务数受限，输入按需消费"""
+    consumed = []
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def items():
+        for i in range(50):
+            consumed.append(i)
+            yield i
+
+    def work(i):
+        with lock:
+            active.append(i)
+            peak.append(len(active))
+        time.sleep(0.001)
+        with lock:
+            active.remove(i)
+        return i * 2
+
+    results = run_concurrently(work, items(), max_workers=4, max_pending=6)
+    first = next(results)
+    assert len(consumed) <= 7
+    assert sorted([first] + list(results)) == [i * 2 for i in range(50)]
+    assert max(peak) <= 4
+
+
+def test_run_many_collects_errors(monkeypatch, tmp_path, fake_response):
+    """测试批量抓取返回每个 URL 的结果，失败不会中断其他 URL"""
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        item_id = url.rsplit('/', 1)[-1]
+        if item_id == '3':
+            raise requests.ConnectionError('boom')
+        return fake_response('{"id": %s}' % item_id)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/items/0",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+    )
+    urls = ["http://example.com/items/%d" % i for i in range(1, 6)]
+    results = spider.run_many(urls, max_workers=3)
+
+    assert len(results) == 5
+    assert all(isinstance(result, CrawlResult) for result in results)
+    failed = [result for result in results if not result.ok]
+    assert len(failed) == 1
+    assert failed[0].url.endswith('/3')
+    assert isinstance(failed[0].error, requests.ConnectionError)
+    for i in (1, 2, 4, 5):
+        assert os.path.exists(os.path.join(str(tmp_path), "item_%d.json" % i))
+
+
+def test_run_many_grows_pool(tmp_path):
+    """测试并发数超过连接池大小时扩大连接池"""
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/items/0",
+        filename_template="item",
+        storage_dir=str(tmp_path),
+        pool_maxsize=2,
+    )
+    old_adapter = spider.session.get_adapter("https://example.com")
+    assert spider.run_many([], max_workers=16) == []
+    adapter = spider.session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 16
+    # 保留 create_session 的其他连接池设置，旧的连接池被关闭
+    assert adapter._pool_connections == old_adapter._pool_connections
+    assert adapter._pool_block == old_adapter._pool_block
+    assert spider.session.get_adapter("http://example.com") is adapter
+    assert not old_adapter.poolmanager.pools
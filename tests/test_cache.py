@@ -0,0 +1,153 @@
+# tests/test_cache.py
+
+import os
+
+from simplejsonspider import SimpleJSONSpider, TypeCache, ValidatorStore
+from simplejsonspider.cache import Validators, url_pattern
+from simplejsonspider.file_detector import FileTypeDetector
+
+
+def test_store_roundtrip(tmp_path):
+    """测试校验信息持久化"""
+    path = str(tmp_path / "validators.db")
+    with ValidatorStore(path) as store:
+        assert store.get("http://a") is None
+        store.put("http://a", Validators(etag='"v1"', filepath="/x.json"))
+    with ValidatorStore(path) as store:
+        cached = store.get("http://a")
+    assert cached.etag == '"v1"'
+    assert cached.conditional_headers() == {"If-None-Match": '"v1"'}
+
+
+def test_not_modified_skips_write(monkeypatch, tmp_path, fake_response):
+    """测试 304 时不写盘并报告 unchanged"""
+    sent = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        sent.append(headers or {})
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return fake_response("", status=304)
+        return fake_response('{"id": 1}', headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/item",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path / "data"),
+        validator_store=str(tmp_path / "validators.db"),
+    )
+    first = spider.run()
+    assert first.status == "saved"
+    mtime = os.stat(first.filepath).st_mtime_ns
+
+    second = spider.run()
+    assert second.status == "unchanged"
+    assert second.filepath == first.filepath
+    assert sent[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert os.stat(first.filepath).st_mtime_ns == mtime
+
+
+def test_same_hash_skips_write(monkeypatch, tmp_path, fake_response):
+    """测试服务器不支持条件请求时按内容哈希判断未变化"""
+    bodies = ['{"id": 1}', '{"id": 1}', '{"id": 1, "v": 2}']
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(bodies.pop(0))
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/item",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+        validator_store=ValidatorStore(":memory:"),
+    )
+    assert [spider.run().status for _ in range(3)] == ["saved", "unchanged", "saved"]
+
+
+def test_missing_file_is_refetched(monkeypatch, tmp_path, fake_response):
+    """测试之前保存的文件被删除后不再发送条件请求"""
+    sent = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        sent.append(headers)
+        return fake_response('{"id": 1}', headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/item",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+        validator_store=ValidatorStore(":memory:"),
+    )
+    os.remove(spider.run().filepath)
+    assert spider.run().status == "saved"
+    assert "If-None-Match" not in sent[1]
+
+
+def test_url_pattern():
+    """测试同一接口的不同 ID 得到相同的模式"""
+    pattern = url_pattern("https://api.example.com/v1/items/123?lang=zh&id=5")
+    assert pattern == "api.example.com/v1/items/*?id&lang"
+    assert url_pattern("https://api.example.com/v1/items/456?id=9&lang=en") == pattern
+    assert url_pattern("https://api.example.com/v1/users/123") != pattern
+
+
+def test_type_cache_persists(tmp_path):
+    """测试类型缓存持久化"""
+    path = str(tmp_path / "types.db")
+    with TypeCache(path) as cache:
+        assert cache.get("http://example.com/items/1") is None
+        cache.put("http://example.com/items/1", "yaml")
+    with TypeCache(path) as cache:
+        assert cache.get("http://example.com/items/2") == "yaml"
+
+
+def test_content_type_header_skips_detection(monkeypatch, tmp_path, fake_response):
+    """测试响应头给出具体类型时不检查内容"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"id": 1}', headers={"Content-Type": "application/json; charset=utf-8"})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("content should not be sniffed")
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+    monkeypatch.setattr(FileTypeDetector, "detect_document", fail)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/item",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+    )
+    assert spider.run().filepath == os.path.join(str(tmp_path), "item_1.json")
+
+
+def test_type_cache_skips_detection(monkeypatch, tmp_path, fake_response):
+    """测试通用 Content-Type 下按 URL 模式复用第一次检测的结果"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        item_id = url.rsplit("/", 1)[-1]
+        return fake_response('{"id": %s}' % item_id, headers={"Content-Type": "text/plain"})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+    detected = []
+    real_detect = FileTypeDetector.detect_document
+
+    def recording_detect(content, sample_size=None):
+        detected.append(content)
+        return real_detect(content, sample_size)
+
+    monkeypatch.setattr(FileTypeDetector, "detect_document", staticmethod(recording_detect))
+
+    cache = TypeCache()
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/items/1",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+        type_cache=cache,
+    )
+    first = spider.run_many(["http://example.com/items/1", "http://example.com/items/2"], max_workers=1)
+    assert [os.path.basename(r.filepath) for r in first] == ["item_1.json", "item_2.json"]
+    assert len(detected) == 1
+    assert cache.get("http://example.com/items/3") == "json"
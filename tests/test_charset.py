@@ -0,0 +1,118 @@
+# tests/test_charset.py
+
+import codecs
+import io
+import json
+
+import pytest
+import requests
+
+from simplejsonspider import SimpleJSONSpider
+from simplejsonspider.charset import header_charset, resolve_charset, sniff_bom, sniff_json_encoding
+
+
+def test_header_charset():
+    """测试从 Content-Type 中解析 charset"""
+    assert header_charset('application/json; charset="GBK"') == "GBK"
+    assert header_charset("text/plain;charset=utf-8; format=flowed") == "utf-8"
+    assert header_charset("application/json") is None
+    assert header_charset(None) is None
+
+
+def test_bom_and_json_sniffing():
+    """测试 BOM 和 JSON 规范的 UTF-16/32 判断"""
+    assert sniff_bom(codecs.BOM_UTF8 + b"{}") == "utf-8-sig"
+    assert sniff_bom(codecs.BOM_UTF32_LE + b"{\x00\x00\x00") == "utf-32"
+    assert sniff_bom(b"{}") is None
+    assert sniff_json_encoding('{"a"'.encode("utf-16-le")) == "utf-16-le"
+    assert sniff_json_encoding('{"a"'.encode("utf-16-be")) == "utf-16-be"
+    assert sniff_json_encoding("{}".encode("utf-32-le")) == "utf-32-le"
+    assert sniff_json_encoding("{}".encode("utf-32-be")) == "utf-32-be"
+    assert sniff_json_encoding(b'{"a": 1}') is None
+
+
+def test_resolve_charset_order(monkeypatch):
+    """测试解析顺序，猜测只在默认编码不适用时对样本进行"""
+    gbk = "中文内容，测试编码".encode("gbk") * 10
+    assert resolve_charset("GBK", b"{}") == "gbk"
+    assert resolve_charset("GBK", codecs.BOM_UTF8 + b"{}") == "utf-8-sig"
+    assert resolve_charset(None, '{"中": 1}'.encode("utf-8")) == "utf-8"
+    assert resolve_charset(None, b"abc", default="latin-1") == "iso8859-1"
+    assert resolve_charset(None, gbk, guess=False) == "utf-8"
+
+    sizes = []
+    real_detect = requests.compat.chardet.detect
+
+    def recording_detect(sample):
+        sizes.append(len(sample))
+        return real_detect(sample)
+
+    monkeypatch.setattr(requests.compat.chardet, "detect", recording_detect)
+    assert resolve_charset(None, gbk * 1000, sample_size=1024) in ("gbk", "gb2312", "gb18030")
+    assert sizes == [1024]
+
+
+def _response(body, content_type=None):
+    resp = requests.models.Response()
+    resp.status_code = 200
+    resp.raw = io.BytesIO(body)
+    if content_type:
+        resp.headers["Content-Type"] = content_type
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+def test_fetch_document_ignores_implicit_latin1(monkeypatch, tmp_path):
+    """测试 text/* 没有 charset 时不使用 requests 默认的 ISO-8859-1"""
+    body = '{"title": "中文"}'.encode("utf-8")
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: _response(body, "text/plain"))
+
+    spider = SimpleJSONSpider(api_url="http://example.com", filename_template="x", storage_dir=str(tmp_path))
+    assert spider.fetch_json() == {"title": "中文"}
+
+
+def test_keep_bytes_saves_original_bytes(monkeypatch, tmp_path):
+    """测试 keep_bytes 原样保存响应体，不转码也不格式化"""
+    body = json.dumps({"id": "raw", "title": "中文"}, ensure_ascii=False).encode("gbk")
+    monkeypatch.setattr(
+        "requests.Session.get",
+        lambda self, url, **kwargs: _response(body, "application/json; charset=gbk"),
+    )
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        keep_bytes=True,
+    )
+    result = spider.run()
+    assert result.filepath.endswith("raw.json")
+    with open(result.filepath, "rb") as f:
+        assert f.read() == body
+
+
+@pytest.mark.parametrize("body", [
+    codecs.BOM_UTF8 + '{"title": "中文"}'.encode("utf-8"),
+    '{"title": "中文"}'.encode("utf-16-le"),
+    '{"title": "中文"}'.encode("utf-16-be"),
+    '{"title": "中文"}'.encode("utf-16"),
+    '{"title": "中文"}'.encode("utf-32"),
+])
+def test_application_json_without_charset_is_sniffed(monkeypatch, tmp_path, body):
+    """测试没有 charset 的 application/json 仍然按 BOM 和 UTF-16/32 判断编码"""
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: _response(body, "application/json"))
+
+    spider = SimpleJSONSpider(api_url="http://example.com", filename_template="x", storage_dir=str(tmp_path))
+    assert spider.fetch_json() == {"title": "中文"}
+
+
+def test_bom_overrides_declared_charset(monkeypatch, tmp_path):
+    """测试 BOM 优先于 Content-Type 中声明的编码"""
+    body = '{"title": "中文"}'.encode("utf-16")
+    monkeypatch.setattr(
+        "requests.Session.get",
+        lambda self, url, **kwargs: _response(body, "application/json; charset=utf-8"),
+    )
+
+    spider = SimpleJSONSpider(api_url="http://example.com", filename_template="x", storage_dir=str(tmp_path))
+    assert spider.fetch_json() == {"title": "中文"}
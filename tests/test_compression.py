@@ -0,0 +1,143 @@
+# tests/test_compression.py
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+
+import pytest
+import requests
+
+from simplejsonspider import SimpleJSONSpider
+from simplejsonspider.compression import Codec, get_codec, register_codec
+from simplejsonspider.dedup import file_digest
+
+
+@pytest.mark.parametrize("name, suffix, decompress", [
+    ("gzip", ".json.gz", gzip.decompress),
+    ("xz", ".json.xz", lzma.decompress),
+    ("bz2", ".json.bz2", bz2.decompress),
+])
+def test_save_content_compressed(tmp_path, name, suffix, decompress):
+    """测试压缩保存并在扩展名后追加后缀"""
+    spider = SimpleJSONSpider(
+        api_url="http://example.com",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        compression=name,
+        compression_level=1,
+    )
+    filepath = spider.save_content('{"id": "abc"}', "json")
+    assert filepath.endswith("abc" + suffix)
+    with open(filepath, "rb") as f:
+        assert decompress(f.read()) == b'{\n  "id": "abc"\n}'
+
+
+def test_gzip_output_is_deterministic():
+    """测试 gzip 输出不包含时间戳，相同内容压缩结果相同"""
+    codec = get_codec("gzip")
+    assert codec.compress(b"x" * 100) == codec.compress(b"x" * 100)
+    assert codec.compress(b"x" * 100, level=9) != b"x" * 100
+
+
+def test_unknown_and_registered_codecs():
+    """测试未知格式报错，注册的插件可以按名字使用"""
+    with pytest.raises(ValueError):
+        get_codec("rar")
+    register_codec(Codec("identity", ".id", lambda f, level: _Passthrough(f), 0))
+    assert get_codec("identity").compress(b"abc") == b"abc"
+
+
+class _Passthrough:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def write(self, data):
+        return self.fileobj.write(data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def test_streaming_compressed_with_dedup(monkeypatch, tmp_path, fake_response):
+    """测试流式写入时压缩，哈希基于落盘字节，重复内容不重写"""
+    items = list(range(5000))
+    body = json.dumps({"id": "big", "items": items})
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/big",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        stream_threshold=1024,
+        compression="gzip",
+        dedup=True,
+    )
+    first = spider.run()
+    assert first.filepath.endswith("big.json.gz")
+    with gzip.open(first.filepath) as f:
+        assert json.loads(f.read())["items"] == items
+    assert first.content_hash == file_digest(first.filepath)
+    assert spider.run().status == "unchanged"
+
+
+def _gzip_response(text, encoding="utf-8"):
+    import urllib3
+    body = gzip.compress(text.encode(encoding))
+    headers = {"Content-Encoding": "gzip", "Content-Type": "application/json; charset=%s" % encoding}
+    resp = requests.models.Response()
+    resp.status_code = 200
+    resp.raw = urllib3.HTTPResponse(body=io.BytesIO(body), headers=headers, preload_content=False)
+    resp.headers.update(headers)
+    resp.encoding = encoding
+    return resp, body
+
+
+def test_gzip_passthrough_writes_raw_bytes(monkeypatch, tmp_path):
+    """测试 gzip 响应体原样写盘，类型和文件名来自解压的开头片段"""
+    text = '{"id": "raw", "items": [1, 2, 3]}'
+    resp, body = _gzip_response(text)
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: resp)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/raw",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        prettify_content=False,
+        compression="gzip",
+        gzip_passthrough=True,
+    )
+    result = spider.run()
+    assert result.filepath.endswith("raw.json.gz")
+    with open(result.filepath, "rb") as f:
+        assert f.read() == body
+
+
+def test_gzip_passthrough_transcodes_non_utf8(monkeypatch, tmp_path):
+    """测试非 UTF-8 内容退回到解压、转码后压缩保存"""
+    text = '{"id": "gbk", "title": "中文"}'
+    resp, body = _gzip_response(text, encoding="gbk")
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: resp)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/gbk",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        prettify_content=False,
+        compression="gzip",
+        gzip_passthrough=True,
+    )
+    result = spider.run()
+    with gzip.open(result.filepath) as f:
+        assert f.read().decode("utf-8") == text
@@ -0,0 +1,68 @@
+# tests/test_crawl_queue.py
+
+
+from simplejsonspider import SimpleJSONSpider, CrawlQueue, CrawlResult
+
+
+def test_add_ignores_duplicates_and_pages_pending(tmp_path):
+    """测试重复 URL 被忽略，待抓取任务分页读取"""
+    with CrawlQueue(str(tmp_path / "queue.db"), batch_size=3) as queue:
+        assert queue.add(f"http://example.com/{n}" for n in range(10)) == 10
+        assert queue.add(["http://example.com/1", "http://example.com/10"]) == 1
+        assert list(queue.iter_pending())[:2] == ["http://example.com/0", "http://example.com/1"]
+        assert len(list(queue.iter_pending())) == 11
+
+
+def test_record_batches_and_resume(tmp_path):
+    """测试状态攒批提交，重新打开后只剩未完成的任务"""
+    path = str(tmp_path / "queue.db")
+    queue = CrawlQueue(path, batch_size=100, flush_interval=60)
+    queue.add(["http://a/1", "http://a/2", "http://a/3"])
+    queue.record(CrawlResult("http://a/1", "/out/1.json", content_hash="abc"))
+    queue.record(CrawlResult("http://a/2", status="failed", error=ValueError("boom")))
+    # 尚未提交：另一个连接看不到更新
+    with CrawlQueue(path) as other:
+        assert other.counts() == {"pending": 3}
+    queue.close()
+
+    queue = CrawlQueue(path)
+    assert queue.counts() == {"saved": 1, "failed": 1, "pending": 1}
+    assert list(queue.iter_pending()) == ["http://a/2", "http://a/3"]
+    assert list(queue.iter_pending(retry_failed=False)) == ["http://a/3"]
+    assert list(queue.iter_pending(max_attempts=1)) == ["http://a/3"]
+    row = queue._conn.execute("SELECT filepath, content_hash, attempts FROM jobs WHERE url = 'http://a/1'").fetchone()
+    assert row == ("/out/1.json", "abc", 1)
+    assert queue.reset() == 1
+    assert queue.counts() == {"saved": 1, "pending": 2}
+    queue.close()
+
+
+def test_spider_run_queue_resumes(monkeypatch, tmp_path, fake_response):
+    """测试 run_queue 只重新抓取失败的任务"""
+    calls = []
+    broken = {"3"}
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        calls.append(url)
+        item = url.rsplit("/", 1)[1]
+        if item in broken:
+            return fake_response("", status=500)
+        return fake_response('{"id": %s}' % item)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/{id}",
+        filename_template="{id}",
+        storage_dir=str(tmp_path / "out"),
+        url_params={"id": range(1, 6)},
+    )
+    db = str(tmp_path / "queue.db")
+    assert spider.run_queue(db, max_workers=2) == {"saved": 4, "failed": 1}
+    assert len(calls) == 5
+
+    broken.clear()
+    assert spider.run_queue(db, max_workers=2) == {"saved": 5}
+    assert calls[5:] == ["http://example.com/3"]
+    assert spider.run_queue(db) == {"saved": 5}
+    assert len(calls) == 6
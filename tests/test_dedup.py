@@ -0,0 +1,86 @@
+# tests/test_dedup.py
+
+import os
+from unittest import mock
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider, HashIndex
+import simplejsonspider.dedup as dedup_module
+
+
+@pytest.fixture
+def patch_bodies(monkeypatch, fake_response):
+    """让 Session.get 按 URL 返回给定的响应体"""
+    def patch(bodies):
+        def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+            return fake_response(bodies[url])
+        monkeypatch.setattr("requests.Session.get", dummy_get)
+    return patch
+
+
+def test_identical_content_not_rewritten(patch_bodies, tmp_path):
+    """测试格式化后内容相同时不重写文件"""
+    patch_bodies({"http://a/1": '{"id": 1}', "http://a/2": '{"id":1}'})
+    spider = SimpleJSONSpider(
+        api_url="http://a/1",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+        dedup=True,
+    )
+    first = spider.run()
+    # 原始内容不同，但格式化后的结果相同
+    results = spider.run_many(["http://a/2"])
+    assert first.status == "saved"
+    assert results[0].status == "unchanged"
+
+
+def test_index_avoids_reading_existing_file(patch_bodies, tmp_path):
+    """测试有哈希索引时不读取已有文件"""
+    patch_bodies({"http://a/1": '{"id": 1}'})
+    spider = SimpleJSONSpider(
+        api_url="http://a/1",
+        filename_template="item_{id}",
+        storage_dir=str(tmp_path),
+        dedup_index=HashIndex(":memory:"),
+    )
+    spider.run()
+    with mock.patch.object(dedup_module, "file_digest") as digest:
+        assert spider.run().status == "unchanged"
+    digest.assert_not_called()
+
+
+def test_content_addressed_storage(patch_bodies, tmp_path):
+    """测试不同 URL 的相同内容只存储一份，输出文件是硬链接"""
+    patch_bodies({"http://a/1": '{"v": 1}', "http://a/2": '{"v": 1}', "http://a/3": '{"v": 2}'})
+    spider = SimpleJSONSpider(
+        api_url="http://a/1",
+        filename_template="first_{v}",
+        storage_dir=str(tmp_path),
+        content_addressed=True,
+    )
+    path_a = spider.run().filepath
+    spider.filename_template = "second_{v}"
+    path_b = spider.run_many(["http://a/2"])[0].filepath
+    path_c = spider.run_many(["http://a/3"])[0].filepath
+
+    assert path_a != path_b
+    assert os.path.samefile(path_a, path_b)
+    assert not os.path.samefile(path_a, path_c)
+    assert len(os.listdir(os.path.join(str(tmp_path), ".objects"))) == 2
+
+
+def test_streamed_content_dedup(patch_bodies, tmp_path):
+    """测试流式写入的内容同样去重"""
+    body = "line of text\n" * 5000
+    patch_bodies({"http://a/big": body})
+    spider = SimpleJSONSpider(
+        api_url="http://a/big",
+        filename_template="big",
+        storage_dir=str(tmp_path),
+        stream_threshold=1024,
+        dedup=True,
+    )
+    assert spider.run().status == "saved"
+    assert spider.run().status == "unchanged"
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith(".part")] == []
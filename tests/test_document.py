@@ -0,0 +1,88 @@
+# tests/test_document.py
+
+import unittest
+from unittest import mock
+
+from simplejsonspider.document import ParsedDocument, get_path, scan_json_fields, split_path
+from simplejsonspider.file_detector import FileTypeDetector
+
+
+class TestParsedDocument(unittest.TestCase):
+
+    def test_parse_is_cached(self):
+        """测试解析结果只计算一次"""
+        document = ParsedDocument('{"id": 1}', 'json')
+        with mock.patch('simplejsonspider.json_backend.loads', return_value={'id': 1}) as loads:
+            self.assertEqual(document.parse(), {'id': 1})
+            self.assertEqual(document.parse('json'), {'id': 1})
+        self.assertEqual(loads.call_count, 1)
+
+    def test_parse_failure_is_cached(self):
+        """测试解析失败同样被缓存"""
+        document = ParsedDocument('not json', 'txt')
+        self.assertIsNone(document.try_parse('json'))
+        with self.assertRaises(ValueError):
+            document.parse('json')
+
+    def test_null_is_valid_value(self):
+        """测试 null 是合法的解析结果"""
+        document = ParsedDocument('null', 'json')
+        self.assertIsNone(document.parse())
+
+    def test_coerce(self):
+        """测试字符串和文档之间的转换"""
+        document = ParsedDocument.coerce('{"a": 1}', 'json')
+        self.assertIs(ParsedDocument.coerce(document), document)
+        document.parse()
+        retyped = ParsedDocument.coerce(document, 'custom')
+        self.assertEqual(retyped.content_type, 'custom')
+        self.assertEqual(retyped.try_parse('json'), {'a': 1})
+
+    def test_detect_document_keeps_parse(self):
+        """测试检测结果携带解析值，格式化时不再解析"""
+        document = FileTypeDetector.detect_document('{"name":"test","value":123}')
+        self.assertEqual(document.content_type, 'json')
+        with mock.patch('simplejsonspider.json_backend.loads') as loads:
+            result = FileTypeDetector.prettify_content(document)
+        loads.assert_not_called()
+        self.assertEqual(result, '{\n  "name": "test",\n  "value": 123\n}')
+
+    def test_detect_document_yaml(self):
+        """测试YAML检测结果携带解析值"""
+        document = FileTypeDetector.detect_document('name: test\nvalue: 123')
+        self.assertEqual(document.content_type, 'yaml')
+        self.assertEqual(document.parse(), {'name': 'test', 'value': 123})
+        self.assertIsNone(document.try_parse('json'))
+
+
+    def test_scan_json_fields(self):
+        """测试从开头片段提取完整的顶层字段"""
+        head = '{"id": 12, "title": "a, b", "meta": {"x": [1, 2]}, "items": [1, 2, 3'
+        self.assertEqual(
+            scan_json_fields(head),
+            {'id': 12, 'title': 'a, b', 'meta': {'x': [1, 2]}},
+        )
+        # 末尾可能被截断的数字不予采用
+        self.assertEqual(scan_json_fields('{"id": 1, "count": 12'), {'id': 1})
+        self.assertEqual(scan_json_fields('[1, 2, 3'), {})
+        # 被截断的对象保留其中完整出现的字段
+        self.assertEqual(
+            scan_json_fields('{"code": 0, "data": {"bvid": "BV1", "pages": [{"cid": 1}, {"c'),
+            {'code': 0, 'data': {'bvid': 'BV1'}},
+        )
+
+
+    def test_get_path(self):
+        """测试按点号和下标路径读取嵌套值"""
+        data = {'data': {'items': [{'id': 1}, {'id': 2}]}}
+        self.assertEqual(split_path('data.items[1].id'), ['data', 'items', 1, 'id'])
+        self.assertEqual(get_path(data, 'data.items[1].id'), 2)
+        self.assertEqual(get_path(data, 'data.items.0.id'), 1)
+        with self.assertRaises(KeyError):
+            get_path(data, 'data.items[5]')
+        with self.assertRaises(KeyError):
+            get_path(data, 'data.missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 
 import unittest
 from simplejsonspider.file_detector import FileTypeDetector
+from simplejsonspider.formats import Format, FormatRegistry, Probe
 
 
 class TestFileTypeDetector(unittest.TestCase):
@@ -102,6 +103,185 @@ Bob,35,SF"""
         # 看起来像JSON但不是的内容
         self.assertEqual(FileTypeDetector.detect_content_type('{this is not json}'), 'txt')
 
+    
+    def test_sampled_detection_matches_full(self):
+        """测试采样检测与全文检测结果一致"""
+        contents = [
+            '{"items": [' + ', '.join(str(i) for i in range(5000)) + ']}',
+            '---\n' + ''.join(f'key{i}: {i}\n' for i in range(5000)),
+            'WEBVTT\n\n' + '00:00:01.000 --> 00:00:05.000\nHello\n\n' * 2000,
+            '<?xml version="1.0"?>\n<root>' + '<item>test</item>\n' * 2000 + '</root>',
+            'name,age,city\n' + 'John,25,NYC\n' * 5000,
+            'plain text line without any structure\n' * 2000,
+        ]
+        for content in contents:
+            self.assertEqual(
+                FileTypeDetector.detect_content_type(content, sample_size=1024),
+                FileTypeDetector.detect_content_type(content),
+            )
+    
+    def test_sampled_detection_skips_full_yaml_parse(self):
+        """测试采样检测只解析采样片段"""
+        from unittest import mock
+        import simplejsonspider.document as document_module
+        
+        content = 'name,age,city\n' + 'John,25,NYC\n' * 10000
+        real_load = document_module.yaml.load
+        sizes = []
+        
+        def recording_load(text, Loader):
+            sizes.append(len(text))
+            return real_load(text, Loader=Loader)
+        
+        with mock.patch.object(document_module.yaml, 'load', recording_load):
+            self.assertEqual(FileTypeDetector.detect_content_type(content, sample_size=512), 'csv')
+        self.assertTrue(all(size <= 512 for size in sizes))
+    
+    def test_large_content_checks_yaml_prefix_only(self):
+        """测试设置 YAML_VALIDATE_SIZE 后大段内容只检查开头是否为YAML，不完整解析"""
+        from unittest import mock
+        import simplejsonspider.document as document_module
+        
+        padding = ''.join(f'key{i}: value {i}\n' for i in range(5000))
+        contents = {
+            '---\n' + padding: 'yaml',
+            'title: a: b\n' + padding: 'txt',
+            'a: 1\n---\nb: 2\n' + padding: 'txt',
+            # 第二个文档在检查范围之外
+            padding + '---\nb: 2\n': 'txt',
+            '2020-01-01 12:00:00 ERROR: request: failed\n' * 2000: 'txt',
+        }
+        with mock.patch.object(FileTypeDetector, 'YAML_VALIDATE_SIZE', 16 * 1024):
+            with mock.patch.object(document_module.yaml, 'load', side_effect=AssertionError):
+                for content, expected in contents.items():
+                    self.assertEqual(FileTypeDetector.detect_content_type(content), expected)
+        
+        for content, expected in contents.items():
+            self.assertEqual(FileTypeDetector.detect_content_type(content), expected)
+    
+    def test_full_detection_parses_whole_yaml_by_default(self):
+        """测试默认完整解析YAML，开头合法但后面有语法错误的内容不判定为YAML"""
+        padding = ''.join(f'key{i}: value {i}\n' for i in range(5000))
+        self.assertEqual(FileTypeDetector.detect_content_type(padding + 'title: a: b\n'), 'txt')
+        
+        document = FileTypeDetector.detect_document('---\n' + padding)
+        self.assertTrue(FileTypeDetector.prettify_content(document).startswith('key0: value 0\n'))
+    
+    def test_prettify_yaml_keeps_unicode(self):
+        """测试格式化YAML时不转义中文和 emoji"""
+        result = FileTypeDetector.prettify_content("title: 视频 😀\ncount: 1", 'yaml')
+        self.assertEqual(result, "count: 1\ntitle: 视频 😀\n")
+    
+    def test_sampled_detection_invalid_json(self):
+        """测试开头像JSON但完整解析失败时不判定为JSON"""
+        content = '{"items": [' + '1, ' * 1000 + '}'
+        self.assertEqual(FileTypeDetector.detect_content_type(content, sample_size=256), 'txt')
+
+    
+    def test_type_from_mime(self):
+        """测试根据 Content-Type 确定类型"""
+        self.assertEqual(FileTypeDetector.type_from_mime('application/json; charset=utf-8'), 'json')
+        self.assertEqual(FileTypeDetector.type_from_mime('Application/Vnd.API+JSON'), 'json')
+        self.assertEqual(FileTypeDetector.type_from_mime('text/vtt'), 'vtt')
+        self.assertEqual(FileTypeDetector.type_from_mime('application/x-yaml'), 'yaml')
+        # 通用类型和未知类型需要检查内容
+        self.assertIsNone(FileTypeDetector.type_from_mime('text/plain'))
+        self.assertIsNone(FileTypeDetector.type_from_mime('application/octet-stream'))
+        self.assertIsNone(FileTypeDetector.type_from_mime('image/png'))
+        self.assertIsNone(FileTypeDetector.type_from_mime(None))
+        self.assertEqual(FileTypeDetector.type_from_mime('text/plain', {'text/plain': 'txt'}), 'txt')
+
+    
+    def test_detect_registered_formats(self):
+        """测试 NDJSON、SRT、TSV、HTML 和二进制数据的检测"""
+        contents = {
+            'ndjson': '{"id": 1}\n{"id": 2}\n',
+            'srt': '1\n00:00:01,000 --> 00:00:02,000\nHello\n\n2\n00:00:03,000 --> 00:00:04,000\nBye\n',
+            'tsv': 'name\tage\nJohn\t25\nJane\t30\n',
+            'html': '<!DOCTYPE html>\n<html><head><title>a: b</title></head></html>',
+            'binary': '\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR',
+        }
+        for content_type, content in contents.items():
+            self.assertEqual(FileTypeDetector.detect_content_type(content), content_type)
+            self.assertEqual(FileTypeDetector.detect_content_type(content * 200, sample_size=256), content_type)
+        self.assertEqual(FileTypeDetector.detect_prefix('{"id": 1}\n{"id": 2}\n'), 'ndjson')
+        self.assertEqual(FileTypeDetector.detect_prefix('{\n  "items": [1, 2,\n'), 'json')
+        self.assertEqual(FileTypeDetector.get_file_extension('ndjson'), '.ndjson')
+        self.assertFalse(FileTypeDetector.should_prettify('html'))
+    
+    def test_registry_orders_by_before(self):
+        """测试检测顺序遵守 before 约束，没有约束的格式保持注册顺序"""
+        registry = FormatRegistry()
+        registry.register(Format('loose', '.l', validate=lambda probe: probe.sample.startswith('a')))
+        registry.register(Format('other', '.o', validate=lambda probe: probe.sample.startswith('b')))
+        registry.register(Format('strict', '.s', validate=lambda probe: probe.sample.startswith('ab'),
+                                 before=('loose',)))
+        self.assertEqual(registry.order(), ['strict', 'loose', 'other'])
+        self.assertEqual(registry.detect(Probe('ab', 'ab')), 'strict')
+        self.assertEqual(registry.detect(Probe('a', 'a')), 'loose')
+        self.assertIsNone(registry.detect(Probe('c', 'c')))
+    
+    def test_signature_skips_validation(self):
+        """测试特征不满足时不执行完整检查"""
+        registry = FormatRegistry()
+        calls = []
+        
+        def validate(probe):
+            calls.append(probe.sample)
+            return True
+        
+        registry.register(Format('brace', '.b', signature=lambda probe: probe.sample[0] == '{', validate=validate))
+        registry.register(Format('rest', '.r', validate=lambda probe: True))
+        self.assertEqual(registry.detect(Probe('x: 1', 'x: 1')), 'rest')
+        self.assertEqual(calls, [])
+        self.assertEqual(registry.detect(Probe('{}', '{}')), 'brace')
+        self.assertEqual(calls, ['{}'])
+    
+    def test_builtin_overlapping_formats_are_ordered(self):
+        """测试同时接受同一内容的内置格式之间都有 before 约束，结果不依赖注册顺序"""
+        registry = FileTypeDetector.formats
+        formats = [registry.get(name) for name in registry.order()]
+        
+        def precedes(first, second, seen=()):
+            if second.name in first.before:
+                return True
+            return any(
+                precedes(registry.get(name), second, seen + (first.name,))
+                for name in first.before
+                if registry.get(name) is not None and name not in seen
+            )
+        
+        contents = [
+            'a,b\tc\n1,2\t3\n4,5\t6\n',
+            'name\tage\nJohn\t25\n',
+            'id,name\n1,a\n2,b\n',
+            '[1,2]\n[3,4]\n[5,6]\n',
+            '{"id": 1}\n{"id": 2}\n',
+            '{"a": 1}',
+            '{"a": 1,\n"b": 2,\n"c": 3,\n"d": 4}',
+            '["\ufffd\ufffd\ufffd\ufffd\ufffd"]',
+            'key: value\nother: 2',
+            'WEBVTT\n\n1\n00:00:01,000 --> 00:00:02,000\nHi\n',
+            '1\n00:00:01,000 --> 00:00:02,000\n00:00:01.000 --> 00:00:02.000\n',
+            '<html>\x00\x01\x02\x03</html>',
+            '<?xml version="1.0"?><a>\x00\x01\x02</a>',
+            '\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR',
+            'plain text',
+        ]
+        for content in contents:
+            matching = [fmt for fmt in formats if fmt.matches(Probe(content, content.strip()))]
+            for i, first in enumerate(matching):
+                for second in matching[i + 1:]:
+                    self.assertTrue(precedes(first, second), (content, first.name, second.name))
+    
+    def test_registry_rejects_cycles(self):
+        """测试 before 约束成环时注册失败"""
+        registry = FormatRegistry()
+        registry.register(Format('a', '.a', validate=bool, before=('b',)))
+        with self.assertRaises(ValueError):
+            registry.register(Format('b', '.b', validate=bool, before=('a',)))
+        self.assertEqual(registry.order(), ['a'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+# tests/test_jobs.py
+
+import itertools
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider, IdFile, expand_urls
+from simplejsonspider.jobs import url_fields
+
+
+def test_url_fields():
+    """测试按出现顺序提取占位符"""
+    assert url_fields("https://api/{kind}/{id}?page={page}&k={kind}") == ["kind", "id", "page"]
+
+
+def test_expand_is_lazy():
+    """测试大范围参数按需展开"""
+    urls = expand_urls("https://api/x/{id}", {"id": range(1, 10000001)})
+    assert list(itertools.islice(urls, 3)) == ["https://api/x/1", "https://api/x/2", "https://api/x/3"]
+
+
+def test_expand_product_with_generator_outer():
+    """测试多个占位符按笛卡尔积展开，最外层可以是生成器"""
+    kinds = (kind for kind in ["a", "b"])
+    urls = list(expand_urls("https://api/{kind}/{page}", {"kind": kinds, "page": iter([1, 2])}))
+    assert urls == ["https://api/a/1", "https://api/a/2", "https://api/b/1", "https://api/b/2"]
+
+
+def test_expand_missing_source():
+    """测试缺少参数来源时报错"""
+    with pytest.raises(ValueError):
+        list(expand_urls("https://api/{id}", {}))
+
+
+def test_id_file(tmp_path):
+    """测试从文件逐行读取参数，且可以重复迭代"""
+    path = tmp_path / "ids.txt"
+    path.write_text("10\n\n 20 \n30\n", encoding="utf-8")
+    ids = IdFile(str(path))
+    assert list(ids) == ["10", "20", "30"]
+    urls = list(expand_urls("https://api/{lang}/{id}", {"lang": ["en", "zh"], "id": ids}))
+    assert urls[2:4] == ["https://api/en/30", "https://api/zh/10"]
+
+
+def test_spider_iter_urls(tmp_path):
+    """测试爬虫根据 url_params 展开 api_url"""
+    spider = SimpleJSONSpider(
+        api_url="https://api/x/{id}",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        url_params={"id": range(3)},
+    )
+    assert list(spider.iter_urls()) == ["https://api/x/0", "https://api/x/1", "https://api/x/2"]
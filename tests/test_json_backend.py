@@ -0,0 +1,96 @@
+# tests/test_json_backend.py
+
+import json
+import math
+import random
+import struct
+
+import pytest
+
+from simplejsonspider import json_backend
+
+try:
+    import orjson  # noqa: F401
+    BACKENDS = ['stdlib', 'orjson']
+except ImportError:
+    BACKENDS = ['stdlib']
+
+
+DOCUMENTS = [
+    '{"a": [1, 2, {}], "b": [], "c": {"d": "é 中文 \\u2028 \\u0000 \\u001f \\"\\\\/"}}',
+    '[1.0, 0.1, 1e16, 1e15, 1e-05, 0.0001, 1.2345678901234568e+17, 5e-324, -0.0, 2.5e-07, 1.5e-05]',
+    '{"id": 12345678901234567890123, "neg": -9223372036854775809, "max": 18446744073709551615}',
+    '{"value": NaN, "inf": Infinity, "ninf": -Infinity, "huge": 1E400}',
+    '{"lone": "\\ud800", "pair": "\\ud83d\\ude00"}',
+    '{"key: 1e16": "1e16", "k": "0.00001", "x": 0.00001}',
+    '"plain string"',
+    '1e16',
+    '9.73e-05',
+    '-9.73e-05',
+    'null',
+    '[' * 300 + ']' * 300,
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return json_backend.get_backend(request.param)
+
+
+@pytest.mark.parametrize('text', DOCUMENTS)
+def test_matches_stdlib(backend, text):
+    """测试解析和格式化结果与标准库逐字节相同"""
+    value = backend.loads(text)
+    expected = json.loads(text)
+    assert json.dumps(value, sort_keys=True) == json.dumps(expected, sort_keys=True)
+    assert backend.dumps_pretty(value) == json.dumps(expected, ensure_ascii=False, indent=2)
+
+
+def test_random_floats_match_stdlib(backend):
+    """测试随机浮点数的格式化结果与标准库相同"""
+    rng = random.Random(0)
+    values = []
+    while len(values) < 5000:
+        value = struct.unpack('d', struct.pack('Q', rng.getrandbits(64)))[0]
+        if math.isfinite(value):
+            values.append(value)
+    values += [1.5 * 10.0 ** e for e in range(-30, 30)]
+    document = {'values': values, 'nested': [{'v': v} for v in values[:100]]}
+    assert backend.dumps_pretty(document) == json.dumps(document, ensure_ascii=False, indent=2)
+    # 顶层的浮点数
+    for value in values[:500]:
+        assert backend.dumps_pretty(value) == json.dumps(value, ensure_ascii=False, indent=2)
+    # 浮点数稀疏时逐行改写，而不是整体交给标准库
+    sparse = [{'text': 'x' * 5000, 'decoy': '1e16 0.00001', 'value': v} for v in values[:200]]
+    assert backend.dumps_pretty(sparse) == json.dumps(sparse, ensure_ascii=False, indent=2)
+
+
+def test_unsupported_objects_fall_back(backend):
+    """测试标准库的行为（非字符串键、子类、不可序列化对象）保持不变"""
+    import datetime
+    import enum
+
+    class Color(enum.IntEnum):
+        RED = 1
+
+    value = {1: 'a', 'color': Color.RED, 'big': 10 ** 30, 'tuple': (1, 2)}
+    assert backend.dumps_pretty(value) == json.dumps(value, ensure_ascii=False, indent=2)
+    with pytest.raises(TypeError):
+        backend.dumps_pretty({'when': datetime.datetime(2024, 1, 1)})
+
+
+def test_invalid_json_raises_value_error(backend):
+    """测试无效JSON抛出 ValueError"""
+    for text in ['{"invalid": json}', '{"a": 1}\n{"a": 2}', '']:
+        with pytest.raises(ValueError):
+            backend.loads(text)
+
+
+def test_set_backend(monkeypatch):
+    """测试切换全局后端"""
+    monkeypatch.setattr(json_backend, '_current', json_backend.current_backend())
+    json_backend.set_backend('stdlib')
+    assert json_backend.current_backend() is json_backend.STDLIB
+    assert json_backend.dumps_pretty({'a': 1}) == '{\n  "a": 1\n}'
+    with pytest.raises(ValueError):
+        json_backend.set_backend('missing')
@@ -0,0 +1,77 @@
+# tests/test_layout.py
+
+import os
+import time
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider, HashShardLayout, DateLayout, TemplateLayout
+from simplejsonspider.layout import DirectoryCache, Layout, resolve_layout
+
+
+def test_hash_shard_layout_is_stable():
+    """测试哈希分片的目录层数、宽度和稳定性"""
+    layout = HashShardLayout(depth=2, width=2)
+    subdir = layout.subdir("BV1xx.json", {})
+    assert len(subdir.split("/")) == 2
+    assert all(len(part) == 2 for part in subdir.split("/"))
+    assert layout.subdir("BV1xx.json", {"other": 1}) == subdir
+    assert layout.path_for("out", "BV1xx.json", {}) == os.path.join("out", *subdir.split("/"), "BV1xx.json")
+
+
+def test_date_and_template_layouts():
+    """测试日期分区和模板子目录，模板不能跳出输出目录"""
+    assert DateLayout().subdir("a.json", {}) == time.strftime("%Y/%m/%d", time.gmtime())
+
+    layout = TemplateLayout("{owner.mid}/{kind|misc}")
+    assert layout.path_for("out", "a.json", {"owner": {"mid": 42}}) == os.path.join("out", "42", "misc", "a.json")
+    assert layout.path_for("out", "a.json", {}) == os.path.join("out", "a.json")
+    assert TemplateLayout("{owner}/x").path_for("out", "a.json", {"owner": ".."}) == os.path.join("out", "__", "x", "a.json")
+    assert TemplateLayout("{owner}").path_for("out", "a.json", {"owner": "../../etc"}) == os.path.join("out", ".._.._etc", "a.json")
+
+    assert isinstance(resolve_layout("hash"), HashShardLayout)
+    assert isinstance(resolve_layout("{id}"), TemplateLayout)
+
+
+def test_directory_cache_creates_once(monkeypatch, tmp_path):
+    """测试目录只创建一次"""
+    calls = []
+    real_makedirs = os.makedirs
+
+    def counting_makedirs(path, exist_ok=False):
+        calls.append(path)
+        real_makedirs(path, exist_ok=exist_ok)
+
+    monkeypatch.setattr(os, "makedirs", counting_makedirs)
+    cache = DirectoryCache()
+    target = str(tmp_path / "ab" / "cd")
+    for _ in range(3):
+        cache.ensure(target)
+    assert calls.count(target) == 1
+    assert os.path.isdir(target)
+
+
+def test_spider_saves_into_layout(tmp_path):
+    """测试 save_content 按布局保存到子目录"""
+    spider = SimpleJSONSpider(
+        api_url="http://example.com",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        layout="{group}",
+    )
+    filepath = spider.save_content('{"id": "abc", "group": "g1"}', "json")
+    assert filepath == os.path.join(str(tmp_path), "g1", "abc.json")
+    assert os.path.exists(filepath)
+
+    spider.layout = HashShardLayout(depth=1)
+    filepath = spider.save_content('{"id": "abc", "group": "g1"}', "json")
+    assert os.path.dirname(filepath) == os.path.join(str(tmp_path), HashShardLayout(depth=1).subdir("abc.json", {}))
+
+
+def test_layout_without_subdir_rejected():
+    """测试没有实现 subdir() 的布局在创建时就报错"""
+    class NoSubdir(Layout):
+        pass
+
+    with pytest.raises(TypeError):
+        NoSubdir()
@@ -0,0 +1,84 @@
+# tests/test_pagination.py
+
+import json
+import os
+
+from simplejsonspider import SimpleJSONSpider
+from simplejsonspider.document import ParsedDocument
+from simplejsonspider.pagination import next_from_path, page_number, set_query_param
+
+
+def _spider(tmp_path, template="page_{page}"):
+    return SimpleJSONSpider(
+        api_url="http://example.com/items",
+        filename_template=template,
+        storage_dir=str(tmp_path),
+    )
+
+
+def test_set_query_param():
+    """测试设置查询参数"""
+    assert set_query_param("http://a/x?page=1&q=z", "page", 2) == "http://a/x?q=z&page=2"
+
+
+def test_next_from_path_cursor():
+    """测试从 JSON 路径读取游标"""
+    next_page = next_from_path("meta.cursor", cursor_param="after")
+    document = ParsedDocument('{"meta": {"cursor": "abc"}}', 'json')
+    assert next_page(document, "http://a/x?after=old", {}) == "http://a/x?after=abc"
+    document = ParsedDocument('{"meta": {"cursor": null}}', 'json')
+    assert next_page(document, "http://a/x", {}) is None
+
+
+def test_page_number_stops_on_empty():
+    """测试按页码翻页，数据为空时停止"""
+    next_page = page_number("page", "data.items")
+    assert next_page(ParsedDocument('{"data": {"items": [1]}}', 'json'), "http://a/x", {}) == "http://a/x?page=2"
+    assert next_page(ParsedDocument('{"data": {"items": []}}', 'json'), "http://a/x?page=2", {}) is None
+
+
+def test_paginate_follows_next_links(monkeypatch, tmp_path, fake_response):
+    """测试跟随 JSON 中的相对链接翻页并逐页保存"""
+    pages = {
+        "http://example.com/items": {"n": 1, "next": "/items?p=2"},
+        "http://example.com/items?p=2": {"n": 2, "next": "http://example.com/items?p=3"},
+        "http://example.com/items?p=3": {"n": 3, "next": None},
+    }
+    requested = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        requested.append(url)
+        return fake_response(json.dumps(pages[url]))
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    paths = _spider(tmp_path).paginate("next")
+
+    assert requested == list(pages)
+    assert [os.path.basename(path) for path in paths] == ["page_1.json", "page_2.json", "page_3.json"]
+    with open(paths[1], encoding="utf-8") as f:
+        assert json.load(f)["n"] == 2
+
+
+def test_paginate_link_header_and_max_pages(monkeypatch, tmp_path, fake_response):
+    """测试使用 Link 响应头翻页，并限制最大页数"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        n = int(url.rsplit("=", 1)[-1]) if "=" in url else 1
+        link = '<http://example.com/items?p=%d>; rel="next"' % (n + 1)
+        return fake_response(json.dumps({"n": n}), headers={"Link": link})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    paths = _spider(tmp_path, "{n}").paginate(max_pages=3, prefetch=False)
+
+    assert [os.path.basename(path) for path in paths] == ["1.json", "2.json", "3.json"]
+
+
+def test_paginate_stops_on_cycle(monkeypatch, tmp_path, fake_response):
+    """测试下一页指向已抓取的页面时停止"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"next": "http://example.com/items"}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    assert len(_spider(tmp_path).paginate("next")) == 1
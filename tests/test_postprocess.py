@@ -0,0 +1,67 @@
+# tests/test_postprocess.py
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider
+from simplejsonspider.postprocess import SharedBody, save_body
+
+
+def test_shared_body_roundtrip(tmp_path):
+    """测试通过共享内存传递响应体并保存"""
+    body = b'{"id": "shm", "items": [1, 2, 3]}'
+    handle, shm = SharedBody.create(body)
+    try:
+        assert handle.read() == body
+        options = {"filename_template": "{id}", "storage_dir": str(tmp_path)}
+        filepath, status, digest = save_body("test-key", options, handle, "utf-8")
+    finally:
+        shm.close()
+        shm.unlink()
+    assert status == "saved"
+    assert json.loads(open(filepath, encoding="utf-8").read())["items"] == [1, 2, 3]
+
+
+def test_spider_saves_in_process_pool(monkeypatch, tmp_path, fake_response):
+    """测试设置 process_pool 后在子进程中格式化并保存（含大响应体）"""
+    big = {"id": "big", "items": list(range(200000))}
+    bodies = {
+        "http://example.com/small": '{"id": "small"}',
+        "http://example.com/big": json.dumps(big),
+    }
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(bodies[url])
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        spider = SimpleJSONSpider(
+            api_url="http://example.com/small",
+            filename_template="{id}",
+            storage_dir=str(tmp_path),
+            process_pool=pool,
+        )
+        results = spider.run_many(list(bodies), max_workers=2)
+
+    assert all(result.ok for result in results)
+    assert (tmp_path / "small.json").read_text(encoding="utf-8") == '{\n  "id": "small"\n}'
+    assert json.loads((tmp_path / "big.json").read_text(encoding="utf-8")) == big
+
+
+def test_process_pool_missing_field_raises(monkeypatch, tmp_path, fake_response):
+    """测试子进程中模板字段缺失时同样报 ValueError，而不是保存为 downloaded_file"""
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: fake_response('{"id": 1}'))
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        spider = SimpleJSONSpider(
+            api_url="http://example.com",
+            filename_template="{id}_{title}",
+            storage_dir=str(tmp_path),
+            process_pool=pool,
+        )
+        with pytest.raises(ValueError):
+            spider.run()
+    assert not (tmp_path / "downloaded_file.json").exists()
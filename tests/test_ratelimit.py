@@ -0,0 +1,131 @@
+# tests/test_ratelimit.py
+
+import asyncio
+import threading
+import time
+
+from simplejsonspider import SimpleJSONSpider, RateLimiter
+from simplejsonspider.ratelimit import AIMDLimiter, TokenBucket, parse_retry_after
+
+
+def test_parse_retry_after():
+    """测试解析秒数和 HTTP 日期形式的 Retry-After"""
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_token_bucket_limits_rate():
+    """测试令牌桶限制请求速率"""
+    bucket = TokenBucket(rate=100, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.045
+
+
+def test_aimd_increase_and_decrease():
+    """测试成功时并发上限缓慢增加，429 时减半"""
+    limiter = AIMDLimiter(initial_concurrency=4, max_concurrency=8)
+    for _ in range(8):
+        limiter.acquire()
+        limiter.release(status=200, latency=0.01)
+    assert 5.5 < limiter.limit < 6.5
+    limiter.acquire()
+    limiter.release(status=429)
+    assert 2.5 < limiter.limit < 3.5
+
+
+def test_aimd_bounds_in_flight():
+    """测试同时进行的请求数不超过并发上限"""
+    limiter = AIMDLimiter(initial_concurrency=2, max_concurrency=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        limiter.acquire()
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+        limiter.release(status=200)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_retry_after_pauses_host():
+    """测试 Retry-After 暂停该主机"""
+    limiter = AIMDLimiter(rate=1000)
+    limiter.acquire()
+    limiter.release(status=503, retry_after=0.05)
+    assert limiter.bucket.rate == 500
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.04
+
+
+def test_spider_reports_to_host_limiter(monkeypatch, tmp_path, fake_response):
+    """测试爬虫按主机上报请求结果"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        if "busy" in url:
+            return fake_response("", status=429)
+        return fake_response('{"id": 1}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    limiter = RateLimiter(initial_concurrency=8)
+    spider = SimpleJSONSpider(
+        api_url="http://ok.example.com/1",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        rate_limiter=limiter,
+    )
+    results = spider.run_many(["http://ok.example.com/1", "http://busy.example.com/1"])
+
+    assert sorted(result.status for result in results) == ["failed", "saved"]
+    assert limiter.for_url("http://ok.example.com/x").limit > 8
+    assert limiter.for_url("http://busy.example.com/x").limit == 4
+    assert limiter.for_url("http://ok.example.com/x").in_flight == 0
+
+
+def test_aimd_acquire_async():
+    """测试 asyncio 版本的等待：限制并发、不占用线程，被取消时不占用名额"""
+    limiter = AIMDLimiter(initial_concurrency=2, max_concurrency=2)
+    active = []
+    peak = []
+
+    async def worker():
+        await limiter.acquire_async()
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        limiter.release(status=200)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(8)))
+        # 等待中被取消的任务不会占用名额
+        limiter.acquire()
+        limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert limiter.in_flight == 2
+        # 其他线程释放名额时唤醒等待的任务
+        waiting = asyncio.ensure_future(limiter.acquire_async())
+        threading.Timer(0.01, limiter.release, kwargs={"status": 200}).start()
+        await asyncio.wait_for(waiting, 1)
+        assert limiter.in_flight == 2
+
+    asyncio.run(main())
+    assert max(peak) == 2
@@ -0,0 +1,161 @@
+# tests/test_retry.py
+
+import time
+
+import requests
+
+from simplejsonspider import SimpleJSONSpider, RetryPolicy, CircuitBreakers
+from simplejsonspider.retry import CircuitBreaker, CircuitOpenError
+
+
+def test_delay_for_backoff_and_limits():
+    """测试指数退避、抖动范围、Retry-After 和不重试的情况"""
+    policy = RetryPolicy(max_retries=3, backoff_factor=1, max_backoff=3, jitter=False)
+    assert [policy.delay_for(n, 503) for n in range(4)] == [1, 2, 3, None]
+    assert policy.delay_for(0, 404) is None
+    assert policy.delay_for(0, None) == 1
+    assert policy.delay_for(0, 429, retry_after=10) == 10
+
+    jittered = RetryPolicy(backoff_factor=1, max_backoff=4)
+    assert all(0 <= jittered.delay_for(2, 500) <= 4 for _ in range(20))
+    assert RetryPolicy(retry_connection_errors=False).delay_for(0, None) is None
+
+
+def test_circuit_breaker_states():
+    """测试熔断器打开、半开试探和恢复"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    try:
+        breaker.before_request()
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.06)
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    try:
+        breaker.before_request()
+        assert False, "only one trial request is allowed"
+    except CircuitOpenError:
+        pass
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_spider_retries_transient_errors(monkeypatch, tmp_path, fake_response):
+    """测试 503 和连接错误被重试，之后成功保存"""
+    calls = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            return fake_response("", status=503)
+        if len(calls) == 2:
+            raise requests.ConnectionError("reset")
+        return fake_response('{"id": 7}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/7",
+        filename_template="{id}.json",
+        storage_dir=str(tmp_path),
+        retry=RetryPolicy(backoff_factor=0),
+    )
+    result = spider.run()
+    assert result.ok
+    assert len(calls) == 3
+    assert (tmp_path / "7.json").exists()
+
+
+def test_spider_does_not_retry_client_errors(monkeypatch, tmp_path, fake_response):
+    """测试 404 不重试"""
+    calls = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        calls.append(url)
+        return fake_response("", status=404)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/missing",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        retry=RetryPolicy(backoff_factor=0),
+    )
+    results = spider.run_many(["http://example.com/missing"])
+    assert results[0].status == "failed"
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_fails_fast(monkeypatch, tmp_path, fake_response):
+    """测试主机熔断后不再发出请求"""
+    calls = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        calls.append(url)
+        return fake_response("", status=500)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://down.example.com/{id}",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+        circuit_breakers=CircuitBreakers(failure_threshold=2, reset_timeout=60),
+    )
+    urls = [f"http://down.example.com/{n}" for n in range(5)]
+    results = spider.run_many(urls, max_workers=1)
+
+    assert all(result.status == "failed" for result in results)
+    assert len(calls) == 2
+    assert sum(isinstance(result.error, CircuitOpenError) for result in results) == 3
+
+
+def test_half_open_trial_released_after_save_error(monkeypatch, tmp_path, fake_response):
+    """测试试探请求在保存阶段失败（模板字段缺失）时熔断器不会一直停在半开状态"""
+    calls = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        calls.append(url)
+        if len(calls) <= 2:
+            raise requests.ConnectionError("reset")
+        if len(calls) == 3:
+            return fake_response('{"other": 1}')
+        return fake_response('{"id": 9}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    breakers = CircuitBreakers(failure_threshold=2, reset_timeout=0.01)
+    spider = SimpleJSONSpider(
+        api_url="http://flaky.example.com/9",
+        filename_template="{id}.json",
+        storage_dir=str(tmp_path),
+        circuit_breakers=breakers,
+    )
+    for _ in range(2):
+        assert not spider.run_many([spider.api_url])[0].ok
+    time.sleep(0.02)
+    result = spider.run_many([spider.api_url])[0]
+    assert isinstance(result.error, ValueError)
+    assert breakers.for_url(spider.api_url).state == CircuitBreaker.CLOSED
+
+    assert spider.run().ok
+    assert (tmp_path / "9.json").exists()
+
+
+def test_release_trial_allows_next_trial():
+    """测试没有结果的试探请求释放名额后可以重新试探"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.release_trial()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
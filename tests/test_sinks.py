@@ -0,0 +1,92 @@
+# tests/test_sinks.py
+
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider, JSONLinesSink, TarSink, ZipSink
+from simplejsonspider.sinks import Sink
+
+
+def test_jsonl_sink_rotates_and_indexes(tmp_path):
+    """测试 JSON Lines 分段切换，并能按名字读回记录"""
+    with JSONLinesSink(str(tmp_path), max_bytes=100) as sink:
+        first = sink.write("a.json", b'{"id": "a", "pad": "' + b"x" * 80 + b'"}', url="http://x/a", content_type="json")
+        second = sink.write("b.json", b'{"id": "b"}', url="http://x/b", content_type="json")
+        assert first != second
+        assert sink.read("b.json") == b'{"id": "b"}'
+
+    lines = (tmp_path / "segment-00000.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["url"] == "http://x/a"
+    assert json.loads(lines[0])["filename"] == "a.json"
+
+    # 重新打开时从新分段开始，旧记录仍可读取
+    with JSONLinesSink(str(tmp_path)) as sink:
+        assert sink.write("c.json", b"{}").endswith("segment-00002.jsonl")
+        assert sink.read("a.json").startswith(b'{"id": "a"')
+        with pytest.raises(KeyError):
+            sink.read("missing.json")
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_zip_sink_reads_open_and_closed_segments(tmp_path, compression):
+    """测试 zip 分段在写入中和关闭后都能按索引读取"""
+    sink = ZipSink(str(tmp_path), compression=compression)
+    sink.write("a.json", b'{"id": "a"}' * 10)
+    sink.write("b.json", b'{"id": "b"}')
+    assert sink.read("a.json") == b'{"id": "a"}' * 10
+    sink.close()
+
+    with zipfile.ZipFile(str(tmp_path / "segment-00000.zip")) as zf:
+        assert zf.read("b.json") == b'{"id": "b"}'
+    with ZipSink(str(tmp_path), compression=compression) as sink:
+        assert sink.read("b.json") == b'{"id": "b"}'
+
+
+def test_tar_sink(tmp_path):
+    """测试 tar 分段可以被 tarfile 读取，索引指向文件数据"""
+    with TarSink(str(tmp_path)) as sink:
+        sink.write("a.json", b'{"id": "a"}')
+        sink.write("b.yaml", b"id: b\n")
+        assert sink.read("a.json") == b'{"id": "a"}'
+
+    with tarfile.open(str(tmp_path / "segment-00000.tar")) as tar:
+        assert tar.extractfile("b.yaml").read() == b"id: b\n"
+
+
+def test_spider_writes_records_to_sink(monkeypatch, tmp_path, fake_response):
+    """测试爬虫把每个响应作为一条记录写入 sink"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"id": "%s"}' % url.rsplit("/", 1)[1])
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    with JSONLinesSink(str(tmp_path / "packed")) as sink:
+        spider = SimpleJSONSpider(
+            api_url="http://example.com/{id}",
+            filename_template="{id}",
+            storage_dir=str(tmp_path / "out"),
+            url_params={"id": ["1", "2", "3"]},
+            sink=sink,
+        )
+        results = spider.run_many()
+        assert {result.filepath for result in results} == {str(tmp_path / "packed" / "segment-00000.jsonl")}
+        assert json.loads(sink.read("2.json")) == {"id": "2"}
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_incomplete_sink_rejected_on_creation(tmp_path):
+    """测试没有实现全部分段方法的子类在创建时就报错，不会留下索引文件"""
+    class HalfSink(Sink):
+        def _open_segment(self, path):
+            self._file = open(path, 'ab')
+
+        def _append(self, name, data, url, content_type):
+            self._file.write(data)
+            return 0, len(data), len(data)
+
+    with pytest.raises(TypeError):
+        HalfSink(str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
@@ -1,10 +1,14 @@
 # tests/test_spider.py
 
+import json
 import os
 import shutil
-import json
+
+import pytest
+
 from simplejsonspider import SimpleJSONSpider
 
+
 def test_run_and_save_json(tmp_path):
     # 使用jsonplaceholder测试，始终可用
     api_url = "https://jsonplaceholder.typicode.com/todos/1"
@@ -27,21 +31,18 @@ def test_run_and_save_json(tmp_path):
         content = f.read()
         assert '"id": 1' in content
 
-def test_custom_file_extension(monkeypatch, tmp_path):
+def test_custom_file_extension(monkeypatch, tmp_path, fake_response):
     """测试自定义文件扩展名"""
     api_url = "http://example.com/test"
     filename_template = "test_file"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return '{"id": 1, "title": "test"}'
+    body = '{"id": 1, "title": "test"}'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -55,21 +56,18 @@ def test_custom_file_extension(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "test_file.custom")
     assert os.path.exists(file_path)
 
-def test_auto_detect_json(monkeypatch, tmp_path):
+def test_auto_detect_json(monkeypatch, tmp_path, fake_response):
     """测试自动检测JSON格式"""
     api_url = "http://example.com/test"
     filename_template = "auto_detect"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return '{"id": 1, "title": "test"}'
+    body = '{"id": 1, "title": "test"}'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -83,21 +81,18 @@ def test_auto_detect_json(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "auto_detect.json")
     assert os.path.exists(file_path)
 
-def test_auto_detect_yaml(monkeypatch, tmp_path):
+def test_auto_detect_yaml(monkeypatch, tmp_path, fake_response):
     """测试自动检测YAML格式"""
     api_url = "http://example.com/test"
     filename_template = "auto_detect"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return 'name: test\nvalue: 123\nitems:\n  - 1\n  - 2\n  - 3'
+    body = 'name: test\nvalue: 123\nitems:\n  - 1\n  - 2\n  - 3'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -111,21 +106,18 @@ def test_auto_detect_yaml(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "auto_detect.yaml")
     assert os.path.exists(file_path)
 
-def test_auto_detect_vtt(monkeypatch, tmp_path):
+def test_auto_detect_vtt(monkeypatch, tmp_path, fake_response):
     """测试自动检测VTT格式"""
     api_url = "http://example.com/test"
     filename_template = "auto_detect"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return 'WEBVTT\n\n00:00:01.000 --> 00:00:05.000\nHello World'
+    body = 'WEBVTT\n\n00:00:01.000 --> 00:00:05.000\nHello World'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -139,21 +131,18 @@ def test_auto_detect_vtt(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "auto_detect.vtt")
     assert os.path.exists(file_path)
 
-def test_auto_detect_txt(monkeypatch, tmp_path):
+def test_auto_detect_txt(monkeypatch, tmp_path, fake_response):
     """测试自动检测纯文本格式"""
     api_url = "http://example.com/test"
     filename_template = "auto_detect"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return 'This is just plain text content.'
+    body = 'This is just plain text content.'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -167,7 +156,7 @@ def test_auto_detect_txt(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "auto_detect.txt")
     assert os.path.exists(file_path)
 
-def test_headers_and_cookies(monkeypatch, tmp_path):
+def test_headers_and_cookies(monkeypatch, tmp_path, fake_response):
     # 模拟请求，确保headers/cookies能被传递
     api_url = "http://example.com/test"
     filename_template = "dummy"
@@ -175,19 +164,16 @@ def test_headers_and_cookies(monkeypatch, tmp_path):
     headers = {"User-Agent": "pytest-agent"}
     cookies = {"testcookie": "123"}
 
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return '{"id": 1, "title": "dummy"}'
+    body = '{"id": 1, "title": "dummy"}'
     
-    def dummy_get(url, headers=None, cookies=None):
-        assert headers is not None
-        assert cookies is not None
-        assert headers["User-Agent"] == "pytest-agent"
-        assert cookies["testcookie"] == "123"
-        return DummyResp()
+    sent = []
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        # headers/cookies 随每个请求发送
+        sent.append((dict(headers), dict(cookies)))
+        return fake_response(body)
+    
+    monkeypatch.setattr("requests.Session.get", dummy_get)
 
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -200,23 +186,27 @@ def test_headers_and_cookies(monkeypatch, tmp_path):
     # 检查文件是否生成
     file_path = os.path.join(storage_dir, "dummy.json")
     assert os.path.exists(file_path)
+    assert sent[0] == ({"User-Agent": "pytest-agent"}, {"testcookie": "123"})
+    
+    # 之后对 headers/cookies 的修改同样生效
+    spider.headers["X-Token"] = "abc"
+    spider.cookies["session"] = "s1"
+    spider.run()
+    assert sent[1][0]["X-Token"] == "abc"
+    assert sent[1][1]["session"] == "s1"
 
-def test_backward_compatibility(monkeypatch, tmp_path):
+def test_backward_compatibility(monkeypatch, tmp_path, fake_response):
     """测试向后兼容性"""
     api_url = "http://example.com/test"
     filename_template = "{id}_{title}"
     storage_dir = str(tmp_path)
     
-    class DummyResp:
-        def raise_for_status(self): pass
-        @property
-        def text(self): return '{"id": 1, "title": "test"}'
-        def json(self): return {"id": 1, "title": "test"}
+    body = '{"id": 1, "title": "test"}'
     
-    def dummy_get(url, headers=None, cookies=None):
-        return DummyResp()
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
     
-    monkeypatch.setattr("requests.get", dummy_get)
+    monkeypatch.setattr("requests.Session.get", dummy_get)
     
     spider = SimpleJSONSpider(
         api_url=api_url,
@@ -234,3 +224,203 @@ def test_backward_compatibility(monkeypatch, tmp_path):
     file_path = os.path.join(storage_dir, "1_test.json")
     assert os.path.exists(file_path)
 
+
+def test_run_parses_json_once(monkeypatch, tmp_path, fake_response):
+    """测试一次运行只解析一次JSON"""
+    from simplejsonspider import json_backend
+
+    body = '{"id": 1, "title": "test"}'
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
+
+    calls = []
+    real_loads = json_backend.loads
+
+    def counting_loads(s, *args, **kwargs):
+        calls.append(s)
+        return real_loads(s, *args, **kwargs)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+    monkeypatch.setattr(json_backend, "loads", counting_loads)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{id}_{title}",
+        storage_dir=str(tmp_path)
+    )
+    spider.run()
+
+    assert os.path.exists(os.path.join(str(tmp_path), "1_test.json"))
+    assert len(calls) == 1
+
+def test_stream_large_response_to_disk(monkeypatch, tmp_path, fake_response):
+    """测试大响应体按 Content-Length 流式写入磁盘"""
+    items = ', '.join(str(i) for i in range(20000))
+    body = '{"id": 7, "title": "big", "items": [' + items + ']}'
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        assert kwargs.get("stream") is True
+        return fake_response(body, headers={"Content-Length": str(len(body))})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{id}_{title}",
+        storage_dir=str(tmp_path),
+        stream_threshold=1024,
+    )
+    filepath = spider.run().filepath
+
+    assert filepath == os.path.join(str(tmp_path), "7_big.json")
+    with open(filepath, "r", encoding="utf-8") as f:
+        # 流式写入保留原始内容，不做格式化
+        assert f.read() == body
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".part")]
+
+def test_stream_nested_template_fields(monkeypatch, tmp_path, fake_response):
+    """测试流式写入时文件名模板可以使用开头片段中的嵌套字段"""
+    pages = ', '.join('{"cid": %d, "part": "p%d"}' % (i, i) for i in range(20000))
+    body = '{"code": 0, "data": {"bvid": "BV1xx", "pages": [' + pages + ']}}'
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body, headers={"Content-Length": str(len(body))})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{data.bvid}",
+        storage_dir=str(tmp_path),
+        stream_threshold=1024,
+    )
+    assert spider.run().filepath == os.path.join(str(tmp_path), "BV1xx.json")
+
+
+def test_large_response_not_streamed_by_default(monkeypatch, tmp_path, fake_response):
+    """测试默认不流式写入：大响应体仍然完整解析并格式化"""
+    pages = ', '.join('{"cid": %d}' % i for i in range(100000))
+    body = '{"code": 0, "data": {"pages": [' + pages + '], "bvid": "BV1xx"}}'
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body, headers={"Content-Length": str(len(body))})
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{data.bvid}",
+        storage_dir=str(tmp_path),
+    )
+    filepath = spider.run().filepath
+    assert filepath == os.path.join(str(tmp_path), "BV1xx.json")
+    with open(filepath, "r", encoding="utf-8") as f:
+        assert f.read() == json.dumps(json.loads(body), ensure_ascii=False, indent=2)
+
+
+def test_stream_switches_on_observed_size(monkeypatch, tmp_path, fake_response):
+    """测试没有 Content-Length 时按已读取字节数切换到流式写入"""
+    body = "名字,年龄\n" + "张三,25\n" * 50000
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body, headers={"Content-Type": "text/csv; charset=gbk"}, encoding="gbk")
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="people",
+        storage_dir=str(tmp_path),
+        stream_threshold=4096,
+    )
+    filepath = spider.run().filepath
+
+    assert filepath.endswith("people.csv")
+    with open(filepath, "r", encoding="utf-8") as f:
+        assert f.read() == body
+
+def test_session_reused_across_runs(monkeypatch, tmp_path, fake_response):
+    """测试多次运行复用同一个会话，并带上默认超时"""
+    sessions = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        sessions.append(self)
+        assert kwargs["timeout"] == spider.timeout
+        return fake_response('{"id": 1}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{id}",
+        storage_dir=str(tmp_path),
+    )
+    spider.run()
+    spider.run()
+
+    assert len(sessions) == 2
+    assert sessions[0] is sessions[1] is spider.session
+
+def test_shared_session(monkeypatch, tmp_path, fake_response):
+    """测试多个实例共享外部会话，各自的 headers 随请求发送"""
+    from simplejsonspider import create_session
+
+    shared = create_session(pool_maxsize=4)
+    seen = []
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        assert self is shared
+        seen.append(headers["User-Agent"])
+        return fake_response('{"id": 1}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    for agent in ("a", "b"):
+        with SimpleJSONSpider(
+            api_url="http://example.com/test",
+            filename_template=agent,
+            storage_dir=str(tmp_path),
+            headers={"User-Agent": agent},
+            session=shared,
+        ) as spider:
+            spider.run()
+
+    assert seen == ["a", "b"]
+    assert shared.get_adapter("http://example.com")._pool_maxsize == 4
+
+def test_nested_filename_template(monkeypatch, tmp_path, fake_response):
+    """测试文件名模板使用嵌套字段"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"code": 0, "data": {"bvid": "BV1xx", "title": "a/b"}}')
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/test",
+        filename_template="{data.bvid}_{data.title}",
+        storage_dir=str(tmp_path),
+    )
+    assert spider.run().filepath == os.path.join(str(tmp_path), "BV1xx_a_b.json")
+
+
+@pytest.mark.parametrize("stream_threshold", [None, 1024])
+def test_binary_body_saved_byte_for_byte(monkeypatch, tmp_path, fake_response, stream_threshold):
+    """测试检测为二进制的响应体原样保存，不经过解码和 UTF-8 编码"""
+    body = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + bytes(range(256)) * 20
+
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response(body)
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    spider = SimpleJSONSpider(
+        api_url="http://example.com/image",
+        filename_template="image",
+        storage_dir=str(tmp_path),
+        stream_threshold=stream_threshold,
+    )
+    filepath = spider.run().filepath
+    assert filepath.endswith("image.bin")
+    with open(filepath, "rb") as f:
+        assert f.read() == body
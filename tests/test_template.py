@@ -0,0 +1,76 @@
+# tests/test_template.py
+
+import pickle
+
+import pytest
+
+from simplejsonspider import FilenameTemplate
+
+
+def test_render_matches_str_format():
+    """测试普通模板与 str.format 结果一致"""
+    data = {"id": 7, "title": "hello", "score": 3.14159}
+    for template in ["{id}_{title}", "{id:04d}", "{score:.2f}", "{title!r}", "static"]:
+        assert FilenameTemplate(template).render(data) == template.format(**data)
+
+
+def test_nested_paths_and_defaults():
+    """测试嵌套路径、下标和默认值"""
+    data = {"data": {"bvid": "BV1xx", "pages": [{"cid": 11}, {"cid": 22}]}}
+    template = FilenameTemplate("{data.bvid}_{data.pages[1].cid}_{data.title|untitled}")
+    assert template.render(data) == "BV1xx_22_untitled"
+    assert template.fields == ["data.bvid", "data.pages[1].cid", "data.title"]
+
+
+def test_missing_field_raises_key_error():
+    """测试字段不存在且没有默认值时抛出 KeyError"""
+    with pytest.raises(KeyError):
+        FilenameTemplate("{data.missing}").render({"data": {}})
+
+
+def test_extra_fields():
+    """测试额外参数，内容中的同名字段优先"""
+    template = FilenameTemplate("{id}_{page}")
+    assert template.render({"id": 1}, {"page": 3}) == "1_3"
+    assert template.render({"id": 1, "page": 9}, {"page": 3}) == "1_9"
+
+
+def test_sanitize():
+    """测试字段值中的路径分隔符被替换"""
+    assert FilenameTemplate("{title}").render({"title": "a/b\\c\n"}) == "a_b_c_"
+    assert FilenameTemplate("{title}", sanitize=False).render({"title": "a/b"}) == "a/b"
+
+
+def test_only_referenced_fields_are_read():
+    """测试渲染时只读取被引用的字段"""
+    class Tracking(dict):
+        def __getitem__(self, key):
+            read.append(key)
+            return dict.__getitem__(self, key)
+
+    read = []
+    data = Tracking({"key%d" % i: i for i in range(1000)})
+    assert FilenameTemplate("{key5}").render(data) == "5"
+    assert read == ["key5"]
+
+
+def test_non_object_raises_type_error():
+    """测试 JSON 不是对象时抛出 TypeError（调用方会使用默认文件名）"""
+    with pytest.raises(TypeError):
+        FilenameTemplate("{id}").render([1, 2])
+
+
+def test_positional_fields_rejected():
+    """测试位置参数在创建模板时抛出 ValueError，而不是读取名为 "0" 的字段"""
+    for template in ["{}", "{0}", "{0.id}", "{[0]}", "item_{}_{id}"]:
+        with pytest.raises(ValueError, match="Positional field"):
+            FilenameTemplate(template)
+    assert FilenameTemplate("{data.0}").render({"data": {"0": "x"}}) == "x"
+
+
+def test_pickled_template_keeps_defaults():
+    """测试 pickle 后（发送到进程池）缺失字段仍然报 KeyError，默认值仍然生效"""
+    template = pickle.loads(pickle.dumps(FilenameTemplate("{id}_{title}_{tag|none}")))
+    assert template.render({"id": 1, "title": "t"}) == "1_t_none"
+    with pytest.raises(KeyError):
+        template.render({"id": 1})
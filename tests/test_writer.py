@@ -0,0 +1,102 @@
+# tests/test_writer.py
+
+import os
+import threading
+
+import pytest
+
+from simplejsonspider import SimpleJSONSpider, WriteBehind
+from simplejsonspider.writer import write_atomic
+
+
+def test_write_atomic_leaves_no_temp_files(tmp_path):
+    """测试原子写入后只剩目标文件"""
+    target = str(tmp_path / "a.json")
+    write_atomic(target, b"{}", fsync=True)
+    write_atomic(target, b"[]")
+    assert os.listdir(str(tmp_path)) == ["a.json"]
+    assert open(target, "rb").read() == b"[]"
+
+
+@pytest.mark.parametrize("fsync", ["none", "file", "group"])
+def test_write_behind_policies(tmp_path, fsync):
+    """测试各种 fsync 策略下文件都被写完"""
+    with WriteBehind(workers=3, max_queue=4, fsync=fsync, group_size=5) as writer:
+        for n in range(23):
+            writer.submit(str(tmp_path / f"{n}.txt"), str(n).encode())
+        writer.flush()
+        assert sorted(os.listdir(str(tmp_path))) == sorted(f"{n}.txt" for n in range(23))
+    assert (tmp_path / "7.txt").read_bytes() == b"7"
+
+
+def test_write_behind_reports_errors(tmp_path):
+    """测试后台写盘错误在 flush 时抛出"""
+    writer = WriteBehind(workers=1)
+    writer.submit(str(tmp_path / "missing" / "a.txt"), b"x")
+    writer.submit(str(tmp_path / "b.txt"), b"y")
+    with pytest.raises(OSError):
+        writer.flush()
+    assert len(writer.errors) == 1
+    assert (tmp_path / "b.txt").exists()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(str(tmp_path / "c.txt"), b"z")
+    with pytest.raises(ValueError):
+        WriteBehind(fsync="sometimes")
+
+
+def test_spider_writes_in_background(monkeypatch, tmp_path, fake_response):
+    """测试抓取结果由写线程保存，run_many 返回前全部写完"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"id": "%s"}' % url.rsplit("/", 1)[1])
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    writer_threads = set()
+    real_replace = os.replace
+
+    def recording_replace(src, dst):
+        writer_threads.add(threading.current_thread().name)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", recording_replace)
+
+    with WriteBehind(workers=2, fsync="group") as writer:
+        spider = SimpleJSONSpider(
+            api_url="http://example.com/{id}",
+            filename_template="{id}",
+            storage_dir=str(tmp_path),
+            url_params={"id": [str(n) for n in range(20)]},
+            writer=writer,
+        )
+        results = spider.run_many(max_workers=4)
+        assert all(os.path.exists(result.filepath) for result in results)
+    assert all(name.startswith("simplejsonspider-writer") for name in writer_threads)
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".part")]
+
+
+def test_run_does_not_wait_for_writer(monkeypatch, tmp_path, fake_response):
+    """测试 run() 不等待后台写盘，close() 时写完"""
+    def dummy_get(self, url, headers=None, cookies=None, **kwargs):
+        return fake_response('{"id": "%s"}' % url.rsplit("/", 1)[1])
+
+    monkeypatch.setattr("requests.Session.get", dummy_get)
+
+    with WriteBehind(workers=1) as writer:
+        flushes = []
+        real_flush = writer.flush
+        monkeypatch.setattr(writer, "flush", lambda: (flushes.append(1), real_flush()))
+        spider = SimpleJSONSpider(
+            api_url="http://example.com/1",
+            filename_template="{id}",
+            storage_dir=str(tmp_path),
+            writer=writer,
+        )
+        paths = []
+        for n in range(3):
+            spider.api_url = "http://example.com/%d" % n
+            paths.append(spider.run().filepath)
+        assert flushes == []
+        spider.close()
+        assert flushes == [1]
+        assert all(os.path.exists(path) for path in paths)